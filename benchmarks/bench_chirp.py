@@ -0,0 +1,291 @@
+"""Benchmark of HTChirp operations, with results as JSON
+
+Measures the latency of small commands, the throughput of file transfers
+and the cost of directory listings. By default the client talks to a local
+ChirpServer started in a temporary directory, optionally with a simulated
+round trip and bandwidth limit::
+
+    python benchmarks/bench_chirp.py --latency 0.002 --bandwidth 1.25e8 \\
+        --sizes 1K,1M,1G --output before.json
+
+Inside a job, --config uses the .chirp.config of the starter instead (the
+benchmark works in a scratch directory, removed afterwards)::
+
+    python bench_chirp.py --config $_CONDOR_SCRATCH_DIR/.chirp.config
+
+"""
+
+from __future__ import print_function, division
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import platform
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    os.pardir))
+
+from htchirp import HTChirp, ChirpServer
+
+UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(size):
+    """Parse a size like '64K' or '1G' (binary units) into bytes"""
+    size = size.strip().upper().rstrip("B")
+    return int(float(size.rstrip("KMG") or 1) * UNITS[size.lstrip("0123456789.")])
+
+
+def summarize(samples):
+    """Summary statistics of a list of durations, in seconds
+
+    Percentiles use the nearest rank.
+
+    """
+
+    samples = sorted(samples)
+    rank = lambda p: samples[min(len(samples) - 1,
+                                     max(0, int(round(p * len(samples))) - 1))]
+    return {
+        "count": len(samples),
+        "mean": sum(samples) / len(samples),
+        "min": samples[0],
+        "p50": rank(0.50),
+        "p90": rank(0.90),
+        "p99": rank(0.99),
+        "max": samples[-1],
+    }
+
+
+def timed(func, min_time, repeat):
+    """Call func at least once and until min_time seconds or repeat calls
+
+    :returns: List of durations, in seconds
+
+    """
+
+    samples = []
+    start = time.perf_counter()
+    while not samples or (len(samples) < repeat and
+                              time.perf_counter() - start < min_time):
+        t = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t)
+    return samples
+
+
+def write_payload(path, size):
+    """Write incompressible data of the given size, one block at a time"""
+    block = memoryview(os.urandom(min(size, 1 << 20)))
+    with open(path, "wb") as f:
+        written = 0
+        while written < size:
+            written += f.write(block[:size - written])
+
+
+def bench_latency(chirp, workdir, iterations):
+    """Latency of the small commands, one round trip each"""
+
+    chirp.set_job_attr("HTChirpBench", '"0"')
+    operations = [
+        ("stat", lambda i: chirp.stat(workdir)),
+        ("get_job_attr", lambda i: chirp.get_job_attr("HTChirpBench")),
+        ("set_job_attr", lambda i: chirp.set_job_attr("HTChirpBench",
+                                                          '"{0}"'.format(i))),
+        ("ulog", lambda i: chirp.ulog("htchirp benchmark {0}".format(i))),
+    ]
+
+    results = {}
+    for (name, func) in operations:
+        func(0) # warm up
+        samples = []
+        for i in range(iterations):
+            t = time.perf_counter()
+            func(i)
+            samples.append(time.perf_counter() - t)
+        results[name] = summarize(samples)
+    return results
+
+
+def bench_throughput(chirp, workdir, local_dir, sizes, min_time, repeat):
+    """Throughput of whole-file and in-memory transfers"""
+
+    results = []
+    for size in sizes:
+        local_file = os.path.join(local_dir, "payload")
+        write_payload(local_file, size)
+        with open(local_file, "rb") as f:
+            data = f.read() # the only copy in memory, for write
+        remote_file = workdir + "/payload"
+        copy = os.path.join(local_dir, "copy")
+
+        operations = [
+            ("putfile", lambda: chirp.putfile(local_file, remote_file)),
+            ("getfile", lambda: chirp.getfile(remote_file, copy)),
+            ("write", lambda: chirp.write(data, remote_file, flags = "wct")),
+            ("read", lambda: chirp.read(remote_file, size)),
+        ]
+        for (name, func) in operations:
+            samples = timed(func, min_time, repeat)
+            best = min(samples)
+            results.append({
+                "operation": name,
+                "size": size,
+                "repeat": len(samples),
+                "seconds": summarize(samples),
+                "bytes_per_second": size / best if best > 0 else None,
+            })
+
+        chirp.unlink(remote_file)
+        for path in (local_file, copy):
+            if os.path.exists(path):
+                os.unlink(path)
+    return results
+
+
+def bench_listing(chirp, workdir, entry_counts, min_time, repeat):
+    """Cost of listing directories of increasing size"""
+
+    results = []
+    created = 0
+    listed = workdir + "/listing"
+    chirp.mkdir(listed)
+    for count in sorted(entry_counts):
+        # grow the directory to count entries, pipelined in one batch
+        with chirp.batch() as batch:
+            for i in range(created, count):
+                batch.mkdir("{0}/entry{1:07d}".format(listed, i))
+        created = count
+
+        operations = [
+            ("getdir", lambda: chirp.getdir(listed)),
+            ("getlongdir", lambda: chirp.getlongdir(listed)),
+            ("getlongdir columns", lambda: chirp.getlongdir(listed,
+                                                                columns = True)),
+            ("scandir", lambda: sum(1 for entry in chirp.scandir(listed))),
+        ]
+        for (name, func) in operations:
+            samples = timed(func, min_time, repeat)
+            results.append({
+                "operation": name,
+                "entries": count,
+                "repeat": len(samples),
+                "seconds": summarize(samples),
+                "seconds_per_entry": min(samples) / max(1, count),
+            })
+    return results
+
+
+def run(args, chirp, server = None):
+    """Run the benchmarks selected by args
+
+    :returns: A dict of the results, ready to be dumped as JSON
+
+    """
+
+    workdir = args.remote_dir or "htchirp-bench-{0}".format(os.getpid())
+    local_dir = tempfile.mkdtemp(prefix = "htchirp-bench-")
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "server": {
+            "local": server is not None,
+            "latency": args.latency if server else None,
+            "bandwidth": args.bandwidth if server else None,
+        },
+        "persistent": args.persistent,
+    }
+
+    chirp.mkdir(workdir)
+    try:
+        if args.persistent:
+            chirp.__enter__()
+        if "latency" in args.benchmarks:
+            report["latency"] = bench_latency(chirp, workdir, args.iterations)
+        if "throughput" in args.benchmarks:
+            report["throughput"] = bench_throughput(
+                chirp, workdir, local_dir, args.sizes, args.min_time, args.repeat)
+        if "listing" in args.benchmarks:
+            report["listing"] = bench_listing(
+                chirp, workdir, args.entries, args.min_time, args.repeat)
+    finally:
+        if args.persistent:
+            chirp.__exit__(None, None, None)
+        chirp.rmall(workdir)
+        shutil.rmtree(local_dir)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.split("\n")[0])
+    parser.add_argument("--config",
+                            help = ".chirp.config of a running Chirp server "
+                            "[default: start a local ChirpServer]")
+    parser.add_argument("--latency", type = float, default = 0.0,
+                            help = "round trip of the local server, in seconds")
+    parser.add_argument("--bandwidth", type = float,
+                            help = "bytes per second of the local server")
+    parser.add_argument("--benchmarks", default = "latency,throughput,listing",
+                            type = lambda s: s.split(","),
+                            help = "comma-separated benchmarks to run "
+                            "[default: latency,throughput,listing]")
+    parser.add_argument("--iterations", type = int, default = 1000,
+                            help = "calls per latency measurement "
+                            "[default: 1000]")
+    parser.add_argument("--sizes", default = "1K,32K,1M,32M,1G",
+                            type = lambda s: [parse_size(x) for x in s.split(",")],
+                            help = "payload sizes for the throughput benchmark "
+                            "[default: 1K,32K,1M,32M,1G]")
+    parser.add_argument("--entries", default = "10,100,1000,10000",
+                            type = lambda s: [int(x) for x in s.split(",")],
+                            help = "directory sizes for the listing benchmark "
+                            "[default: 10,100,1000,10000]")
+    parser.add_argument("--repeat", type = int, default = 10,
+                            help = "maximum repetitions of each transfer and "
+                            "listing [default: 10]")
+    parser.add_argument("--min-time", type = float, default = 1.0,
+                            help = "repeat transfers and listings until this "
+                            "many seconds have passed [default: 1]")
+    parser.add_argument("--persistent", action = "store_true",
+                            help = "run all commands in one persistent session")
+    parser.add_argument("--remote-dir",
+                            help = "scratch directory on the server, removed "
+                            "afterwards [default: htchirp-bench-PID]")
+    parser.add_argument("--output", help = "JSON file [default: stdout]")
+    args = parser.parse_args()
+
+    server = None
+    root = None
+    if args.config:
+        with open(args.config) as f:
+            (host, port, cookie) = f.read().split()
+        chirp = HTChirp(host = host, port = int(port), cookie = cookie)
+    else:
+        root = tempfile.mkdtemp(prefix = "htchirp-server-")
+        server = ChirpServer(root, latency = args.latency,
+                                 bandwidth = args.bandwidth)
+        server.start()
+        chirp = server.client()
+
+    try:
+        report = run(args, chirp, server)
+    finally:
+        if server is not None:
+            server.stop()
+            shutil.rmtree(root)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent = 2, sort_keys = True)
+    else:
+        json.dump(report, sys.stdout, indent = 2, sort_keys = True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Micro-benchmark of quoting and command building
+
+Compares the current quote() and _command() with the regex-based quote()
+they replaced, on path-heavy inputs::
+
+    python benchmarks/bench_quote.py --number 200000
+
+"""
+
+from __future__ import print_function
+
+import os
+import re
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    os.pardir))
+
+from htchirp.htchirp import quote, unquote, _command
+
+
+def legacy_quote(chirp_string):
+    """quote() as it was, rebuilding the regex on every call"""
+
+    escape_chars = ["\\", " ", "\n", "\t", "\r"]
+    escape_re = "(" + "|".join([re.escape(x) for x in escape_chars]) + ")"
+    escape = re.compile(escape_re)
+
+    replace = lambda matchobj: "\\" + matchobj.group(0)
+    return escape.sub(replace, chirp_string)
+
+
+def legacy_command(path, mode):
+    """A command built with str.format() and encoded afterwards"""
+    return "mkdir {0} {1}\n".format(legacy_quote(path), int(mode)).encode()
+
+
+INPUTS = {
+    "plain": "/var/lib/condor/execute/dir_12345/output/results_0001.dat",
+    "spaces": "/var/lib/condor/execute/dir_12345/my output/results 0001.dat",
+    "escapes": "C:\\Users\\condor\\job output\\tab\there\r\n.dat",
+}
+
+
+def run(number):
+    """Time each function on each input
+
+    :param number: Number of calls per measurement
+    :returns: List of (function, input, microseconds per call)
+
+    """
+
+    results = []
+    for (name, path) in sorted(INPUTS.items()):
+        assert quote(path) == legacy_quote(path)
+        assert unquote(quote(path)) == path
+        assert _command("mkdir", path, 0o755) == legacy_command(path, 0o755)
+
+        for (label, func) in [
+                ("legacy quote", lambda: legacy_quote(path)),
+                ("quote", lambda: quote(path)),
+                ("unquote", lambda: unquote(quote(path))),
+                ("legacy command", lambda: legacy_command(path, 0o755)),
+                ("_command", lambda: _command("mkdir", path, 0o755))]:
+            seconds = min(timeit.repeat(func, number = number, repeat = 3))
+            results.append((label, name, 1e6 * seconds / number))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.split("\n")[0])
+    parser.add_argument("--number", type = int, default = 100000,
+                            help = "calls per measurement [default: 100000]")
+    args = parser.parse_args()
+
+    print("{0:<16} {1:<8} {2:>10}".format("function", "input", "us/call"))
+    for (label, name, usec) in run(args.number):
+        print("{0:<16} {1:<8} {2:>10.3f}".format(label, name, usec))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,12 @@
 from __future__ import absolute_import
 from .htchirp import HTChirp
+from .pool import ChirpPool, get_pool
+from .cache import MetadataCache
+from .attributes import JobAttributes
+from .emitter import EventEmitter
+from .server import ChirpServer
+from .metrics import ChirpEvent, ChirpMetrics
+try:
+    from .aio import AsyncHTChirp
+except (ImportError, SyntaxError, AttributeError): # requires Python 3.7+
+    pass
@@ -0,0 +1,986 @@
+import os
+import asyncio
+import contextlib
+
+from .htchirp import (HTChirp, ChirpStat, ChirpStatFS, _command,
+                          _command_info, _find_chirp_server, _parse_stat)
+
+
+class _AsyncConnection(object):
+    """Authenticated connection to the Chirp server for AsyncHTChirp"""
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._command_sent = None # the last command, for errors
+
+    def is_open(self):
+        """Check if the connection can be reused
+
+        :returns: False if either side has closed the connection
+
+        """
+
+        return not (self._reader.at_eof() or self._writer.is_closing())
+
+    def close(self):
+        """Close the connection"""
+        self._writer.close()
+
+    async def send(self, data):
+        """Send raw data to the Chirp server
+
+        :param data: Bytes to send
+
+        """
+
+        self._writer.write(data)
+        await self._writer.drain()
+
+    async def command(self, cmd, get_response = True):
+        """Send a command to the Chirp server
+
+        :param cmd: The command to be sent
+        :param get_response: Check for a response and return it
+        :returns: The response from the Chirp server (if get_response is True)
+
+        """
+
+        if not isinstance(cmd, bytes):
+            cmd = cmd.encode()
+        if cmd[-1:] != b"\n":
+            raise HTChirp.InvalidRequest("The form of the request is invalid.")
+        self._command_sent = cmd
+        await self.send(cmd)
+
+        if get_response:
+            return await self.response()
+
+    async def response(self):
+        """Get the response from the Chirp server after running a command
+
+        :returns: The response from the Chirp server
+        :raises EnvironmentError: if response is too large
+
+        """
+
+        response = await self._reader.readline()
+        if not response.endswith(b"\n"):
+            raise RuntimeError("Connection to the Chirp server is broken.")
+        if len(response) > HTChirp.CHIRP_LINE_MAX:
+            raise EnvironmentError("The server responded with too much data.")
+        response = response.decode().rstrip()
+
+        # check the response code if a negative int is returned
+        if response[:1] == "-":
+            try:
+                code = int(response)
+            except ValueError:
+                pass
+            else:
+                HTChirp._check_response(code,
+                                            *_command_info(self._command_sent))
+
+        return response
+
+    async def fixed_data(self, length):
+        """Get a fixed amount of data from the Chirp server
+
+        :param length: The amount of data (in bytes) to receive
+        :returns: Received data
+
+        """
+
+        try:
+            return await self._reader.readexactly(int(length))
+        except asyncio.IncompleteReadError:
+            raise RuntimeError("Connection to the Chirp server is broken.")
+
+    async def line_data(self):
+        """Get one line of data from the Chirp server
+
+        :returns: A line of data received from the Chirp server
+
+        """
+
+        line = await self._reader.readline()
+        if not line.endswith(b"\n"):
+            raise RuntimeError("Connection to the Chirp server is broken.")
+        return line.decode()
+
+    async def stat_data(self, record):
+        """Get stat data from the Chirp server
+
+        :param record: The type of record to receive (ChirpStat or ChirpStatFS)
+        :returns: The record
+
+        """
+
+        result = (await self.line_data()).rstrip()
+        while len(result.split()) < len(record._fields):
+            result += (" " + (await self.line_data()).rstrip())
+        return _parse_stat(record, result)
+
+    async def open(self, name, flags, mode = None):
+        """Open a file on the Chirp server
+
+        :param name: Path to file
+        :param flags: File open modes (one or more of 'rwatcx')
+        :param mode: Permission mode to set [default: 0777]
+        :returns: File descriptor
+
+        """
+
+        if mode == None:
+            mode = HTChirp.DEFAULT_MODE
+
+        flags = set(flags)
+        if not flags.issubset(set('rwatcx')):
+            raise ValueError("Flags must be one or more of 'rwatcx'")
+
+        fd = int(await self.command(_command("open",
+            name,
+            ''.join(flags),
+            int(mode))))
+        await self.line_data() # stat of the opened file
+        return fd
+
+    async def abort(self, fd):
+        """Close a file descriptor after the server failed a command on it
+
+        Errors from the close are ignored, the caller re-raises the original
+        error. If the close does not get a reply, the connection is closed so
+        that it is not reused.
+
+        :param fd: File descriptor
+
+        """
+
+        try:
+            await self.command(_command("close", int(fd)))
+        except HTChirp.ChirpError:
+            pass
+        except Exception:
+            self.close()
+
+
+class AsyncHTChirp(object):
+    """asyncio Chirp client for HTCondor
+
+    Provides awaitable versions of the HTChirp methods, sharing its protocol
+    handling (quoting, error codes, stat parsing). Operations run on a pool
+    of up to `connections` authenticated connections, so many operations can
+    be in flight at once::
+
+        async with AsyncHTChirp() as chirp:
+            await asyncio.gather(
+                chirp.set_job_attr('Progress', '1'),
+                chirp.stat('/tmp/my-job-output'))
+
+    Errors are the HTChirp exception classes, also available as attributes of
+    this class (e.g. AsyncHTChirp.DoesntExist).
+
+    Local files in getfile(), putfile() and put() are read and written from
+    the event loop thread, one chunk at a time.
+
+    """
+
+    ## exceptions, shared with HTChirp
+
+    ChirpError = HTChirp.ChirpError
+    NotAuthenticated = HTChirp.NotAuthenticated
+    NotAuthorized = HTChirp.NotAuthorized
+    DoesntExist = HTChirp.DoesntExist
+    AlreadyExists = HTChirp.AlreadyExists
+    TooBig = HTChirp.TooBig
+    NoSpace = HTChirp.NoSpace
+    NoMemory = HTChirp.NoMemory
+    InvalidRequest = HTChirp.InvalidRequest
+    TooManyOpen = HTChirp.TooManyOpen
+    Busy = HTChirp.Busy
+    TryAgain = HTChirp.TryAgain
+    BadFD = HTChirp.BadFD
+    IsDir = HTChirp.IsDir
+    NotDir = HTChirp.NotDir
+    NotEmpty = HTChirp.NotEmpty
+    CrossDeviceLink = HTChirp.CrossDeviceLink
+    Offline = HTChirp.Offline
+    UnknownError = HTChirp.UnknownError
+
+
+    ## initialize
+
+    def __init__(self,
+                     host = None,
+                     port = None,
+                     auth = ["cookie"],
+                     cookie = None,
+                     timeout = 10,
+                     connections = 4):
+        """Chirp client initialization
+
+        No connection is made until the first operation.
+
+        :param host: the hostname or ip of the Chirp server
+        :param port: the port of the Chirp server
+        :param auth: a list of authentication methods to try
+        :param cookie: the cookie string, if trying cookie authentication
+        :param timeout: timeout for each operation, in seconds
+        :param connections: maximum number of connections to the server
+
+        """
+
+        (host, port, cookie) = _find_chirp_server(host, port, auth, cookie)
+
+        self.reconnects = 0 # number of dropped connections replaced
+        self._host = host
+        self._port = int(port)
+        self._cookie = cookie
+        self._timeout = timeout
+        self._auth = list(auth)
+        self._authentication = None
+        self._max_connections = max(1, int(connections))
+        self._idle = [] # connections ready for reuse
+        self._semaphore = None # created in the running event loop
+
+    def __repr__(self):
+        """Print a representation of this object"""
+        return "{0}({1}, {2}) using {3} authentication".format(
+            self.__class__.__name__,
+            self._host,
+            self._port,
+            self._authentication)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close all idle connections to the Chirp server"""
+
+        (idle, self._idle) = (self._idle, [])
+        for conn in idle:
+            conn.close()
+
+
+    ## internal methods
+
+    async def _connect(self):
+        """Connect to and authenticate with the Chirp server
+
+        :returns: An authenticated connection
+
+        """
+
+        methods = [self._authentication] if self._authentication else self._auth
+        for method in methods:
+            (reader, writer) = await asyncio.open_connection(
+                self._host, self._port)
+            conn = _AsyncConnection(reader, writer)
+            try:
+                await self._authenticate(conn, method)
+            except HTChirp.NotAuthenticated:
+                conn.close()
+            except BaseException:
+                conn.close()
+                raise
+            else:
+                self._authentication = method
+                return conn
+        raise HTChirp.NotAuthenticated(
+            "Could not authenticate with methods {0}".format(methods))
+
+    async def _authenticate(self, conn, method):
+        """Test authentication method
+
+        :param conn: The connection to authenticate
+        :param method: The authentication method to attempt
+
+        """
+
+        if method == "cookie":
+            if self._cookie is None:
+                raise HTChirp.NotAuthenticated(
+                    "Could not authenticate using {0}, no cookie".format(
+                        method))
+            response = await conn.command(_command("cookie",
+                self._cookie))
+            if not (str(response) == "0"):
+                raise HTChirp.NotAuthenticated(
+                    "Could not authenticate using {0}".format(method))
+        elif method in HTChirp.CHIRP_AUTH_METHODS:
+            raise NotImplementedError(
+                "Auth method '{0}' not implemented in this client".format(
+                    method))
+        else:
+            raise ValueError("Unknown authentication method '{0}'".format(
+                method))
+
+    @contextlib.asynccontextmanager
+    async def _connection(self):
+        """Borrow a connection from the pool for one operation
+
+        The connection is returned to the pool afterwards, unless the
+        operation failed with an error that may have left it out of sync.
+
+        """
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_connections)
+
+        async with self._semaphore:
+            conn = None
+            while self._idle and conn is None:
+                conn = self._idle.pop()
+                if not conn.is_open():
+                    conn.close()
+                    conn = None
+                    self.reconnects += 1
+            if conn is None:
+                conn = await asyncio.wait_for(self._connect(), self._timeout)
+
+            try:
+                yield conn
+            except HTChirp.ChirpError:
+                if conn.is_open():
+                    self._idle.append(conn) # the server replied, still in sync
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            else:
+                self._idle.append(conn)
+
+    async def _run(self, operation, *args):
+        """Run an operation on a pooled connection with a timeout
+
+        :param operation: Coroutine function taking a connection and args
+        :returns: The result of the operation
+
+        """
+
+        async with self._connection() as conn:
+            return await asyncio.wait_for(operation(conn, *args),
+                                              self._timeout)
+
+    async def _simple(self, cmd):
+        """Run a command that only returns a response code"""
+
+        async def operation(conn):
+            return await conn.command(cmd)
+        return await self._run(operation)
+
+    async def _data(self, cmd):
+        """Run a command that returns a length followed by data"""
+
+        async def operation(conn):
+            length = int(await conn.command(cmd))
+            return await conn.fixed_data(length)
+        return await self._run(operation)
+
+    async def _stat(self, cmd, record):
+        """Run a command that returns stat data"""
+
+        async def operation(conn):
+            await conn.command(cmd)
+            return await conn.stat_data(record)
+        return await self._run(operation)
+
+
+    ## public methods
+
+    # HTCondor-specific methods
+
+    async def fetch(self, remote_file, local_file):
+        """Copy a file from the submit machine to the execute machine.
+
+        :param remote_file: Path to file to be sent from the submit machine
+        :param local_file: Path to file to be written to on the execute machine
+        :returns: Bytes written
+
+        """
+
+        return await self.getfile(remote_file, local_file)
+
+    async def put(self, local_file, remote_file, flags = 'wct', mode = None):
+        """Copy a file from the execute machine to the submit machine.
+
+        With flags other than 'wct', the file is written in chunks through a
+        single remote file descriptor.
+
+        :param local_file: Path to file to be sent from the execute machine
+        :param remote_file: Path to file to be written to on the submit machine
+        :param flags: File open modes (one or more of 'rwatcx') [default: 'wct']
+        :param mode: Permission mode to set [default: 0777]
+        :returns: Size of written file
+
+        """
+
+        flags = set(flags)
+        if flags == set("wct"):
+            return await self.putfile(local_file, remote_file, mode)
+        if not ("w" in flags):
+            raise ValueError("'w' is not included in flags '{0}'".format(
+                "".join(flags)))
+
+        chunk_size = HTChirp.CHIRP_CHUNK_SIZE
+        length = os.stat(local_file).st_size
+
+        async def operation(conn):
+            fd = await conn.open(remote_file, flags, mode)
+            wb = 0
+            try:
+                with open(local_file, "rb") as rfd:
+                    data = rfd.read(chunk_size)
+                    while data:
+                        await conn.command(_command("write",
+                            int(fd),
+                            len(data)), get_response = False)
+                        await conn.send(data)
+                        wb += int(await conn.response())
+                        data = rfd.read(chunk_size)
+                await conn.command(_command("fsync", int(fd)))
+            except HTChirp.ChirpError:
+                await conn.abort(fd)
+                raise
+            await conn.command(_command("close", int(fd)))
+            return wb
+
+        async with self._connection() as conn:
+            wb = await operation(conn)
+        if wb < length:
+            raise UserWarning(
+                "Only {0} bytes of {1} bytes in {2} were written".format(
+                    wb, length, local_file))
+        return wb
+
+    async def remove(self, remote_file):
+        """Remove a file from the submit machine.
+
+        :param remote_file: Path to file on the submit machine
+
+        """
+
+        await self.unlink(remote_file)
+
+    async def get_job_attr(self, job_attribute):
+        """Get the value of a job ClassAd attribute.
+
+        :param job_attribute: The job attribute to query
+        :returns: The value of the job attribute as a string
+
+        """
+
+        return (await self._data(_command("get_job_attr",
+            job_attribute))).decode()
+
+    async def get_job_attr_delayed(self, job_attribute):
+        """Get the value of a job ClassAd attribute from the local Starter.
+
+        :param job_attribute: The job attribute to query
+        :returns: The value of the job attribute as a string
+
+        """
+
+        return (await self._data(_command("get_job_attr_delayed",
+            job_attribute))).decode()
+
+    async def set_job_attr(self, job_attribute, attribute_value):
+        """Set the value of a job ClassAd attribute.
+
+        :param job_attribute: The job attribute to set
+        :param attribute_value: The job attribute's new value
+
+        """
+
+        await self._simple(_command("set_job_attr",
+            job_attribute,
+            attribute_value))
+
+    async def set_job_attr_delayed(self, job_attribute, attribute_value):
+        """Set the value of a job ClassAd attribute as a non-durable update.
+
+        :param job_attribute: The job attribute to set
+        :param attribute_value: The job attribute's new value
+
+        """
+
+        await self._simple(_command("set_job_attr_delayed",
+            job_attribute,
+            attribute_value))
+
+    async def ulog(self, text):
+        """Log a generic string to the job log.
+
+        :param text: String to log
+
+        """
+
+        await self._simple(_command("ulog",
+            text))
+
+    async def phase(self, phasestring):
+        """Tell HTCondor that the job is changing phases.
+
+        :param phasestring: New phase
+
+        """
+
+        await self._simple(_command("phase",
+            phasestring))
+
+    # Wrappers around methods that use a file descriptor
+
+    async def read(self, remote_path, length,
+                       offset = None, stride_length = None, stride_skip = None):
+        """Read up to 'length' bytes from a file on the remote machine.
+
+        :param remote_path: Path to file
+        :param length: Number of bytes to read
+        :param offset: Number of bytes to offset from beginning of file
+        :param stride_length: Number of bytes to read per stride
+        :param stride_skip: Number of bytes to skip per stride
+        :returns: Data read from file
+
+        """
+
+        if offset == None and (stride_length, stride_skip) != (None, None):
+            offset = 0 # assume offset is 0 if stride given but not offset
+
+        if (stride_length == None) != (stride_skip == None):
+            raise HTChirp.InvalidRequest(
+                "Both stride_length and stride_skip must be specified")
+
+        async def operation(conn):
+            fd = await conn.open(remote_path, "r")
+            if offset == None:
+                cmd = _command("read", int(fd), int(length))
+            elif stride_length == None:
+                cmd = _command("pread",
+                    int(fd),
+                    int(length),
+                    int(offset))
+            else:
+                cmd = _command("sread",
+                    int(fd),
+                    int(length),
+                    int(offset),
+                    int(stride_length),
+                    int(stride_skip))
+            try:
+                rb = int(await conn.command(cmd))
+                data = await conn.fixed_data(rb)
+            except HTChirp.ChirpError:
+                await conn.abort(fd)
+                raise
+            await conn.command(_command("close", int(fd)))
+            return data
+        return await self._run(operation)
+
+    async def write(self, data, remote_path, flags = "w", mode = None,
+                        length = None, offset = None,
+                        stride_length = None, stride_skip = None):
+        """Write bytes to a file on the remote matchine.
+
+        :param data: Bytes to write
+        :param remote_path: Path to file
+        :param flags: File open modes (one or more of 'rwatcx') [default: 'w']
+        :param mode: Permission mode to set [default: 0777]
+        :param length: Number of bytes to write [default: len(data)]
+        :param offset: Number of bytes to offset from beginning of file
+        :param stride_length: Number of bytes to write per stride
+        :param stride_skip: Number of bytes to skip per stride
+        :returns: Number of bytes written
+
+        """
+
+        flags = set(flags)
+        if not ("w" in flags):
+            raise ValueError("'w' is not included in flags '{0}'".format(
+                "".join(flags)))
+
+        if length == None:
+            length = len(data)
+
+        if offset == None and (stride_length, stride_skip) != (None, None):
+            offset = 0 # assume offset is 0 if stride given but not offset
+
+        if (stride_length == None) != (stride_skip == None):
+            raise HTChirp.InvalidRequest(
+                "Both stride_length and stride_skip must be specified")
+
+        async def operation(conn):
+            fd = await conn.open(remote_path, flags, mode)
+            if offset == None:
+                cmd = _command("write", int(fd), int(length))
+            elif stride_length == None:
+                cmd = _command("pwrite",
+                    int(fd),
+                    int(length),
+                    int(offset))
+            else:
+                cmd = _command("swrite",
+                    int(fd),
+                    int(length),
+                    int(offset),
+                    int(stride_length),
+                    int(stride_skip))
+            try:
+                await conn.command(cmd, get_response = False)
+                await conn.send(data)
+                wb = int(await conn.response())
+                await conn.command(_command("fsync", int(fd)))
+            except HTChirp.ChirpError:
+                await conn.abort(fd)
+                raise
+            await conn.command(_command("close", int(fd)))
+            return wb
+        return await self._run(operation)
+
+    # Chirp protocol standard methods
+
+    async def rename(self, old_path, new_path):
+        """Rename (move) a file on the remote machine.
+
+        :param old_path: Path to file to be renamed
+        :param new_path: Path to new file name
+
+        """
+
+        await self._simple(_command("rename",
+            old_path,
+            new_path))
+
+    async def unlink(self, remote_file):
+        """Delete a file on the remote machine.
+
+        :param remote_file: Path to file
+
+        """
+
+        await self._simple(_command("unlink",
+            remote_file))
+
+    async def rmdir(self, remote_path, recursive = False):
+        """Delete a directory on the remote machine.
+
+        :param remote_path: Path to directory
+        :param recursive: If set to True, recursively delete remote_path
+
+        """
+
+        if recursive == True:
+            await self.rmall(remote_path)
+        else:
+            await self._simple(_command("rmdir",
+                remote_path))
+
+    async def rmall(self, remote_path):
+        """Recursively delete an entire directory on the remote machine.
+
+        :param remote_path: Path to directory
+
+        """
+
+        await self._simple(_command("rmall",
+            remote_path))
+
+    async def mkdir(self, remote_path, mode = None):
+        """Create a new directory on the remote machine.
+
+        :param remote_path: Path to new directory
+        :param mode: Permission mode to set [default: 0777]
+
+        """
+
+        if mode == None:
+            mode = HTChirp.DEFAULT_MODE
+
+        await self._simple(_command("mkdir",
+            remote_path,
+            int(mode)))
+
+    async def getfile(self, remote_file, local_file):
+        """Retrieve an entire file efficiently from the remote machine.
+
+        :param remote_file: Path to file to be sent from remote machine
+        :param local_file: Path to file to be written to on local machine
+        :returns: Bytes written
+
+        """
+
+        chunk_size = HTChirp.CHIRP_CHUNK_SIZE
+
+        async def operation(conn):
+            length = int(await conn.command(_command("getfile",
+                remote_file)))
+            bytes_recv = 0
+            with open(local_file, "wb") as wfd:
+                while bytes_recv < length:
+                    data = await conn.fixed_data(
+                        min(chunk_size, length - bytes_recv))
+                    wfd.write(data)
+                    bytes_recv += len(data)
+            return bytes_recv
+
+        # the transfer time depends on the file size, so no timeout here
+        async with self._connection() as conn:
+            return await operation(conn)
+
+    async def putfile(self, local_file, remote_file, mode = None):
+        """Store an entire file efficiently to the remote machine.
+
+        :param local_file: Path to file to be sent from local machine
+        :param remote_file: Path to file to be written to on remote machine
+        :param mode: Permission mode to set [default: 0777]
+        :returns: Size of written file, as reported by the server
+
+        """
+
+        if mode == None:
+            mode = HTChirp.DEFAULT_MODE
+
+        chunk_size = HTChirp.CHIRP_CHUNK_SIZE
+        length = os.stat(local_file).st_size
+
+        async def operation(conn):
+            await conn.command(_command("putfile",
+                remote_file,
+                int(mode),
+                int(length)))
+            bytes_sent = 0
+            with open(local_file, "rb") as rfd:
+                while bytes_sent < length:
+                    data = rfd.read(min(chunk_size, length - bytes_sent))
+                    if not data:
+                        raise EnvironmentError(
+                            "Only {0} bytes of {1} bytes in {2} could be read"
+                            .format(bytes_sent, length, local_file))
+                    await conn.send(data)
+                    bytes_sent += len(data)
+            return int(await conn.response())
+
+        # the transfer time depends on the file size, so no timeout here
+        async with self._connection() as conn:
+            wb = await operation(conn)
+        if wb < length:
+            raise UserWarning(
+                "Only {0} bytes of {1} bytes in {2} were written".format(
+                    wb, length, local_file))
+        return wb
+
+    async def getlongdir(self, remote_path):
+        """List a directory and all its file metadata on the remote machine.
+
+        :param remote_path: Path to directory
+        :returns: A dict of file metadata
+
+        """
+
+        result = (await self._data(_command("getlongdir",
+            remote_path))).decode()
+
+        results = result.rstrip().split("\n")
+        files = results[::2]
+        stat_dicts = [_parse_stat(ChirpStat, s)
+                          for s in results[1::2]]
+        return dict(zip(files, stat_dicts))
+
+    async def getdir(self, remote_path, stat_dict = False):
+        """List a directory on the remote machine.
+
+        :param remote_path: Path to directory
+        :param stat_dict: If set to True, return a dict of file metadata
+        :returns: List of files, unless stat_dict is True
+
+        """
+
+        if stat_dict == True:
+            return await self.getlongdir(remote_path)
+
+        result = (await self._data(_command("getdir",
+            remote_path))).decode()
+        return result.rstrip().split("\n")
+
+    async def whoami(self):
+        """Get the user's current identity with respect to this server.
+
+        :returns: The user's identity
+
+        """
+
+        return (await self._data(_command("whoami",
+            HTChirp.CHIRP_LINE_MAX))).decode()
+
+    async def whoareyou(self, remote_host):
+        """Get the server's identity with respect to the remote host.
+
+        :param remote_host: Remote host
+        :returns: The server's identity
+
+        """
+
+        return (await self._data(_command("whoareyou",
+            remote_host,
+            HTChirp.CHIRP_LINE_MAX))).decode()
+
+    async def link(self, old_path, new_path, symbolic = False):
+        """Create a link on the remote machine.
+
+        :param old_path: File path to link from on the remote machine
+        :param new_path: File path to link to on the remote machine
+        :param symbolic: If set to True, use a symbolic link
+
+        """
+
+        if symbolic:
+            await self.symlink(old_path, new_path)
+        else:
+            await self._simple(_command("link",
+                old_path,
+                new_path))
+
+    async def symlink(self, old_path, new_path):
+        """Create a symbolic link on the remote machine.
+
+        :param old_path: File path to symlink from on the remote machine
+        :param new_path: File path to symlink to on the remote machine
+
+        """
+
+        await self._simple(_command("symlink",
+            old_path,
+            new_path))
+
+    async def readlink(self, remote_path):
+        """Read the contents of a symbolic link.
+
+        :param remote_path: File path on the remote machine
+        :returns: Contents of the link
+
+        """
+
+        return await self._data(_command("readlink",
+            remote_path,
+            HTChirp.CHIRP_LINE_MAX))
+
+    async def stat(self, remote_path):
+        """Get metadata for file on the remote machine.
+
+        If remote_path is a symbolic link, examine its target.
+
+        :param remote_path: Path to file
+        :returns: ChirpStat of file metadata
+
+        """
+
+        return await self._stat(_command("stat",
+            remote_path), ChirpStat)
+
+    async def lstat(self, remote_path):
+        """Get metadata for file on the remote machine.
+
+        If remote path is a symbolic link, examine the link.
+
+        :param remote_path: Path to file
+        :returns: ChirpStat of file metadata
+
+        """
+
+        return await self._stat(_command("lstat",
+            remote_path), ChirpStat)
+
+    async def statfs(self, remote_path):
+        """Get metadata for a file system on the remote machine.
+
+        :param remote_path: Path to examine
+        :returns: ChirpStatFS of filesystem metadata
+
+        """
+
+        return await self._stat(_command("statfs",
+            remote_path), ChirpStatFS)
+
+    async def access(self, remote_path, mode_str):
+        """Check access permissions.
+
+        :param remote_path: Path to examine
+        :param mode_str: Mode to check (one or more of 'frwx')
+        :raises NotAuthorized: If any access mode is not authorized
+
+        """
+
+        mode = HTChirp._access_mode(mode_str)
+
+        await self._simple(_command("access",
+            remote_path,
+            int(mode)))
+
+    async def chmod(self, remote_path, mode):
+        """Change permission mode of a path on the remote machine.
+
+        :param remote_path: Path
+        :param mode: Permission mode to set
+
+        """
+
+        await self._simple(_command("chmod",
+            remote_path,
+            int(mode)))
+
+    async def chown(self, remote_path, uid, gid):
+        """Change the UID and/or GID of a path on the remote machine.
+
+        :param remote_path: Path
+        :param uid: UID
+        :param gid: GID
+
+        """
+
+        await self._simple(_command("chown",
+            remote_path,
+            int(uid),
+            int(gid)))
+
+    async def lchown(self, remote_path, uid, gid):
+        """Changes the ownership of a file or directory.
+
+        :param remote_path: Path
+        :param uid: UID
+        :param gid: GID
+
+        """
+
+        await self._simple(_command("lchown",
+            remote_path,
+            int(uid),
+            int(gid)))
+
+    async def truncate(self, remote_path, length):
+        """Truncates a file on the remote machine to a given number of bytes.
+
+        :param remote_path: Path to file
+        :param length: Truncated length
+
+        """
+
+        await self._simple(_command("truncate",
+            remote_path,
+            int(length)))
+
+    async def utime(self, remote_path, actime, mtime):
+        """Change the access and modification times of a file
+        on the remote machine.
+
+        :param remote_path: Path to file
+        :param actime: Access time, in seconds (Unix epoch)
+        :param mtime: Modification time, in seconds (Unix epoch)
+
+        """
+
+        await self._simple(_command("utime",
+            remote_path,
+            int(actime),
+            int(mtime)))
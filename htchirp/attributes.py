@@ -0,0 +1,210 @@
+import socket
+import threading
+import collections
+
+from .htchirp import HTChirp, _monotonic
+
+
+class JobAttributes(object):
+    """Cached, write-coalescing access to the job ClassAd attributes
+
+    Reads are answered from a cache for ttl seconds. Writes are queued and
+    only the last value of each attribute is sent when the queue is flushed,
+    with all attributes pipelined in one batch. A background thread flushes
+    the queue every flush_interval seconds::
+
+        with JobAttributes(HTChirp(), flush_interval = 5) as attrs:
+            for step in range(1000):
+                attrs['ChirpStep'] = str(step)
+                attrs['Progress'] = str(step / 1000.0)
+
+    Attributes whose names start with delayed_prefix are sent with
+    set_job_attr_delayed, which the starter passes on with its next update
+    instead of right away (HTCondor only accepts delayed updates for
+    attributes matching CHIRP_DELAYED_UPDATE_PREFIX, 'Chirp*' by default).
+
+    The HTChirp client is owned by this object and must not be used by other
+    threads while it is.
+
+    """
+
+    def __init__(self, chirp, ttl = 30.0, flush_interval = 5.0,
+                     delayed_prefix = "Chirp"):
+        """Job attribute cache initialization
+
+        :param chirp: The HTChirp client to send the commands with
+        :param ttl: Seconds a value read from the job ClassAd stays valid
+        :param flush_interval: Seconds between flushes by the background
+            thread, None to only flush when flush() or close() is called
+        :param delayed_prefix: Attributes starting with this prefix (ignoring
+            case) are sent with set_job_attr_delayed, None to never use it
+
+        """
+
+        self.closed = False
+        self.sent = 0 # number of attribute values sent
+        self.coalesced = 0 # number of values replaced before they were sent
+        self.errors = [] # errors raised by background flushes
+        self._chirp = chirp
+        self._ttl = ttl
+        self._delayed_prefix = delayed_prefix
+        self._values = {} # attribute -> (value, expiry time)
+        self._pending = collections.OrderedDict() # attribute -> (value, delayed)
+        self._lock = threading.Lock() # guards the state above
+        self._io_lock = threading.Lock() # guards the client
+        self._stop = threading.Event()
+
+        self._flusher = None
+        if flush_interval is not None:
+            self._flusher = threading.Thread(target = self._flush_loop,
+                                                 args = (flush_interval,))
+            self._flusher.daemon = True
+            self._flusher.start()
+
+    def __repr__(self):
+        """Print a representation of this object"""
+        return "{0}({1} cached, {2} pending)".format(
+            self.__class__.__name__,
+            len(self._values),
+            len(self._pending))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getitem__(self, job_attribute):
+        return self.get(job_attribute)
+
+    def __setitem__(self, job_attribute, attribute_value):
+        self.set(job_attribute, attribute_value)
+
+    def _is_delayed(self, job_attribute):
+        return (self._delayed_prefix is not None and
+                    job_attribute.lower().startswith(
+                        self._delayed_prefix.lower()))
+
+    def _flush_loop(self, interval):
+        """Flush the queued values every interval seconds until closed"""
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                with self._lock:
+                    self.errors.append(e)
+
+    def get(self, job_attribute):
+        """Get the value of a job ClassAd attribute
+
+        Values that were set but not sent yet are returned as set.
+
+        :param job_attribute: The job attribute to query
+        :returns: The value of the job attribute as a string
+
+        """
+
+        now = _monotonic()
+        with self._lock:
+            if job_attribute in self._pending:
+                return self._pending[job_attribute][0]
+            (value, expiry) = self._values.get(job_attribute, (None, now))
+            if expiry > now:
+                return value
+
+        with self._io_lock:
+            value = self._chirp.get_job_attr(job_attribute)
+        with self._lock:
+            self._values[job_attribute] = (value, _monotonic() + self._ttl)
+        return value
+
+    def set(self, job_attribute, attribute_value, delayed = None):
+        """Queue a new value for a job ClassAd attribute
+
+        :param job_attribute: The job attribute to set
+        :param attribute_value: The job attribute's new value
+        :param delayed: If set to True, send it with set_job_attr_delayed
+            [default: if the attribute starts with delayed_prefix]
+
+        """
+
+        if self.closed:
+            raise ValueError("The job attributes are closed.")
+        if delayed == None:
+            delayed = self._is_delayed(job_attribute)
+        with self._lock:
+            if self._pending.pop(job_attribute, None) is not None:
+                self.coalesced += 1
+            self._pending[job_attribute] = (attribute_value, delayed)
+            self._values[job_attribute] = (attribute_value,
+                                               _monotonic() + self._ttl)
+
+    def invalidate(self, job_attribute = None):
+        """Forget cached values, so they are read again
+
+        :param job_attribute: The job attribute to forget [default: all]
+
+        """
+
+        with self._lock:
+            if job_attribute is None:
+                self._values.clear()
+            else:
+                self._values.pop(job_attribute, None)
+
+    def flush(self):
+        """Send all queued values in one pipelined batch
+
+        Values that could not be sent because the connection broke (or with
+        TryAgain) are queued again, unless a newer value was set in the
+        meantime.
+
+        :raises ChirpError: The first error returned by the server, after the
+            other values were sent
+
+        """
+
+        with self._io_lock:
+            with self._lock:
+                (pending, self._pending) = (self._pending,
+                                                collections.OrderedDict())
+            if not pending:
+                return
+
+            batch = self._chirp.batch(raise_errors = False)
+            for (job_attribute, (value, delayed)) in pending.items():
+                if delayed:
+                    batch.set_job_attr_delayed(job_attribute, value)
+                else:
+                    batch.set_job_attr(job_attribute, value)
+            try:
+                results = batch.execute()
+            except (socket.error, RuntimeError):
+                with self._lock:
+                    for (job_attribute, item) in pending.items():
+                        self._pending.setdefault(job_attribute, item)
+                raise
+
+        error = None
+        with self._lock:
+            for (job_attribute, result) in zip(pending, results):
+                if result.exception() is None:
+                    self.sent += 1
+                elif isinstance(result.exception(), HTChirp.TryAgain):
+                    self._pending.setdefault(job_attribute,
+                                                 pending[job_attribute])
+                else: # the server rejected it, so the cached value is wrong
+                    self._values.pop(job_attribute, None)
+                    error = error or result.exception()
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Stop the background thread and send the queued values"""
+        if self.closed:
+            return
+        self.closed = True
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
@@ -0,0 +1,136 @@
+import threading
+import posixpath
+import collections
+
+from .htchirp import _monotonic
+
+
+class MetadataCache(object):
+    """Thread-safe LRU cache for file metadata from a Chirp server
+
+    An HTChirp client created with a cache answers repeated stat, lstat,
+    getdir, getlongdir and access calls from memory::
+
+        chirp = HTChirp(cache = MetadataCache(size = 4096, ttl = 10))
+
+    Entries expire ttl seconds after they were stored, and the least recently
+    used entries are dropped once there are more than `size`. Calls that
+    change files on the remote machine invalidate the affected paths and
+    their parent directories. Changes made by other clients are only seen
+    once the entries have expired.
+
+    A cache may be shared by several clients for the same server (clients
+    created by HTChirp.open() and ChirpPool share the cache of their
+    template).
+
+    """
+
+    def __init__(self, size = 1024, ttl = 5.0):
+        """Metadata cache initialization
+
+        :param size: Maximum number of entries
+        :param ttl: Seconds an entry stays valid
+
+        """
+
+        self.hits = 0
+        self.misses = 0
+        self._size = max(1, int(size))
+        self._ttl = ttl
+        self._entries = collections.OrderedDict() # key -> (value, expiry time)
+        self._paths = collections.defaultdict(set) # path -> keys
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """Print a representation of this object"""
+        return "{0}({1} entries, {2} hits, {3} misses)".format(
+            self.__class__.__name__,
+            len(self._entries),
+            self.hits,
+            self.misses)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(command, path, args):
+        return (command, posixpath.normpath(path), args)
+
+    def _remove(self, key):
+        """Remove an entry, must be called with the lock held"""
+        del self._entries[key]
+        keys = self._paths[key[1]]
+        keys.discard(key)
+        if not keys:
+            del self._paths[key[1]]
+
+    def get(self, command, path, args = None):
+        """Look up the result of a command
+
+        :param command: Name of the command (e.g. 'stat')
+        :param path: Path the command was run on
+        :param args: Other arguments of the command, if any
+        :returns: (True, result) if the result is cached, otherwise
+            (False, None)
+
+        """
+
+        key = self._key(command, path, args)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                if entry[1] > _monotonic():
+                    self._entries[key] = entry # most recently used
+                    self.hits += 1
+                    return (True, entry[0])
+                self._entries[key] = entry
+                self._remove(key)
+            self.misses += 1
+            return (False, None)
+
+    def put(self, command, path, result, args = None, ttl = None):
+        """Store the result of a command
+
+        :param command: Name of the command (e.g. 'stat')
+        :param path: Path the command was run on
+        :param result: The result to store
+        :param args: Other arguments of the command, if any
+        :param ttl: Seconds the result stays valid [default: the cache's ttl]
+
+        """
+
+        if ttl == None:
+            ttl = self._ttl
+        key = self._key(command, path, args)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, _monotonic() + ttl)
+            self._paths[key[1]].add(key)
+            while len(self._entries) > self._size:
+                self._remove(next(iter(self._entries))) # least recently used
+
+    def invalidate(self, path, recursive = False):
+        """Remove the cached results for a path and its parent directory
+
+        :param path: Path that was changed
+        :param recursive: If set to True, also remove the results for
+            everything below path
+
+        """
+
+        path = posixpath.normpath(path)
+        paths = set([path, posixpath.dirname(path) or "."])
+        with self._lock:
+            if recursive:
+                prefix = path.rstrip("/") + "/"
+                paths.update(p for p in self._paths if p.startswith(prefix))
+            for p in paths:
+                for key in list(self._paths.get(p, ())):
+                    self._remove(key)
+
+    def clear(self):
+        """Remove all cached results"""
+        with self._lock:
+            self._entries.clear()
+            self._paths.clear()
@@ -0,0 +1,226 @@
+import atexit
+import threading
+import collections
+
+from .htchirp import HTChirp, _monotonic
+
+
+class EventEmitter(object):
+    """Send ulog and phase messages from a background thread
+
+    ulog() and phase() only queue the message and return right away. A
+    background thread sends the queued messages in pipelined batches over one
+    persistent session, at most `rate` messages per second::
+
+        events = EventEmitter(HTChirp(), rate = 2)
+        for step in range(100000):
+            events.ulog('Finished step {0}'.format(step))
+        events.close()
+
+    At most max_pending messages are queued. When the queue is full, a new
+    ulog message is appended to the last queued one if overflow is 'merge'
+    (or replaces it if overflow is 'drop'), and a new phase replaces the last
+    queued phase. The number of messages handled this way is counted in
+    merged and dropped (a replaced message counts as dropped together with
+    the messages merged into it). Messages still queued are sent when the
+    emitter is closed, at the latest when the interpreter exits.
+
+    """
+
+    def __init__(self, chirp, rate = 10.0, max_pending = None,
+                     overflow = "merge", separator = "; "):
+        """Event emitter initialization
+
+        :param chirp: An HTChirp client for the server, used as a template for
+            the background thread's client
+        :param rate: Maximum messages sent per second, None for no limit
+        :param max_pending: Maximum number of queued messages
+            [default: rate, at least 1, or 100 without a rate limit]
+        :param overflow: What to do with ulog messages when the queue is full,
+            'merge' to join them with the last queued message or 'drop' to
+            replace it
+        :param separator: Separator for merged messages
+
+        """
+
+        if overflow not in ("merge", "drop"):
+            raise ValueError("overflow must be 'merge' or 'drop'")
+        if max_pending == None:
+            max_pending = 100 if rate is None else int(rate)
+
+        self.closed = False
+        self.sent = 0 # number of messages sent
+        self.merged = 0 # number of messages merged into another one
+        self.dropped = 0 # number of messages that were not sent
+        self.failed = 0 # number of messages lost on errors
+        self.errors = [] # errors raised while sending
+        self._rate = rate
+        self._max_pending = max(1, int(max_pending))
+        self._overflow = overflow
+        self._separator = separator
+        self._queue = collections.deque() # [command, text, messages joined]
+        self._sending = 0 # number of messages taken from the queue
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target = self._run,
+                                            args = (chirp._clone(),))
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __repr__(self):
+        """Print a representation of this object"""
+        return "{0}({1} sent, {2} merged, {3} dropped, {4} pending)".format(
+            self.__class__.__name__,
+            self.sent,
+            self.merged,
+            self.dropped,
+            len(self._queue))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _put(self, command, text):
+        """Queue a message, merging or dropping messages if the queue is full"""
+
+        if self.closed:
+            raise ValueError("The event emitter is closed.")
+        with self._condition:
+            queue = self._queue
+            if len(queue) >= self._max_pending:
+                last = None
+                for message in reversed(queue):
+                    if message[0] == command:
+                        last = message
+                        break
+                if last is not None:
+                    merged = last[1] + self._separator + text
+                    # leave room for quoting, the command must fit in a line
+                    if (command == "ulog" and self._overflow == "merge" and
+                            len(merged) < HTChirp.CHIRP_LINE_MAX // 2):
+                        last[1] = merged
+                        last[2] += 1
+                        self.merged += 1
+                    else:
+                        # the messages merged into it are lost as well
+                        self.merged -= last[2] - 1
+                        self.dropped += last[2]
+                        last[1:] = [text, 1]
+                    return
+                # no message to merge with, drop the oldest
+                (_, _, count) = queue.popleft()
+                self.merged -= count - 1
+                self.dropped += count
+            queue.append([command, text, 1])
+            self._condition.notify_all()
+
+    def ulog(self, text):
+        """Queue a message for the user log
+
+        :param text: Message to log
+
+        """
+
+        self._put("ulog", text)
+
+    def phase(self, phasestring):
+        """Queue a new job phase
+
+        :param phasestring: New phase
+
+        """
+
+        self._put("phase", phasestring)
+
+    def _run(self, chirp):
+        """Send queued messages until the emitter is closed"""
+
+        tokens = burst = float(self._max_pending)
+        last_time = _monotonic()
+        chirp._persistent = True # one session, connected when needed
+        try:
+            while True:
+                with self._condition:
+                    while not self._queue and not self.closed:
+                        self._condition.wait()
+                    if not self._queue:
+                        break
+                    if self._rate is not None and not self.closed:
+                        now = _monotonic()
+                        tokens = min(burst,
+                                         tokens + (now - last_time) * self._rate)
+                        last_time = now
+                        if tokens < 1:
+                            self._condition.wait((1 - tokens) / self._rate)
+                            continue
+                        count = int(tokens)
+                        tokens -= min(count, len(self._queue))
+                    else:
+                        count = len(self._queue)
+                    messages = [self._queue.popleft()
+                                    for _ in range(min(count, len(self._queue)))]
+                    self._sending = len(messages)
+
+                try:
+                    batch = chirp.batch(raise_errors = False)
+                    for (command, text, _) in messages:
+                        getattr(batch, command)(text)
+                    results = batch.execute()
+                except Exception as e:
+                    (sent, failed, error) = (0, len(messages), e)
+                else:
+                    errors = [r.exception() for r in results
+                                  if r.exception() is not None]
+                    (sent, failed) = (len(messages) - len(errors), len(errors))
+                    error = errors[0] if errors else None
+
+                with self._condition:
+                    self.sent += sent
+                    self.failed += failed
+                    if error is not None:
+                        self.errors.append(error)
+                    self._sending = 0
+                    self._condition.notify_all()
+        finally:
+            chirp.__exit__(None, None, None)
+
+    def flush(self, timeout = None):
+        """Wait until all queued messages are sent
+
+        :param timeout: Maximum seconds to wait, None to wait forever
+        :returns: True if all messages were sent
+
+        """
+
+        deadline = None if timeout is None else _monotonic() + timeout
+        with self._condition:
+            while self._queue or self._sending:
+                if not self._thread.is_alive():
+                    return False
+                if deadline is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline - _monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout = None):
+        """Send the queued messages, ignoring the rate, and stop the thread
+
+        :param timeout: Maximum seconds to wait, None to wait forever
+
+        """
+
+        with self._condition:
+            if self.closed:
+                return
+            self.closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        if hasattr(atexit, "unregister"):
+            atexit.unregister(self.close)
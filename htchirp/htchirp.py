@@ -1,7 +1,29 @@
+import io
 import re
+import array
 import os
+import copy
 import stat
+import posixpath
+import time
+import select
 import socket
+import numbers
+import functools
+import binascii
+import mmap
+import threading
+import collections
+
+from .metrics import _CommandTimer, _MeteredSocket
+
+# monotonic clock for transfer rates, if available
+_monotonic = getattr(time, "monotonic", time.time)
+
+# characters that must be escaped in Chirp simple commands, with their escapes
+# (the backslash goes first, so the added backslashes are not escaped again)
+_QUOTE_TABLE = tuple((c, "\\" + c) for c in ("\\", " ", "\n", "\t", "\r"))
+_UNQUOTE_RE = re.compile(r"\\(.)", re.DOTALL)
 
 # In the HTCondor implementation, this quoting method is used
 def quote(chirp_string):
@@ -13,14 +35,641 @@ def quote(chirp_string):
 
     """
 
-    # '\\', ' ', '\n', '\t', '\r' must be escaped
-    escape_chars = ["\\", " ", "\n", "\t", "\r"]
-    escape_re = "(" + "|".join([re.escape(x) for x in escape_chars]) + ")"
-    escape = re.compile(escape_re)
-
     # prepend escaped characters with \\
-    replace = lambda matchobj: "\\" + matchobj.group(0)
-    return escape.sub(replace, chirp_string)
+    for (char, escaped) in _QUOTE_TABLE:
+        if char in chirp_string:
+            chirp_string = chirp_string.replace(char, escaped)
+    return chirp_string
+
+
+def unquote(chirp_string):
+    """
+    Reverses quote()
+
+    :param chirp_string: the escaped string
+    :returns: unescaped string
+
+    """
+
+    if "\\" not in chirp_string:
+        return chirp_string
+    return _UNQUOTE_RE.sub(lambda match: match.group(1), chirp_string)
+
+
+def _command(name, *args):
+    """
+    Builds a Chirp simple command
+
+    :param name: the command name
+    :param args: the arguments, strings (quoted) or integers
+    :returns: the command line as bytes, terminated with a newline
+    :raises TypeError: if an argument is neither a string nor an integer
+
+    """
+
+    parts = [name]
+    for arg in args:
+        if isinstance(arg, str):
+            parts.append(quote(arg))
+        elif isinstance(arg, numbers.Integral) and not isinstance(arg, bool):
+            parts.append(str(int(arg)))
+        else:
+            raise TypeError(
+                "Chirp command arguments must be strings or integers, "
+                "not {0}".format(type(arg).__name__))
+    return (" ".join(parts) + "\n").encode()
+
+
+# commands whose first argument is a path (or a job attribute), and commands
+# whose first argument is a file descriptor, for error messages
+_PATH_COMMANDS = frozenset([
+    "open", "getfile", "putfile", "getdir", "getlongdir", "rename", "unlink",
+    "rmdir", "rmall", "mkdir", "link", "symlink", "readlink", "stat", "lstat",
+    "statfs", "access", "chmod", "chown", "lchown", "truncate", "utime",
+    "get_job_attr", "get_job_attr_delayed",
+    "set_job_attr", "set_job_attr_delayed"])
+_FD_COMMANDS = frozenset([
+    "close", "read", "pread", "sread", "write", "pwrite", "swrite",
+    "fsync", "lseek"])
+_ARGUMENT_RE = re.compile(r"(?:\\.|[^\\ \n])*", re.DOTALL)
+
+
+def _command_info(command, fds = None):
+    """
+    Get the name and path of a Chirp simple command, for error messages
+
+    :param command: the command line as bytes
+    :param fds: open file descriptors, to look up the path of fd commands
+    :returns: (name, path), path is None if the command has none
+
+    """
+
+    if not command:
+        return (None, None)
+    (name, _, arguments) = command.decode().partition(" ")
+    name = name.rstrip("\n")
+    argument = _ARGUMENT_RE.match(arguments).group(0)
+    if name in _PATH_COMMANDS:
+        return (name, unquote(argument))
+    if name in _FD_COMMANDS and fds and argument.isdigit():
+        file_info = fds.get(int(argument))
+        if file_info is not None:
+            return (name, unquote(file_info[0]))
+    return (name, None)
+
+
+def _find_chirp_server(host, port, auth, cookie):
+    """
+    Find the host, port, and cookie of the Chirp server
+
+    If host and port are not given, they are read from
+    $_CONDOR_SCRATCH_DIR/.chirp.config along with the cookie.
+
+    :param host: the hostname or ip of the Chirp server
+    :param port: the port of the Chirp server
+    :param auth: a list of authentication methods to try
+    :param cookie: the cookie string, if trying cookie authentication
+    :returns: tuple of host, port, and cookie
+
+    """
+
+    chirp_config = ".chirp.config"
+    try:
+        chirp_config = os.path.join(
+            os.environ["_CONDOR_SCRATCH_DIR"], chirp_config)
+    except KeyError:
+        pass
+
+    if (host and port): # don't read chirp_config if host and port are set
+        pass
+    elif (("cookie" in auth)
+              and (not cookie)
+              and os.path.isfile(chirp_config)): # read chirp_config
+        try:
+            with open(chirp_config, "r") as f:
+                (host, port, cookie) = f.read().rstrip().split()
+        except Exception:
+            print("Error reading {0}".format(chirp_config))
+            raise
+    else:
+        raise ValueError((".chirp.config must be present "
+                              "or you must provide a host and port"))
+
+    return (host, port, cookie)
+
+
+def _parse_stat(record, result):
+    """
+    Parse stat data sent by the Chirp server
+
+    :param record: the type of record to parse (ChirpStat or ChirpStatFS)
+    :param result: the stat fields as a string of integers
+    :returns: the record
+
+    """
+
+    return record._from_chirp([int(x) for x in result.split()])
+
+
+def _exchange(method):
+    """
+    Decorator for the HTChirp methods that send to or receive from the server
+
+    If the method fails with anything but a ChirpError (a timeout, a local
+    I/O error, KeyboardInterrupt...), the command may only be partly sent or
+    its response partly read, so the connection is dropped instead of being
+    reused for the next command.
+
+    :param method: the method to wrap
+    :returns: the wrapped method
+
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        except self.ChirpError:
+            raise
+        except BaseException:
+            self._drop_connection()
+            raise
+    return wrapper
+
+
+class _SocketReader(object):
+    """Buffered reader for data received from the Chirp server
+
+    Data is received into a reusable buffer, from which response lines and
+    fixed-length payloads are extracted. Anything the server sends beyond the
+    current response stays in the buffer for the next read, so data is never
+    dropped or read twice.
+
+    """
+
+    def __init__(self, size):
+        """Buffered reader initialization
+
+        :param size: Size of the receive buffer, in bytes
+
+        """
+
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._start = 0 # position of the first unread byte
+        self._end = 0 # position after the last received byte
+        self._socket = None
+        self.consumed = 0 # number of bytes read, in total
+
+    def __len__(self):
+        """Number of received bytes that have not been read yet"""
+        return self._end - self._start
+
+    def reset(self, sock):
+        """Discard buffered data and read from a new socket
+
+        :param sock: The socket to read from
+
+        """
+
+        self._start = self._end = 0
+        self._socket = sock
+
+    def _fill(self):
+        """Receive more data from the socket into the buffer
+
+        :raises RuntimeError: If the connection is broken
+
+        """
+
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._end == len(self._buffer):
+            # move the unread data to the front of the buffer
+            unread = self._end - self._start
+            self._view[:unread] = self._view[self._start:self._end]
+            (self._start, self._end) = (0, unread)
+
+        received = self._socket.recv_into(self._view[self._end:])
+        if received == 0:
+            raise RuntimeError("Connection to the Chirp server is broken.")
+        self._end += received
+
+    def readline(self, limit = None):
+        """Read one line, including the terminating newline
+
+        :param limit: Maximum length of the line [default: buffer size]
+        :returns: The line
+        :raises EnvironmentError: If the line is longer than limit
+
+        """
+
+        if limit == None:
+            limit = len(self._buffer)
+
+        while True:
+            newline = self._buffer.find(b"\n", self._start, self._end)
+            if newline >= 0:
+                line = self._view[self._start:newline + 1].tobytes()
+                self._start = newline + 1
+                self.consumed += len(line)
+                return line
+            if self._end - self._start >= limit:
+                raise EnvironmentError(
+                    "The server responded with too much data.")
+            self._fill()
+
+    def read(self, length):
+        """Read a fixed amount of data
+
+        :param length: Number of bytes to read
+        :returns: The data
+
+        """
+
+        data = bytearray(length)
+        self.readinto(data)
+        return bytes(data)
+
+    def readinto(self, buf, chunk_size = None):
+        """Fill a buffer with a fixed amount of data
+
+        Buffered data is copied first, the rest is received from the socket
+        directly into buf.
+
+        :param buf: A writable buffer, filled completely
+        :param chunk_size: Maximum number of bytes to receive per call
+        :returns: Number of bytes read
+
+        """
+
+        view = memoryview(buf)
+        if view.itemsize != 1 or view.ndim != 1:
+            view = view.cast("B")
+        length = len(view)
+        if chunk_size == None:
+            chunk_size = length
+
+        self.consumed += length
+
+        # use up the buffered data
+        pos = min(length, self._end - self._start)
+        view[:pos] = self._view[self._start:self._start + pos]
+        self._start += pos
+
+        # receive the rest without copying
+        while pos < length:
+            received = self._socket.recv_into(view[pos:pos + chunk_size])
+            if received == 0:
+                raise RuntimeError("Connection to the Chirp server is broken.")
+            pos += received
+        return length
+
+
+class ChirpFileIO(io.RawIOBase):
+    """Raw file object for a file on the Chirp server
+
+    Reads and writes go through a single remote file descriptor using pread
+    and pwrite at the current position, so seek() and tell() only need a
+    round trip to the server when seeking relative to the end of the file.
+
+    Use HTChirp.open() to get a buffered file object wrapping this class.
+
+    """
+
+    def __init__(self, chirp, remote_path, flags, permissions = None):
+        """Open a file on the Chirp server
+
+        :param chirp: An HTChirp client in a persistent session, owned by this
+            file object from now on
+        :param remote_path: Path to file
+        :param flags: File open modes (one or more of 'rwatcx')
+        :param permissions: Permission mode to set [default: 0777]
+
+        """
+
+        io.RawIOBase.__init__(self)
+        self.name = remote_path
+        self._chirp = chirp
+        self._fd = None
+        flags = set(flags)
+        self._readable = "r" in flags
+        self._writable = "w" in flags
+        self._append = "a" in flags
+
+        self._fd = chirp._open(remote_path, flags, permissions)
+        if self._writable:
+            chirp._invalidate([remote_path])
+        if self._append:
+            self._pos = chirp._lseek(self._fd, 0, os.SEEK_END)
+        else:
+            self._pos = 0
+
+    def _check_open(self):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+
+    def _remote_fd(self):
+        """The remote file descriptor, unless its connection was dropped
+
+        A call interrupted in the middle of a transfer drops the connection,
+        and the file descriptor is lost with it.
+
+        """
+
+        if self._fd not in self._chirp.fds:
+            raise RuntimeError("Connection to the Chirp server is broken.")
+        return self._fd
+
+    def readable(self):
+        self._check_open()
+        return self._readable
+
+    def writable(self):
+        self._check_open()
+        return self._writable
+
+    def seekable(self):
+        self._check_open()
+        return True
+
+    def readinto(self, b):
+        """Read up to len(b) bytes at the current position into b
+
+        :param b: Writable buffer
+        :returns: Number of bytes read, 0 at end of file
+
+        """
+
+        self._check_open()
+        if not self._readable:
+            raise io.UnsupportedOperation("File not open for reading")
+        view = memoryview(b)
+        if view.itemsize != 1 or view.ndim != 1:
+            view = view.cast("B")
+        rb = self._chirp._read(self._remote_fd(), len(view), self._pos,
+                                   buf = view)
+        self._pos += rb
+        return rb
+
+    def readall(self):
+        """Read until the end of the file in large chunks
+
+        :returns: Data read from file
+
+        """
+
+        chunks = []
+        while True:
+            data = self.read(HTChirp.CHIRP_CHUNK_SIZE)
+            if not data:
+                break
+            chunks.append(data)
+        return b"".join(chunks)
+
+    def write(self, b):
+        """Write b at the current position (or the end, in append mode)
+
+        :param b: Bytes to write
+        :returns: Number of bytes written
+
+        """
+
+        self._check_open()
+        if not self._writable:
+            raise io.UnsupportedOperation("File not open for writing")
+        length = memoryview(b).nbytes
+        if self._append:
+            wb = self._chirp._write(self._remote_fd(), b, length)
+        else:
+            wb = self._chirp._write(self._remote_fd(), b, length, self._pos)
+        self._pos += wb
+        return wb
+
+    def seek(self, offset, whence = io.SEEK_SET):
+        """Change the current position
+
+        :param offset: Number of bytes to move the position
+        :param whence: Where to base the offset from
+        :returns: New position
+
+        """
+
+        self._check_open()
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._chirp._lseek(self._remote_fd(), offset, io.SEEK_END)
+        else:
+            raise ValueError("Invalid whence ({0})".format(whence))
+        if pos < 0:
+            raise ValueError("Negative seek position {0}".format(pos))
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        self._check_open()
+        return self._pos
+
+    def truncate(self, size = None):
+        """Truncate the file to size bytes [default: current position]
+
+        :returns: New size
+
+        """
+
+        self._check_open()
+        if size == None:
+            size = self._pos
+        self._chirp.truncate(self.name, size)
+        return size
+
+    def fsync(self):
+        """Flush data written to the file to disk on the remote machine"""
+        self._check_open()
+        self._chirp._fsync(self._remote_fd())
+
+    def close(self):
+        """Close the remote file and the connection used for it"""
+        if self.closed:
+            return
+        try:
+            io.RawIOBase.close(self)
+            if self._fd is not None and self._fd in self._chirp.fds:
+                self._chirp._close(self._fd)
+        finally:
+            if self._writable:
+                self._chirp._invalidate([self.name])
+            self._chirp.__exit__(None, None, None)
+
+
+class _ChirpRecord(object):
+    """Lookup of record fields by the names used in the Chirp protocol
+
+    Stat results used to be returned as dicts keyed on these names, so
+    record["size"] and dict(record) still work.
+
+    """
+
+    __slots__ = ()
+
+    _chirp_names = () # names of the fields, in the order sent by the server
+    _chirp_order = () # position of each field in the data sent by the server
+
+    @classmethod
+    def _from_chirp(cls, values):
+        """Create a record from the integers sent by the server"""
+        return tuple.__new__(cls, [values[i] for i in cls._chirp_order])
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                key = self._chirp_order.index(self._chirp_names.index(key))
+            except ValueError:
+                raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        """Names of the fields used in the Chirp protocol"""
+        return list(self._chirp_names)
+
+    def get(self, key, default = None):
+        """Look up a field by its Chirp name, like dict.get()"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class ChirpStat(_ChirpRecord, collections.namedtuple("ChirpStat", [
+        "st_mode", "st_ino", "st_dev", "st_nlink", "st_uid", "st_gid",
+        "st_size", "st_atime", "st_mtime", "st_ctime",
+        "st_blksize", "st_blocks", "st_rdev"])):
+    """Metadata of a file on the Chirp server
+
+    The fields have the names and (up to st_ctime) the order of
+    os.stat_result. Times are whole seconds.
+
+    """
+
+    __slots__ = ()
+
+    _chirp_names = ("device", "inode", "mode", "nlink", "uid", "gid",
+                        "rdevice", "size", "blksize", "blocks",
+                        "atime", "mtime", "ctime")
+    _chirp_order = (2, 1, 0, 3, 4, 5, 7, 10, 11, 12, 8, 9, 6)
+
+
+class ChirpStatFS(_ChirpRecord, collections.namedtuple("ChirpStatFS", [
+        "f_type", "f_bsize", "f_blocks", "f_bfree", "f_bavail",
+        "f_files", "f_ffree"])):
+    """Metadata of a file system on the Chirp server"""
+
+    __slots__ = ()
+
+    _chirp_names = ("f_type", "f_bsize", "f_blocks", "f_bfree", "f_bavail",
+                        "f_files", "f_free")
+    _chirp_order = (0, 1, 2, 3, 4, 5, 6)
+
+
+class ChirpListing(object):
+    """Directory listing with the file metadata stored column-wise
+
+    Each ChirpStat field is kept in an array of integers (e.g.
+    listing.st_size), together with the list of names, instead of one record
+    per file. Indexing or iterating the listing gives (name, ChirpStat) pairs.
+
+    """
+
+    def __init__(self):
+        self.names = []
+        for field in ChirpStat._fields:
+            setattr(self, field, array.array("q"))
+
+    def __repr__(self):
+        return "<{0} of {1} entries>".format(
+            self.__class__.__name__, len(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        return (self.names[index],
+                    ChirpStat(*[getattr(self, field)[index]
+                                    for field in ChirpStat._fields]))
+
+    def __iter__(self):
+        for index in range(len(self.names)):
+            yield self[index]
+
+    def copy(self):
+        """Copy the listing
+
+        :returns: A new ChirpListing with copies of the names and columns
+
+        """
+
+        listing = self.__class__()
+        listing.names = list(self.names)
+        for field in ChirpStat._fields:
+            setattr(listing, field, array.array("q", getattr(self, field)))
+        return listing
+
+    def append(self, name, stat_result):
+        """Add an entry
+
+        :param name: Name of the file
+        :param stat_result: A ChirpStat for the file
+
+        """
+
+        self.names.append(name)
+        for (field, value) in zip(ChirpStat._fields, stat_result):
+            getattr(self, field).append(value)
+
+
+class ChirpDirEntry(object):
+    """Directory entry on the Chirp server, as yielded by HTChirp.scandir()
+
+    Like os.DirEntry, but the metadata was already sent with the directory
+    listing, so none of the methods contact the server.
+
+    """
+
+    __slots__ = ("name", "path", "_stat")
+
+    def __init__(self, name, path, stat_result):
+        self.name = name
+        self.path = path
+        self._stat = stat_result
+
+    def __repr__(self):
+        return "<{0} {1!r}>".format(self.__class__.__name__, self.name)
+
+    def __fspath__(self):
+        return self.path
+
+    def inode(self):
+        """Inode number of the entry"""
+        return self._stat.st_ino
+
+    def is_dir(self):
+        """Check if the entry is a directory"""
+        return stat.S_ISDIR(self._stat.st_mode)
+
+    def is_file(self):
+        """Check if the entry is a regular file"""
+        return stat.S_ISREG(self._stat.st_mode)
+
+    def is_symlink(self):
+        """Check if the entry is a symbolic link"""
+        return stat.S_ISLNK(self._stat.st_mode)
+
+    def stat(self):
+        """Metadata of the entry, as a ChirpStat"""
+        return self._stat
 
 
 class HTChirp:
@@ -33,17 +682,36 @@ class HTChirp:
     $_CONDOR_SCRATCH_DIR/.chirp.config contains the host, port, and cookie for
     connecting to the embedded chirp proxy.
 
+    By default every method opens a new connection to the Chirp server and
+    closes it when done. Using the client as a context manager keeps a single
+    authenticated connection open for the duration of the block, reconnecting
+    transparently if the server drops it::
+
+        with HTChirp() as chirp:
+            chirp.set_job_attr('Progress', '1')
+            chirp.stat('/tmp/my-job-output')
+
     """
 
     ## static reference variables
 
     CHIRP_LINE_MAX = 1024
+    CHIRP_BUFFER_SIZE = 65536
+    CHIRP_CHUNK_SIZE = 1048576
     CHIRP_AUTH_METHODS = ["cookie"]
     #CHIRP_AUTH_METHODS = ["cookie", "hostname", "unix", "kerberos", "globus"]
     DEFAULT_MODE = (
         (stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH) |
         (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH) |
         (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH) )
+    STAT_NAMES = list(ChirpStat._chirp_names)
+    STATFS_NAMES = list(ChirpStatFS._chirp_names)
+    ACCESS_MODES = {
+        "f": 0,
+        "r": stat.S_IROTH,
+        "w": stat.S_IWOTH,
+        "x": stat.S_IXOTH
+        }
 
 
     ## initialize
@@ -53,7 +721,9 @@ class HTChirp:
                      port = None,
                      auth = ["cookie"],
                      cookie = None,
-                     timeout = 10):
+                     timeout = 10,
+                     cache = None,
+                     observer = None):
         """Chirp client initialization
 
         :param host: the hostname or ip of the Chirp server
@@ -61,33 +731,32 @@ class HTChirp:
         :param auth: a list of authentication methods to try
         :param cookie: the cookie string, if trying cookie authentication
         :param timeout: socket timeout, in seconds
+        :param cache: a MetadataCache for stat, lstat, getdir, getlongdir and
+            access results, or True to create one with the default settings
+        :param observer: a function called with a ChirpEvent after each
+            command, e.g. a ChirpMetrics
 
         """
 
         # initialize storage variables
         self.fds = {} # open file descriptors
-
-        chirp_config = ".chirp.config"
-        try:
-            chirp_config = os.path.join(
-                os.environ["_CONDOR_SCRATCH_DIR"], chirp_config)
-        except KeyError:
-            pass
-
-        if (host and port): # don't read chirp_config if host and port are set
-            pass
-        elif (("cookie" in auth)
-                  and (not cookie)
-                  and os.path.isfile(chirp_config)): # read chirp_config
-            try:
-                with open(chirp_config, "r") as f:
-                    (host, port, cookie) = f.read().rstrip().split()
-            except Exception:
-                print("Error reading {0}".format(chirp_config))
-                raise
-        else:
-            raise ValueError((".chirp.config must be present "
-                                  "or you must provide a host and port"))
+        self.reconnects = 0 # number of times a session was re-established
+        self._socket = None
+        self._reader = _SocketReader(self.__class__.CHIRP_BUFFER_SIZE)
+        self._persistent = False
+        self._command_sent = None # the last command, for errors
+        self._observer = observer
+        self._timer = None # _CommandTimer of the running command
+        self._setup = None # (connect, auth) durations for the next command
+        self._reconnects_seen = 0 # reconnects reported to the observer
+        self._io_limit = None # largest accepted strided request, after TooBig
+
+        if cache is True:
+            from .cache import MetadataCache
+            cache = MetadataCache()
+        self._cache = cache
+
+        (host, port, cookie) = _find_chirp_server(host, port, auth, cookie)
 
         # store connection parameters
         self._host = host
@@ -118,6 +787,17 @@ class HTChirp:
 
     def __del__(self):
         """Disconnect from the Chirp server when this object goes away"""
+        self._disconnect(force = True)
+
+    def __enter__(self):
+        """Open a persistent session with the Chirp server"""
+        self._persistent = True
+        self._connect()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the persistent session with the Chirp server"""
+        self._persistent = False
         self._disconnect()
 
     def __repr__(self):
@@ -134,6 +814,10 @@ class HTChirp:
     def _connect(self, auth_method = None):
         """Connect to and authenticate with the Chirp server
 
+        If a persistent session is open and its connection is still usable,
+        the connection is reused. If the server dropped it, a new connection
+        is made and counted in self.reconnects.
+
         :param auth_method: If set, try the specific authentication method
 
         """
@@ -141,28 +825,144 @@ class HTChirp:
         if not auth_method:
             auth_method = self._authentication
 
+        if self._timer is not None:
+            self._end_event()
+
+        if self._persistent and self._socket is not None:
+            if self._is_connected():
+                return # reuse the session connection
+            self.reconnects += 1
+
         # close the socket if it is open and exists
-        try:
-            self._socket.getsockname()
-        except (NameError, AttributeError):
-            pass # socket object does not exist
-        except socket.error:
-            pass # socket exists but is closed
-        else:
-            # socket exists and is connected
-            self._disconnect()
+        self._disconnect(force = True)
 
         # create the socket
+        connect_time = _monotonic()
         self._socket = socket.socket()
         self._socket.settimeout(self._timeout)
 
-        # connect and authenticate
+        # connect and authenticate (without Nagle's algorithm, which holds back
+        # the data sent after a command until the command is acknowledged)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self._socket.connect((self._host, self._port))
+        if self._observer is not None:
+            self._socket = _MeteredSocket(self._socket)
+            auth_time = _monotonic()
+        self._reader.reset(self._socket)
         self._authenticate(auth_method)
+        if self._observer is not None:
+            # the cookie command is reported as the auth time of the next one
+            self._timer = self._socket.timer = None
+            self._setup = (auth_time - connect_time, _monotonic() - auth_time,
+                               self.reconnects - self._reconnects_seen)
+            self._reconnects_seen = self.reconnects
 
         # reset open file descriptors
         self.fds = {}
 
+    def _reconnect(self):
+        """Replace the connection to the Chirp server with a new one
+
+        Any open file descriptors are lost and must be reopened.
+
+        """
+
+        self.reconnects += 1
+        self._disconnect(force = True)
+        self._connect()
+
+    def _clone(self):
+        """Create a client for the same server without probing authentication
+
+        :returns: A new, unconnected HTChirp object with the same settings
+
+        """
+
+        clone = copy.copy(self)
+        clone.fds = {}
+        clone.reconnects = 0
+        clone._socket = None
+        clone._reader = _SocketReader(self.__class__.CHIRP_BUFFER_SIZE)
+        clone._persistent = False
+        clone._timer = None
+        clone._setup = None
+        clone._reconnects_seen = 0
+        return clone
+
+    def _begin_event(self, command, pipelined = False):
+        """Start timing a command for the observer
+
+        :param command: The command line, as built by _command()
+        :param pipelined: If set to True, the command was already sent
+
+        """
+
+        if self._timer is not None:
+            self._end_event()
+        (name, path) = _command_info(command, self.fds)
+        self._timer = _CommandTimer(name, path, self._setup,
+                                        self._reader.consumed, pipelined)
+        if pipelined:
+            self._timer.bytes_sent = len(command)
+        self._socket.timer = self._timer
+        self._setup = None
+
+    def _end_event(self):
+        """Pass the timings of the running command to the observer"""
+        timer = self._timer
+        self._timer = None
+        if self._socket is not None:
+            self._socket.timer = None
+        self._observer(timer.finish(self._reader.consumed))
+
+    def _cache_get(self, command, path, args = None):
+        """Look up the result of a command in the metadata cache
+
+        :returns: (True, result) if the result is cached, otherwise
+            (False, None)
+
+        """
+
+        if self._cache is None:
+            return (False, None)
+        return self._cache.get(command, path, args)
+
+    def _cache_put(self, command, path, result, args = None):
+        """Store the result of a command in the metadata cache"""
+        if self._cache is not None:
+            self._cache.put(command, path, result, args)
+
+    def _invalidate(self, paths, recursive = False):
+        """Remove changed paths from the metadata cache
+
+        :param paths: List of paths that were changed
+        :param recursive: If set to True, also remove everything below them
+
+        """
+
+        if self._cache is not None:
+            for path in paths:
+                self._cache.invalidate(path, recursive)
+
+    def _is_connected(self):
+        """Check if the connection to the Chirp server can be reused
+
+        An idle connection should have nothing to read. If the socket is
+        readable, the server either closed it or left unread data behind
+        (e.g. after an interrupted command), so it cannot be reused.
+
+        :returns: True if the connection is open and idle
+
+        """
+
+        if self._socket is None or len(self._reader) > 0:
+            return False
+        try:
+            (readable, _, _) = select.select([self._socket], [], [], 0)
+        except (ValueError, socket.error):
+            return False # socket is closed
+        return not readable
+
     def _authenticate(self, method):
         """Test authentication method
 
@@ -171,7 +971,11 @@ class HTChirp:
         """
 
         if method == "cookie":
-            response = self._simple_command("cookie {0}\n".format(
+            if self._cookie is None:
+                raise self.NotAuthenticated(
+                    "Could not authenticate using {0}, no cookie".format(
+                        method))
+            response = self._simple_command(_command("cookie",
                 self._cookie))
             if not (str(response) == "0"):
                 raise self.NotAuthenticated(
@@ -184,23 +988,58 @@ class HTChirp:
             raise ValueError("Unknown authentication method '{0}'".format(
                 method))
 
-    def _disconnect(self):
-        """Close connection with the Chirp server"""
+    def _disconnect(self, force = False):
+        """Close connection with the Chirp server
+
+        The connection is kept open while a persistent session is active.
+
+        :param force: If set to True, close the connection even during a
+            persistent session
+
+        """
+
+        if self._timer is not None:
+            self._end_event()
 
+        if self._persistent and not force:
+            return
+
+        self._setup = None
         try:
             self._socket.close()
         except socket.error:
             pass
         except (NameError, AttributeError):
             pass
+        self._socket = None
 
         # reset open file descriptors
         self.fds = {}
 
+    def _drop_connection(self):
+        """Close a connection left in the middle of a command
+
+        The socket is closed but kept, so a persistent session sees that it
+        is unusable and reconnects (counted in self.reconnects) before the
+        next command. Open file descriptors are lost with the connection.
+
+        """
+
+        if self._timer is not None:
+            self._end_event()
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except socket.error:
+                pass
+        self.fds = {}
+
+    @_exchange
     def _simple_command(self, cmd, get_response = True):
         """Send a command to the Chirp server
 
-        :param cmd: The command to be sent
+        :param cmd: The command to be sent, as built by _command() (or a
+            string)
         :param get_response: Check for a response and return it
         :returns: The response from the Chirp server (if get_response is True)
         :raises InvalidRequest: If the command is invalid
@@ -208,22 +1047,23 @@ class HTChirp:
 
         """
 
+        if not isinstance(cmd, bytes):
+            cmd = cmd.encode()
+
         # check the command
-        if cmd[-1] != "\n":
+        if cmd[-1:] != b"\n":
             raise self.InvalidRequest("The form of the request is invalid.")
-        cmd = cmd.encode()
 
         # send the command
-        bytes_sent = 0
-        while bytes_sent < len(cmd):
-            sent = self._socket.send(cmd[bytes_sent:])
-            if sent == 0:
-                raise RuntimeError("Connection to the Chirp server is broken.")
-            bytes_sent = bytes_sent + sent
+        self._command_sent = cmd
+        if self._observer is not None:
+            self._begin_event(cmd)
+        self._socket.sendall(cmd)
 
         if get_response:
             return self._simple_response()
 
+    @_exchange
     def _simple_response(self):
         """Get the response from the Chirp server after running a command
 
@@ -232,91 +1072,149 @@ class HTChirp:
 
         """
 
-        # build up the response one byte at a time
-        response = b""
-        chunk = b""
-        while chunk != b"\n": # response terminated with \n
-            chunk = self._socket.recv(1)
-            response += chunk
-            # make sure response doesn't get too large
-            if len(response) > self.__class__.CHIRP_LINE_MAX:
-                raise EnvironmentError("The server responded with too much data.")
+        # response terminated with \n
+        response = self._reader.readline(self.__class__.CHIRP_LINE_MAX)
         response = response.decode().rstrip()
 
-        # check the response code if an int is returned
-        try:
-            int(response)
-        except ValueError:
-            pass
-        else:
-            self._check_response(int(response))
+        # check the response code if a negative int is returned
+        if response[:1] == "-":
+            try:
+                code = int(response)
+            except ValueError:
+                pass
+            else:
+                (command, path) = _command_info(self._command_sent, self.fds)
+                if self._timer is not None:
+                    self._timer.error = code
+                self._check_response(code, command, path)
 
         return response
 
-    def _check_response(self, response):
+    @classmethod
+    def _check_response(cls, response, command = None, path = None):
         """Check the response from the Chirp server for validity
 
+        :param response: The response code
+        :param command: Name of the command, for the error
+        :param path: Path the command was run on, for the error
         :raises ChirpError: Many different subclasses of ChirpError
 
         """
 
-        chirp_errors = {
-            -1: self.NotAuthenticated("The client has not authenticated its identity."),
-            -2: self.NotAuthorized("The client is not authorized to perform that action."),
-            -3: self.DoesntExist("There is no object by that name."),
-            -4: self.AlreadyExists("There is already an object by that name."),
-            -5: self.TooBig("That request is too big to execute."),
-            -6: self.NoSpace("There is not enough space to store that."),
-            -7: self.NoMemory("The server is out of memory."),
-            -8: self.InvalidRequest("The form of the request is invalid."),
-            -9: self.TooManyOpen("There are too many resources in use."),
-            -10: self.Busy("That object is in use by someone else."),
-            -11: self.TryAgain("A temporary condition prevented the request."),
-            -12: self.BadFD("The file descriptor requested is invalid."),
-            -13: self.IsDir("A file-only operation was attempted on a directory."),
-            -14: self.NotDir("A directory operation was attempted on a file."),
-            -15: self.NotEmpty("A directory cannot be removed because it is not empty."),
-            -16: self.CrossDeviceLink("A hard link was attempted across devices."),
-            -17: self.Offline("The requested resource is temporarily not available."),
-            -127: self.UnknownError("An unknown error (-127) occured."),
-        }
-
-        if response in chirp_errors:
-            raise chirp_errors[response]
-        elif response < 0:
-            raise self.UnknownError("An unknown error ({0}) occured.".format(
-                response))
-
-    def _get_fixed_data(self, length, output_file = None):
+        if response >= 0:
+            return
+        (error, message) = cls.CHIRP_ERRORS.get(response, (None, None))
+        if error is None:
+            (error, message) = (cls.UnknownError,
+                                    "An unknown error ({0}) occured.".format(
+                                        response))
+        raise error(message, response, command, path)
+
+    @_exchange
+    def _get_fixed_data(self, length, output_file = None, buf = None):
         """Get a fixed amount of data from the Chirp server
 
         :param length: The amount of data (in bytes) to receive
         :param output_file: Output file to store received data (optional)
-        :returns: Received data, unless output_file is set, then returns number
-            of bytes received.
+        :param buf: Writable buffer to store received data (optional)
+        :returns: Received data, unless output_file or buf is set, then returns
+            number of bytes received.
+        :raises EnvironmentError: if buf is too small for the data
 
         """
 
         length = int(length)
-        
-        if output_file: # stream data to a file
-            bytes_recv = 0
-            chunk = b""
-            with open(output_file, "wb") as fd:
-                while bytes_recv < length:
-                    chunk = self._socket.recv(self.__class__.CHIRP_LINE_MAX)
-                    fd.write(chunk)
-                    bytes_recv += len(chunk)
-            return bytes_recv
+
+        if buf is not None: # receive data directly into the buffer
+            view = memoryview(buf)
+            if view.itemsize != 1 or view.ndim != 1:
+                view = view.cast("B")
+            if length > len(view):
+                raise EnvironmentError("The server responded with too much data.")
+            return self._reader.readinto(view[:length],
+                                             self.__class__.CHIRP_CHUNK_SIZE)
+
+        elif output_file: # stream data to a file
+            return self._get_file_data(length, output_file)
 
         else: # return data to method call
-            data = b""
-            chunk = b""
-            while len(data) < length:
-                chunk = self._socket.recv(self.__class__.CHIRP_LINE_MAX)
-                data += chunk
-            return data
+            data = bytearray(length)
+            self._reader.readinto(data, self.__class__.CHIRP_CHUNK_SIZE)
+            return bytes(data)
+
+    @_exchange
+    def _get_file_data(self, length, output_file,
+                           chunk_size = None, preallocate = False,
+                           atomic = False, progress = None):
+        """Stream a fixed amount of data from the Chirp server to a file
+
+        Data is received into a reusable buffer of chunk_size bytes and written
+        to the file one chunk at a time.
+
+        :param length: The amount of data (in bytes) to receive
+        :param output_file: Output file to store received data
+        :param chunk_size: Bytes to receive and write at a time
+            [default: CHIRP_CHUNK_SIZE]
+        :param preallocate: If set to True, allocate disk space for the whole
+            file before writing (if supported by the OS and file system)
+        :param atomic: If set to True, write to a temporary file in the same
+            directory and rename it to output_file when complete
+        :param progress: Function called after each chunk as
+            progress(bytes_received, length, bytes_per_second)
+        :returns: Number of bytes received
+
+        """
+
+        if chunk_size == None:
+            chunk_size = self.__class__.CHIRP_CHUNK_SIZE
+        chunk_size = max(1, min(int(chunk_size), length))
+
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        if atomic:
+            (dirname, basename) = os.path.split(os.path.abspath(output_file))
+            write_file = os.path.join(dirname, ".{0}.{1}.part".format(
+                basename, binascii.hexlify(os.urandom(4)).decode()))
+            flags |= os.O_EXCL
+        else:
+            write_file = output_file
+            flags |= os.O_TRUNC
+
+        fd = os.open(write_file, flags, 0o666)
+        try:
+            if preallocate and length > 0 and hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(fd, 0, length)
+                except OSError:
+                    pass # not supported here, write without preallocating
+
+            buf = bytearray(chunk_size)
+            view = memoryview(buf)
+            bytes_recv = 0
+            start_time = _monotonic()
+            while bytes_recv < length:
+                size = min(chunk_size, length - bytes_recv)
+                self._reader.readinto(view[:size])
+                written = 0
+                while written < size:
+                    written += os.write(fd, view[written:size])
+                bytes_recv += size
+                if progress:
+                    elapsed = _monotonic() - start_time
+                    progress(bytes_recv, length,
+                                 bytes_recv / elapsed if elapsed > 0 else 0.0)
+        except BaseException:
+            os.close(fd)
+            if atomic:
+                os.unlink(write_file)
+            raise
+        os.close(fd)
+
+        if atomic: # move the complete file into place
+            getattr(os, "replace", os.rename)(write_file, output_file)
 
+        return bytes_recv
+
+    @_exchange
     def _get_line_data(self):
         """Get one line of data from the Chirp server
 
@@ -328,12 +1226,81 @@ class HTChirp:
 
         """
 
-        data = b""
-        while True:
-            data += self._socket.recv(self.__class__.CHIRP_LINE_MAX)
-            if (data[-1] == b"\n"):
-                break
-        return data.decode()
+        return self._reader.readline().decode()
+
+    @_exchange
+    def _get_stat_data(self, record):
+        """Get stat data from the Chirp server
+
+        The stat fields are sent as integers on one or more lines.
+
+        :param record: The type of record to receive (ChirpStat or ChirpStatFS)
+        :returns: The record
+
+        """
+
+        result = self._get_line_data().rstrip()
+        while len(result.split()) < len(record._fields):
+            result += (" " + self._get_line_data().rstrip())
+
+        return _parse_stat(record, result)
+
+    def _get_dir_entries(self, remote_path, length):
+        """Get a long directory listing from the Chirp server, one entry at a time
+
+        Each entry is sent as a line with its name followed by a line of stat
+        fields. If the generator is closed before the end of the listing, the
+        rest of the listing is received and discarded, so the connection can be
+        used for the next command.
+
+        :param remote_path: Path to the listed directory
+        :param length: The length (in bytes) of the listing
+        :returns: A generator of ChirpDirEntry objects
+
+        """
+
+        remaining = int(length)
+        try:
+            while remaining > 0:
+                name = self._reader.readline()
+                result = self._reader.readline()
+                remaining -= len(name) + len(result)
+                name = name.decode().rstrip("\n")
+                yield ChirpDirEntry(name, posixpath.join(remote_path, name),
+                                        _parse_stat(ChirpStat, result.decode()))
+        except GeneratorExit: # closed early, discard the rest of the listing
+            try:
+                scratch = memoryview(bytearray(
+                    min(remaining, self.__class__.CHIRP_BUFFER_SIZE)))
+                while remaining > 0:
+                    size = min(remaining, len(scratch))
+                    self._reader.readinto(scratch[:size])
+                    remaining -= size
+            except (socket.error, RuntimeError):
+                self._drop_connection()
+            else:
+                self._disconnect()
+            raise
+        except BaseException:
+            self._drop_connection()
+            raise
+        self._disconnect()
+
+    @classmethod
+    def _access_mode(cls, mode_str):
+        """Convert an access mode string to a permission mode
+
+        :param mode_str: Mode to check (one or more of 'frwx')
+        :returns: Permission mode
+
+        """
+
+        mode = 0
+        for m in mode_str:
+            if m not in cls.ACCESS_MODES:
+                raise ValueError("mode '{0}' not in (fxwr)".format(m))
+            mode = mode | cls.ACCESS_MODES[m]
+        return mode
 
     def _open(self, name, flags, mode = None):
         """Open a file on the Chirp server
@@ -356,8 +1323,8 @@ class HTChirp:
             raise ValueError("Flags must be one or more of 'rwatcx'")
 
         # get file descriptor
-        fd = int(self._simple_command("open {0} {1} {2}\n".format(
-            quote(name),
+        fd = int(self._simple_command(_command("open",
+            name,
             ''.join(flags),
             int(mode))))
 
@@ -377,12 +1344,38 @@ class HTChirp:
 
         """
 
-        self._simple_command("close {0}\n".format(int(fd)))
+        self._simple_command(_command("close", int(fd)))
+        self.fds.pop(int(fd), None)
+
+    def _abort_fd(self, fd, error):
+        """Clean up a file descriptor after a call failed while it was open
+
+        After an error returned by the server the connection is still usable,
+        so the descriptor is closed. After any other error (e.g. a timeout in
+        the middle of a transfer) the connection is dropped, which closes the
+        descriptor on the server. Errors while cleaning up are ignored, so that
+        the original error is the one raised.
+
+        :param fd: File descriptor, None if it was lost with a connection
+        :param error: The exception that ended the call
+
+        """
+
+        if fd is None:
+            return
+        if isinstance(error, self.ChirpError):
+            try:
+                self._close(fd)
+                return
+            except (EnvironmentError, RuntimeError, self.ChirpError):
+                pass
+        self._drop_connection()
 
     def _read(self,
                    fd, length,
                    offset = None,
-                   stride_length = None, stride_skip = None):
+                   stride_length = None, stride_skip = None,
+                   buf = None):
         """Read from a file on the Chirp server
 
         :param fd: File descriptor
@@ -390,7 +1383,9 @@ class HTChirp:
         :param offset: Skip this many bytes when reading
         :param stride_length: Read this many bytes every stride_skip bytes
         :param stride_skip: Skip this many bytes between reads
-        :returns: Data read from file
+        :param buf: Writable buffer to read data into (optional)
+        :returns: Data read from file, unless buf is set, then returns number
+            of bytes read
 
         """
 
@@ -399,20 +1394,20 @@ class HTChirp:
 
         if (offset, stride_length, stride_skip) == (None, None, None):
             # read
-            rb = int(self._simple_command("read {0} {1}\n".format(
+            rb = int(self._simple_command(_command("read",
                 int(fd),
                 int(length))))
 
         elif (offset != None) and (stride_length, stride_skip) == (None, None):
             # pread
-            rb = int(self._simple_command("pread {0} {1} {2}\n".format(
+            rb = int(self._simple_command(_command("pread",
                 int(fd),
                 int(length),
                 int(offset))))
 
         elif (stride_length, stride_skip) != (None, None):
             # sread
-            rb = int(self._simple_command("sread {0} {1} {2} {3} {4}\n".format(
+            rb = int(self._simple_command(_command("sread",
                 int(fd),
                 int(length),
                 int(offset),
@@ -423,8 +1418,9 @@ class HTChirp:
             raise self.InvalidRequest(
                 "Both stride_length and stride_skip must be specified")
 
-        return self._get_fixed_data(rb)
+        return self._get_fixed_data(rb, buf = buf)
 
+    @_exchange
     def _write(self,
                     fd, data, length,
                     offset = None,
@@ -446,14 +1442,14 @@ class HTChirp:
 
         if (offset, stride_length, stride_skip) == (None, None, None):
             # write
-            self._simple_command("write {0} {1}\n".format(
+            self._simple_command(_command("write",
                 int(fd),
                 int(length)),
          get_response = False)
 
         elif (offset != None) and (stride_length, stride_skip) == (None, None):
             # pwrite
-            self._simple_command("pwrite {0} {1} {2}\n".format(
+            self._simple_command(_command("pwrite",
                 int(fd),
                 int(length),
                 int(offset)),
@@ -461,7 +1457,7 @@ class HTChirp:
 
         elif (stride_length, stride_skip) != (None, None):
             # swrite
-            wb = self._simple_command("swrite {0} {1} {2} {3} {4}\n".format(
+            wb = self._simple_command(_command("swrite",
                 int(fd),
                 int(length),
                 int(offset),
@@ -473,13 +1469,191 @@ class HTChirp:
             raise self.InvalidRequest(
                 "Both stride_length and stride_skip must be specified")
 
-        wfd = self._socket.makefile("wb") # open socket as a file object
-        wfd.write(data) # write data
-        wfd.close() # close socket file object
+        self._socket.sendall(data) # write data
 
         wb = int(self._simple_response()) # get bytes written
         return wb
 
+    @_exchange
+    def _send_file_data(self, rfd, length):
+        """Send a fixed amount of data from a local file to the Chirp server
+
+        Uses socket.sendfile() (zero-copy on platforms with os.sendfile),
+        otherwise sends the file in large chunks read into a reusable buffer.
+
+        :param rfd: Local file object, opened in binary mode
+        :param length: Number of bytes to send
+        :returns: Number of bytes sent, less than length if the file is short
+
+        """
+
+        if length == 0:
+            return 0
+
+        if hasattr(os, "sendfile") and hasattr(self._socket, "sendfile"):
+            return self._socket.sendfile(rfd, 0, length)
+
+        chunk_size = min(self.__class__.CHIRP_CHUNK_SIZE, length)
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        bytes_sent = 0
+        while bytes_sent < length:
+            size = rfd.readinto(view[:min(chunk_size, length - bytes_sent)])
+            if not size:
+                break
+            self._socket.sendall(view[:size])
+            bytes_sent += size
+        return bytes_sent
+
+    def _transfer_ranges(self, remote_file, flags, length, chunk_size,
+                             workers, retries, transfer):
+        """Transfer ranges of a remote file concurrently
+
+        Each worker thread takes a connection from a private ChirpPool, opens
+        remote_file once, and calls transfer for one range at a time until no
+        ranges are left. A range that fails on a broken connection (or with
+        TryAgain) is queued again and its connection replaced, up to retries
+        times per range. Files opened for writing are synced before closing.
+
+        :param remote_file: Path to file
+        :param flags: File open modes for each worker's file descriptor
+        :param length: Size of the file
+        :param chunk_size: Bytes per range
+        :param workers: Number of concurrent connections
+        :param retries: Number of times to retry a failed range
+        :param transfer: Function called as transfer(chirp, fd, offset, size)
+        :raises: The first error that was not retried
+
+        """
+
+        from .pool import ChirpPool
+
+        pending = collections.deque(
+            [(offset, min(chunk_size, length - offset))
+                 for offset in range(0, length, chunk_size)])
+        failures = collections.defaultdict(int) # failed attempts per range
+        errors = []
+        lock = threading.Lock()
+
+        def finish(chirp, fd):
+            if "w" in flags:
+                chirp._fsync(fd)
+            chirp._close(fd)
+
+        def worker(pool):
+            chirp = None
+            while True:
+                with lock:
+                    if errors or not pending:
+                        break
+                    (offset, size) = pending.popleft()
+                try:
+                    if chirp is None:
+                        chirp = pool.acquire()
+                        fd = None
+                        fd = chirp._open(remote_file, flags)
+                    transfer(chirp, fd, offset, size)
+                except (socket.error, RuntimeError, self.TryAgain) as e:
+                    if chirp is not None:
+                        pool.release(chirp, discard = True)
+                        chirp = None
+                    with lock:
+                        failures[offset] += 1
+                        if failures[offset] > retries:
+                            errors.append(e)
+                        else:
+                            pending.append((offset, size))
+                except BaseException as e:
+                    with lock:
+                        errors.append(e)
+            if chirp is not None:
+                try:
+                    if fd is not None:
+                        finish(chirp, fd)
+                except (socket.error, RuntimeError, self.ChirpError):
+                    pool.release(chirp, discard = True)
+                    if "w" in flags: # sync the written data on a new connection
+                        try:
+                            with pool.connection() as chirp:
+                                finish(chirp, chirp._open(remote_file, flags))
+                        except BaseException as e:
+                            with lock:
+                                errors.append(e)
+                else:
+                    pool.release(chirp)
+
+        with ChirpPool(self, size = workers, idle_timeout = None) as pool:
+            threads = [threading.Thread(target = worker, args = (pool,))
+                           for _ in range(min(workers, len(pending)))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+    def _transfer_files(self, pool, files, workers, transfer):
+        """Transfer whole files concurrently
+
+        Each worker thread borrows a connection from pool and calls transfer
+        for one file at a time until no files are left or a transfer fails.
+
+        :param pool: ChirpPool to take connections from
+        :param files: List of files, each passed to transfer
+        :param workers: Number of concurrent connections
+        :param transfer: Function called as transfer(chirp, file)
+        :raises: The first error
+
+        """
+
+        pending = collections.deque(files)
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    if errors or not pending:
+                        break
+                    item = pending.popleft()
+                try:
+                    with pool.connection() as chirp:
+                        transfer(chirp, item)
+                except BaseException as e:
+                    with lock:
+                        errors.append(e)
+
+        threads = [threading.Thread(target = worker)
+                       for _ in range(min(workers, len(pending)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+    def _job_attrs(self, command, arguments):
+        """Run a job attribute command for several attributes in one batch
+
+        :param command: Name of the ChirpBatch method (e.g. 'get_job_attr')
+        :param arguments: List of argument tuples, starting with the attribute
+        :returns: A dict of the results by attribute
+        :raises ChirpError: The first error, naming the job attribute
+
+        """
+
+        batch = self.batch(raise_errors = False)
+        results = [(args[0], getattr(batch, command)(*args))
+                       for args in arguments]
+        batch.execute()
+
+        values = {}
+        for (job_attribute, result) in results:
+            values[job_attribute] = result.result() # errors name the attribute
+        return values
+
     def _fsync(self, fd):
         """Flush unwritten data to disk
 
@@ -487,7 +1661,7 @@ class HTChirp:
 
         """
 
-        self._simple_command("fsync {0}\n".format(int(fd)))
+        self._simple_command(_command("fsync", int(fd)))
 
     def _lseek(self, fd, offset, whence):
         """Move the position of a pointer in an open file
@@ -499,7 +1673,7 @@ class HTChirp:
 
         """
 
-        pos = self._simple_command("lseek {0} {1} {2}\n".format(
+        pos = self._simple_command(_command("lseek",
             int(fd),
             int(offset),
             int(whence)))
@@ -510,23 +1684,36 @@ class HTChirp:
 
     # HTCondor-specific methods
 
-    def fetch(self, remote_file, local_file):
+    def fetch(self, remote_file, local_file,
+                  chunk_size = None, preallocate = False, atomic = False,
+                  progress = None):
         """Copy a file from the submit machine to the execute machine.
 
+        See getfile() for the transfer options.
+
         :param remote_file: Path to file to be sent from the submit machine
         :param local_file: Path to file to be written to on the execute machine
+        :param chunk_size: Bytes to receive and write at a time [default: 1 MiB]
+        :param preallocate: If set to True, preallocate local_file on disk
+        :param atomic: If set to True, rename local_file into place when done
+        :param progress: Function called as progress(bytes, total, bytes/sec)
         :returns: Bytes written
 
         """
 
-        return self.getfile(remote_file, local_file)
+        return self.getfile(remote_file, local_file,
+                                chunk_size, preallocate, atomic, progress)
 
-    def put(self, local_file, remote_file, flags = 'wct', mode = None):
+    def put(self, local_file, remote_file, flags = 'wct', mode = None,
+                chunk_size = None, progress = None, retries = 3):
         """Copy a file from the execute machine to the submit machine.
 
-        Specifying flags other than 'wct' (i.e. 'create or truncate file') when
-        putting large files is not recommended as the entire file must be read
-        into memory.
+        With the default flags ('wct', i.e. 'create or truncate file') the
+        file is sent with putfile(). With other flags (e.g. 'wa' to append),
+        the file is streamed through a single remote file descriptor in chunks
+        of chunk_size bytes, so memory use does not depend on the file size.
+        If a chunk fails to be written, the upload resumes from the last
+        offset acknowledged by the server, reconnecting if necessary.
 
         To put individual bytes into a file on the submit machine instead of
         an entire file, see the write() method.
@@ -535,6 +1722,11 @@ class HTChirp:
         :param remote_file: Path to file to be written to on the submit machine
         :param flags: File open modes (one or more of 'rwatcx') [default: 'wct']
         :param mode: Permission mode to set [default: 0777]
+        :param chunk_size: Bytes to write at a time, for flags other than 'wct'
+            [default: 1 MiB]
+        :param progress: Function called after each chunk, for flags other
+            than 'wct', as progress(bytes_written, total_bytes, bytes_per_second)
+        :param retries: Number of times to retry a failed chunk
         :returns: Size of written file
 
         """
@@ -545,18 +1737,75 @@ class HTChirp:
             # If default mode ('wct'), use putfile (efficient)
             return self.putfile(local_file, remote_file, mode)
 
+        if not ("w" in flags):
+            raise ValueError("'w' is not included in flags '{0}'".format(
+                "".join(flags)))
+
+        if chunk_size == None:
+            chunk_size = self.__class__.CHIRP_CHUNK_SIZE
+
+        length = os.stat(local_file).st_size
+        buf = bytearray(max(1, min(int(chunk_size), length)))
+        view = memoryview(buf)
+
+        # reopening after a failure must not truncate or re-create the file,
+        # and must not append so that the resume offset is respected
+        resume_flags = flags - set("atx")
+
+        self._connect()
+        fd = self._open(remote_file, flags, mode)
+        if "a" in flags:
+            start = self._lseek(fd, 0, os.SEEK_END)
         else:
-            # If non-default mode, have to read entire file (inefficient)
-            with open(local_file, "rb") as rfd:
-                data = rfd.read()
-            # And then use write
-            wb = self.write(data, remote_file, flags, mode)
-            # Better check how much data was written
-            if wb < len(data):
-                raise UserWarning(
-                    "Only {0} bytes of {1} bytes in {2} were written".format(
-                        wb, len(data), local_file))
-            return wb
+            start = 0
+
+        acked = 0 # bytes acknowledged by the server
+        failures = 0
+        start_time = _monotonic()
+        try:
+            with open(local_file, "rb", 0) as rfd:
+                while acked < length:
+                    size = rfd.readinto(view[:min(len(buf), length - acked)])
+                    if not size:
+                        break # the local file is shorter than expected
+                    try:
+                        wb = self._write(fd, view[:size], size, start + acked)
+                    except (socket.error, RuntimeError, self.TryAgain) as e:
+                        failures += 1
+                        if failures > retries:
+                            raise
+                        if not isinstance(e, self.TryAgain):
+                            # the connection is broken and the remote fd with it
+                            fd = None # closed with the connection
+                            self._reconnect()
+                            fd = self._open(remote_file, resume_flags,
+                                                mode)
+                        rfd.seek(acked) # resend the unacknowledged bytes
+                        continue
+                    failures = 0
+                    acked += wb
+                    if wb < size:
+                        if wb == 0:
+                            break # the server is not accepting any more data
+                        rfd.seek(acked) # resend the unacknowledged bytes
+                    if progress:
+                        elapsed = _monotonic() - start_time
+                        progress(acked, length,
+                                     acked / elapsed if elapsed > 0 else 0.0)
+            self._fsync(fd) # force the file to be written to disk
+        except BaseException as e:
+            self._abort_fd(fd, e)
+            raise
+        self._close(fd)
+        self._disconnect()
+        self._invalidate([remote_file])
+
+        # Better check how much data was written
+        if acked < length:
+            raise UserWarning(
+                "Only {0} bytes of {1} bytes in {2} were written".format(
+                    acked, length, local_file))
+        return acked
 
     def remove(self, remote_file):
         """Remove a file from the submit machine.
@@ -576,8 +1825,8 @@ class HTChirp:
         """
 
         self._connect()
-        length = int(self._simple_command("get_job_attr {0}\n".format(
-            quote(job_attribute))))
+        length = int(self._simple_command(_command("get_job_attr",
+            job_attribute)))
         result = self._get_fixed_data(length).decode()
         self._disconnect()
 
@@ -594,8 +1843,8 @@ class HTChirp:
         """
 
         self._connect()
-        length = int(self._simple_command("get_job_attr_delayed {0}\n".format(
-            quote(job_attribute))))
+        length = int(self._simple_command(_command("get_job_attr_delayed",
+            job_attribute)))
         result = self._get_fixed_data(length).decode()
         self._disconnect()
 
@@ -610,9 +1859,9 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("set_job_attr {0} {1}\n".format(
-            quote(job_attribute),
-            quote(attribute_value)))
+        self._simple_command(_command("set_job_attr",
+            job_attribute,
+            attribute_value))
         self._disconnect()
 
     def set_job_attr_delayed(self, job_attribute, attribute_value):
@@ -627,11 +1876,73 @@ class HTChirp:
 
         """
         self._connect()
-        self._simple_command("set_job_attr_delayed {0} {1}\n".format(
-            quote(job_attribute),
-            quote(attribute_value)))
+        self._simple_command(_command("set_job_attr_delayed",
+            job_attribute,
+            attribute_value))
         self._disconnect()
 
+    def get_job_attrs(self, job_attributes):
+        """Get the values of several job ClassAd attributes.
+
+        The commands are pipelined over one connection.
+
+        :param job_attributes: The job attributes to query
+        :returns: A dict of the values of the job attributes as strings
+        :raises ChirpError: The first error, naming the job attribute
+
+        """
+
+        return self._job_attrs("get_job_attr",
+                                   [(a,) for a in job_attributes])
+
+    def get_job_attrs_delayed(self, job_attributes):
+        """Get the values of several job ClassAd attributes from the local
+        Starter.
+
+        The commands are pipelined over one connection.
+
+        :param job_attributes: The job attributes to query
+        :returns: A dict of the values of the job attributes as strings
+        :raises ChirpError: The first error, naming the job attribute
+
+        """
+
+        return self._job_attrs("get_job_attr_delayed",
+                                   [(a,) for a in job_attributes])
+
+    def set_job_attrs(self, job_attributes):
+        """Set the values of several job ClassAd attributes.
+
+        The commands are pipelined over one connection. All attributes are
+        sent, even if setting one of them fails.
+
+        :param job_attributes: A dict (or list of pairs) of job attributes and
+            their new values
+        :raises ChirpError: The first error, naming the job attribute
+
+        """
+
+        if hasattr(job_attributes, "items"):
+            job_attributes = job_attributes.items()
+        self._job_attrs("set_job_attr", job_attributes)
+
+    def set_job_attrs_delayed(self, job_attributes):
+        """Set the values of several job ClassAd attributes, without pushing
+        the updates immediately (see set_job_attr_delayed).
+
+        The commands are pipelined over one connection. All attributes are
+        sent, even if setting one of them fails.
+
+        :param job_attributes: A dict (or list of pairs) of job attributes and
+            their new values
+        :raises ChirpError: The first error, naming the job attribute
+
+        """
+
+        if hasattr(job_attributes, "items"):
+            job_attributes = job_attributes.items()
+        self._job_attrs("set_job_attr_delayed", job_attributes)
+
     def ulog(self, text):
         """Log a generic string to the job log.
 
@@ -640,8 +1951,8 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("ulog {0}\n".format(
-            quote(text)))
+        self._simple_command(_command("ulog",
+            text))
         self._disconnect()
 
     def phase(self, phasestring):
@@ -652,34 +1963,214 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("phase {0}\n".format(
-            quote(phasestring)))
+        self._simple_command(_command("phase",
+            phasestring))
+        self._disconnect()
+
+    # Wrappers around methods that use a file descriptor
+
+    def read(self, remote_path, length,
+                 offset = None, stride_length = None, stride_skip = None):
+        """Read up to 'length' bytes from a file on the remote machine.
+
+        Optionally, start at an offset and/or retrieve data in strides.
+
+        :param remote_path: Path to file
+        :param length: Number of bytes to read
+        :param offset: Number of bytes to offset from beginning of file
+        :param stride_length: Number of bytes to read per stride
+        :param stride_skip: Number of bytes to skip per stride
+        :returns: Data read from file
+
+        """
+
+        self._connect()
+        fd = self._open(remote_path, "r")
+        try:
+            data = self._read(fd, length, offset, stride_length, stride_skip)
+        except BaseException as e:
+            self._abort_fd(fd, e)
+            raise
+        self._close(fd)
+        self._disconnect()
+
+        return data
+
+    def read_into(self, remote_path, buf,
+                      offset = None, stride_length = None, stride_skip = None):
+        """Read up to len(buf) bytes from a file on the remote machine into buf.
+
+        The data is received directly into buf without intermediate copies.
+        Optionally, start at an offset and/or retrieve data in strides.
+
+        :param remote_path: Path to file
+        :param buf: Writable buffer (e.g. bytearray, array, mmap) to fill
+        :param offset: Number of bytes to offset from beginning of file
+        :param stride_length: Number of bytes to read per stride
+        :param stride_skip: Number of bytes to skip per stride
+        :returns: Number of bytes read
+
+        """
+
+        length = memoryview(buf).nbytes
+
+        self._connect()
+        fd = self._open(remote_path, "r")
+        try:
+            rb = self._read(fd, length, offset, stride_length, stride_skip,
+                                buf = buf)
+        except BaseException as e:
+            self._abort_fd(fd, e)
+            raise
+        self._close(fd)
         self._disconnect()
 
-    # Wrappers around methods that use a file descriptor
+        return rb
 
-    def read(self, remote_path, length,
-                 offset = None, stride_length = None, stride_skip = None):
-        """Read up to 'length' bytes from a file on the remote machine.
+    @staticmethod
+    def _check_strides(record_size, field_offset, field_len):
+        """Check the record layout of a strided read or write"""
+        if field_len <= 0 or field_offset < 0 or record_size <= 0:
+            raise ValueError("Sizes must be positive and offsets non-negative")
+        if field_offset + field_len > record_size:
+            raise ValueError("The field does not fit in the record")
 
-        Optionally, start at an offset and/or retrieve data in strides.
+    def _strided_pieces(self, field_len, count):
+        """Number of records to read or write in the next request"""
+        if self._io_limit is None:
+            return count
+        return min(count, max(1, self._io_limit // field_len))
+
+    def read_strided(self, remote_path, record_size, field_offset, field_len,
+                         count, offset = 0, typecode = None):
+        """Read one field of each fixed-size record of a file on the remote
+        machine.
+
+        The fields of all records are read with sread, in as few requests as
+        the server accepts: requests rejected with TooBig are split in half
+        (and the smaller size is remembered by the client), and all requests
+        use the same file descriptor. For example, to read the second double
+        of each 24 byte record::
+
+            column = chirp.read_strided('data.bin', 24, 8, 8, 1000000,
+                                            typecode = 'd')
 
         :param remote_path: Path to file
-        :param length: Number of bytes to read
-        :param offset: Number of bytes to offset from beginning of file
-        :param stride_length: Number of bytes to read per stride
-        :param stride_skip: Number of bytes to skip per stride
-        :returns: Data read from file
+        :param record_size: Size of each record, in bytes
+        :param field_offset: Position of the field in the record, in bytes
+        :param field_len: Size of the field, in bytes
+        :param count: Number of records to read
+        :param offset: Position of the first record in the file, in bytes
+        :param typecode: If given, return an array.array of this type code
+            (field_len must be a multiple of its item size)
+        :returns: A memoryview of the fields, one after the other, or an
+            array if typecode is given (shorter if the file ends first)
 
         """
 
+        self._check_strides(record_size, field_offset, field_len)
+        length = field_len * int(count)
+        if typecode is None:
+            result = bytearray(length)
+        else:
+            itemsize = array.array(typecode).itemsize
+            if field_len % itemsize:
+                raise ValueError("field_len must be a multiple of the item size")
+            result = array.array(typecode, [0]) * (length // itemsize)
+        view = memoryview(result).cast("B")
+
+        done = 0 # records read
         self._connect()
         fd = self._open(remote_path, "r")
-        data = self._read(fd, length, offset, stride_length, stride_skip)
+        try:
+            while done < count:
+                records = self._strided_pieces(field_len, count - done)
+                start = done * field_len
+                try:
+                    rb = self._read(fd, records * field_len,
+                        offset + done * record_size + field_offset,
+                        field_len, record_size,
+                        buf = view[start:start + records * field_len])
+                except self.TooBig:
+                    if records == 1:
+                        raise
+                    self._io_limit = (records // 2) * field_len
+                    continue
+                done += rb // field_len
+                if rb < records * field_len: # end of file
+                    break
+        except BaseException as e:
+            self._abort_fd(fd, e)
+            raise
         self._close(fd)
         self._disconnect()
 
-        return data
+        view.release()
+        if typecode is None:
+            return memoryview(result)[:done * field_len]
+        del result[done * field_len // result.itemsize:]
+        return result
+
+    def open(self, remote_path, mode = "r", buffering = -1,
+                 encoding = None, errors = None, newline = None,
+                 permissions = None):
+        """Open a file on the remote machine as a file object.
+
+        Works like the built-in open(): mode is one of 'r', 'w', 'a' or 'x',
+        optionally with '+' for updating and 'b' or 't' for binary or text
+        mode. The file object keeps its own connection and remote file
+        descriptor open until it is closed, and buffers reads and writes so
+        that readline(), iteration, seek() and tell() do not need a round trip
+        per call.
+
+        :param remote_path: Path to file
+        :param mode: Mode to open the file in [default: 'r']
+        :param buffering: Buffer size in bytes, 0 to disable buffering (binary
+            mode only) [default: CHIRP_BUFFER_SIZE]
+        :param encoding: Text encoding (text mode only)
+        :param errors: Text encoding error handling (text mode only)
+        :param newline: Newline handling (text mode only)
+        :param permissions: Permission mode to set on new files [default: 0777]
+        :returns: A buffered file object (text mode wraps it in io.TextIOWrapper)
+
+        """
+
+        modes = set(mode)
+        if (len(mode) != len(modes) or not modes.issubset(set("rwaxbt+"))
+                or len(modes & set("rwax")) != 1
+                or set("bt").issubset(modes)):
+            raise ValueError("Invalid mode '{0}'".format(mode))
+        binary = "b" in modes
+
+        flags = {"r": "r", "w": "wct", "a": "wca", "x": "wcx"}[
+            (modes & set("rwax")).pop()]
+        if "+" in modes:
+            flags += "rw"
+
+        if buffering == -1:
+            buffering = self.__class__.CHIRP_BUFFER_SIZE
+        if buffering == 0 and not binary:
+            raise ValueError("Can't have unbuffered text I/O")
+
+        chirp = self._clone()
+        chirp.__enter__()
+        try:
+            raw = ChirpFileIO(chirp, remote_path, flags, permissions)
+        except BaseException:
+            chirp.__exit__(None, None, None)
+            raise
+
+        if buffering == 0:
+            return raw
+        if raw.readable() and raw.writable():
+            buffered = io.BufferedRandom(raw, buffering)
+        elif raw.writable():
+            buffered = io.BufferedWriter(raw, buffering)
+        else:
+            buffered = io.BufferedReader(raw, buffering)
+        if binary:
+            return buffered
+        return io.TextIOWrapper(buffered, encoding, errors, newline)
 
     def write(self, data, remote_path, flags = "w", mode = None,
                   length = None, offset = None,
@@ -711,11 +2202,85 @@ class HTChirp:
 
         self._connect()
         fd = self._open(remote_path, flags, mode)
-        bytes_sent = self._write(fd, data, length, offset,
-                                      stride_length, stride_skip)
-        self._fsync(fd) # force the file to be written to disk
+        try:
+            bytes_sent = self._write(fd, data, length, offset,
+                                          stride_length, stride_skip)
+            self._fsync(fd) # force the file to be written to disk
+        except BaseException as e:
+            self._abort_fd(fd, e)
+            raise
+        self._close(fd)
+        self._disconnect()
+        self._invalidate([remote_path])
+
+        return bytes_sent
+
+    def write_strided(self, data, remote_path, record_size, field_offset,
+                          field_len, count = None, offset = 0, flags = "w",
+                          mode = None):
+        """Write one field of each fixed-size record of a file on the remote
+        machine, leaving the rest of the records as they are.
+
+        The counterpart of read_strided(): the fields are written with
+        swrite, split into smaller requests if the server rejects them with
+        TooBig. After a TooBig the remaining requests are sent on a new
+        connection, as the server may not have read the rejected data.
+
+        :param data: The fields, one after the other (any bytes-like object,
+            e.g. an array)
+        :param remote_path: Path to file
+        :param record_size: Size of each record, in bytes
+        :param field_offset: Position of the field in the record, in bytes
+        :param field_len: Size of the field, in bytes
+        :param count: Number of records to write [default: all in data]
+        :param offset: Position of the first record in the file, in bytes
+        :param flags: File open modes (one or more of 'rwatcx') [default: 'w']
+        :param mode: Permission mode to set [default: 0777]
+        :returns: Number of bytes written
+
+        """
+
+        flags = set(flags)
+        if not ("w" in flags):
+            raise ValueError("'w' is not included in flags '{0}'".format(
+                "".join(flags)))
+        self._check_strides(record_size, field_offset, field_len)
+        view = memoryview(data).cast("B")
+        if count == None:
+            count = len(view) // field_len
+        if count * field_len > len(view):
+            raise ValueError("data holds fewer than {0} fields".format(count))
+
+        done = 0 # records written
+        bytes_sent = 0
+        self._connect()
+        fd = self._open(remote_path, flags, mode)
+        try:
+            while done < count:
+                records = self._strided_pieces(field_len, count - done)
+                start = done * field_len
+                try:
+                    bytes_sent += self._write(fd,
+                        view[start:start + records * field_len],
+                        records * field_len,
+                        offset + done * record_size + field_offset,
+                        field_len, record_size)
+                except self.TooBig:
+                    if records == 1:
+                        raise
+                    self._io_limit = (records // 2) * field_len
+                    fd = None # closed with the connection
+                    self._reconnect()
+                    fd = self._open(remote_path, flags - set("tx"), mode)
+                    continue
+                done += records
+            self._fsync(fd) # force the file to be written to disk
+        except BaseException as e:
+            self._abort_fd(fd, e)
+            raise
         self._close(fd)
         self._disconnect()
+        self._invalidate([remote_path])
 
         return bytes_sent
 
@@ -730,10 +2295,11 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("rename {0} {1}\n".format(
-            quote(old_path),
-            quote(new_path)))
+        self._simple_command(_command("rename",
+            old_path,
+            new_path))
         self._disconnect()
+        self._invalidate([old_path, new_path], recursive = True)
 
     def unlink(self, remote_file):
         """Delete a file on the remote machine.
@@ -743,9 +2309,10 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("unlink {0}\n".format(
-            quote(remote_file)))
+        self._simple_command(_command("unlink",
+            remote_file))
         self._disconnect()
+        self._invalidate([remote_file])
 
     def rmdir(self, remote_path, recursive = False):
         """Delete a directory on the remote machine.
@@ -761,9 +2328,10 @@ class HTChirp:
             self.rmall(remote_path)
         else:
             self._connect()
-            self._simple_command("rmdir {0}\n".format(
-                quote(remote_path)))
+            self._simple_command(_command("rmdir",
+                remote_path))
             self._disconnect()
+            self._invalidate([remote_path], recursive = True)
 
     def rmall(self, remote_path):
         """Recursively delete an entire directory on the remote machine.
@@ -773,9 +2341,10 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("rmall {0}\n".format(
-            quote(remote_path)))
+        self._simple_command(_command("rmall",
+            remote_path))
         self._disconnect()
+        self._invalidate([remote_path], recursive = True)
 
     def mkdir(self, remote_path, mode = None):
         """Create a new directory on the remote machine.
@@ -790,38 +2359,198 @@ class HTChirp:
             mode = self.__class__.DEFAULT_MODE
 
         self._connect()
-        self._simple_command("mkdir {0} {1}\n".format(
-            quote(remote_path),
+        self._simple_command(_command("mkdir",
+            remote_path,
             int(mode)))
         self._disconnect()
+        self._invalidate([remote_path])
 
-    def getfile(self, remote_file, local_file):
+    def getfile(self, remote_file, local_file,
+                    chunk_size = None, preallocate = False, atomic = False,
+                    progress = None):
         """Retrieve an entire file efficiently from the remote machine.
 
+        The file is received in chunks of chunk_size bytes, which should be
+        in the MiB range for large files.
+
         :param remote_file: Path to file to be sent from remote machine
         :param local_file: Path to file to be written to on local machine
+        :param chunk_size: Bytes to receive and write at a time [default: 1 MiB]
+        :param preallocate: If set to True, allocate disk space for the whole
+            file before writing (uses posix_fallocate where available)
+        :param atomic: If set to True, write to a temporary file next to
+            local_file and rename it into place once the transfer is complete
+        :param progress: Function called after each chunk as
+            progress(bytes_received, total_bytes, bytes_per_second)
         :returns: Bytes written
 
         """
 
         self._connect()
-        length = int(self._simple_command("getfile {0}\n".format(
-            quote(remote_file))))
-        bytes_recv = self._get_fixed_data(length, local_file)
+        length = int(self._simple_command(_command("getfile",
+            remote_file)))
+        bytes_recv = self._get_file_data(length, local_file,
+                                             chunk_size, preallocate, atomic,
+                                             progress)
         self._disconnect()
 
         return bytes_recv
 
+    def parallel_fetch(self, remote_file, local_file,
+                           workers = 4, chunk_size = None, retries = 3):
+        """Retrieve a large file from the remote machine over several connections.
+
+        The file is split into ranges of chunk_size bytes, which are read
+        concurrently by `workers` threads, each with its own connection and
+        remote file descriptor, and written in place into the local file.
+        Ranges that fail because of a broken connection (or TryAgain) are
+        retried on a new connection.
+
+        Falls back to getfile() on platforms without os.pwrite.
+
+        :param remote_file: Path to file to be sent from remote machine
+        :param local_file: Path to file to be written to on local machine
+        :param workers: Number of concurrent connections
+        :param chunk_size: Bytes per range [default: 8 MiB]
+        :param retries: Number of times to retry a failed range
+        :returns: Bytes written
+
+        """
+
+        if not hasattr(os, "pwrite"):
+            return self.getfile(remote_file, local_file)
+
+        if chunk_size == None:
+            chunk_size = 8 * self.__class__.CHIRP_CHUNK_SIZE
+        chunk_size = max(1, int(chunk_size))
+
+        # a stale size from the metadata cache would truncate or pad the copy
+        self._invalidate([remote_file])
+        length = self.stat(remote_file).st_size
+        buffers = threading.local() # one receive buffer per worker
+        received = [0] # bytes of the ranges received completely
+        lock = threading.Lock()
+
+        wfd = os.open(local_file,
+                          os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            # preallocate the local file so ranges can be written in any order
+            try:
+                os.posix_fallocate(wfd, 0, length)
+            except (AttributeError, OSError):
+                os.ftruncate(wfd, length)
+
+            def transfer(chirp, rfd, offset, size):
+                if not hasattr(buffers, "view"):
+                    buffers.view = memoryview(
+                        bytearray(min(chunk_size, length)))
+                view = buffers.view
+                pos = 0
+                while pos < size:
+                    rb = chirp._read(rfd, size - pos, offset + pos,
+                                         buf = view[pos:size])
+                    if rb == 0:
+                        raise EnvironmentError(
+                            "{0} is shorter than {1} bytes".format(
+                                remote_file, length))
+                    pos += rb
+                pos = 0
+                while pos < size:
+                    pos += os.pwrite(wfd, view[pos:size], offset + pos)
+                with lock:
+                    received[0] += size
+
+            self._transfer_ranges(remote_file, "r", length, chunk_size,
+                                      workers, retries, transfer)
+        finally:
+            os.close(wfd)
+
+        bytes_recv = received[0]
+
+        if bytes_recv != length:
+            raise EnvironmentError(
+                "Received {0} bytes of {1} bytes in {2}".format(
+                    bytes_recv, length, remote_file))
+        return bytes_recv
+
+    def parallel_put(self, local_file, remote_file, mode = None,
+                         workers = 4, chunk_size = None, retries = 3):
+        """Store a large file to the remote machine over several connections.
+
+        The remote file is created (or truncated) once, then ranges of
+        chunk_size bytes are written concurrently by `workers` threads, each
+        with its own connection and remote file descriptor. The local file is
+        memory-mapped, so ranges are sent without being copied. Ranges that
+        fail because of a broken connection (or TryAgain) are retried on a new
+        connection. Each descriptor is synced before it is closed, and the
+        final size of the remote file is checked.
+
+        :param local_file: Path to file to be sent from local machine
+        :param remote_file: Path to file to be written to on remote machine
+        :param mode: Permission mode to set [default: 0777]
+        :param workers: Number of concurrent connections
+        :param chunk_size: Bytes per range [default: 8 MiB]
+        :param retries: Number of times to retry a failed range
+        :returns: Size of written file
+
+        """
+
+        if chunk_size == None:
+            chunk_size = 8 * self.__class__.CHIRP_CHUNK_SIZE
+        chunk_size = max(1, int(chunk_size))
+
+        # create or truncate the remote file once
+        self._connect()
+        self._close(self._open(remote_file, "wct", mode))
+        self._disconnect()
+        self._invalidate([remote_file])
+
+        with open(local_file, "rb") as rfd:
+            length = os.fstat(rfd.fileno()).st_size
+            if length == 0:
+                return 0
+            mm = mmap.mmap(rfd.fileno(), 0, access = mmap.ACCESS_READ)
+            view = memoryview(mm)
+            try:
+                def transfer(chirp, wfd, offset, size):
+                    pos = 0
+                    while pos < size:
+                        wb = chirp._write(wfd, view[offset + pos:offset + size],
+                                              size - pos, offset + pos)
+                        if wb == 0:
+                            raise EnvironmentError(
+                                "The server is not accepting any more data")
+                        pos += wb
+
+                self._transfer_ranges(remote_file, "w", length, chunk_size,
+                                          workers, retries, transfer)
+            finally:
+                view.release()
+                mm.close()
+
+        # Better check how much data was written
+        self._invalidate([remote_file])
+        size = self.stat(remote_file).st_size
+        if size != length:
+            raise UserWarning(
+                "Only {0} bytes of {1} bytes in {2} were written".format(
+                    size, length, local_file))
+        return size
+
     def putfile(self, local_file, remote_file, mode = None):
         """Store an entire file efficiently to the remote machine.
 
         This method will create or overwrite the file on the remote machine. If
         you want to append to a file, use the write() method.
 
+        The file is sent with socket.sendfile() where available, so its data
+        does not pass through Python.
+
         :param local_file: Path to file to be sent from local machine
         :param remote_file: Path to file to be written to on remote machine
         :param mode: Permission mode to set [default: 0777]
-        :returns: Size of written file
+        :returns: Size of written file, as reported by the server
+        :raises UserWarning: If the server wrote fewer bytes than were sent
 
         """
 
@@ -831,69 +2560,234 @@ class HTChirp:
 
         # get file size
         length = os.stat(local_file).st_size
-        bytes_sent = 0
 
         # send the file
         self._connect()
-        self._simple_command("putfile {0} {1} {2}\n".format(
-            quote(remote_file),
+        self._simple_command(_command("putfile",
+            remote_file,
             int(mode),
             int(length)))
-        wfd = self._socket.makefile("wb") # open socket as a file object
-        with open(local_file, "rb") as rfd:
-            data = rfd.read(self.__class__.CHIRP_LINE_MAX)
-            while data: # write to socket CHIRP_LINE_MAX bytes at a time
-                wfd.write(data)
-                bytes_sent += len(data)
-                data = rfd.read(self.__class__.CHIRP_LINE_MAX)
-        wfd.close()
+        try:
+            with open(local_file, "rb") as rfd:
+                bytes_sent = self._send_file_data(rfd, length)
+            if bytes_sent < length:
+                raise EnvironmentError(
+                    "Only {0} bytes of {1} bytes in {2} could be read".format(
+                        bytes_sent, length, local_file))
+        except BaseException:
+            # the server is still waiting for data, so drop the connection
+            self._drop_connection()
+            raise
+        wb = int(self._simple_response()) # get bytes written
         self._disconnect()
+        self._invalidate([remote_file])
 
-        return bytes_sent
+        if wb < length:
+            raise UserWarning(
+                "Only {0} bytes of {1} bytes in {2} were written".format(
+                    wb, length, local_file))
+        return wb
 
-    def getlongdir(self, remote_path):
-        """List a directory and all its file metadata on the remote machine.
+    def scandir(self, remote_path):
+        """Iterate over a directory on the remote machine.
+
+        Entries are parsed as the listing is received, so the first entries are
+        available early and memory use does not grow with the size of the
+        directory. The entries '.' and '..' are not included. The connection is
+        in use until the iterator is exhausted or closed.
 
         :param remote_path: Path to directory
-        :returns: A dict of file metadata
+        :returns: An iterator of ChirpDirEntry objects
 
         """
 
-        names = ["device", "inode", "mode", "nlink", "uid", "gid", "rdevice"
-                     "size", "blksize", "blocks", "atime", "mtime", "ctime"]
-
         self._connect()
-        length = int(self._simple_command("getlongdir {0}\n".format(
-            quote(remote_path))))
-        result = self._get_fixed_data(length).decode()
-        self._disconnect()
+        length = int(self._simple_command(_command("getlongdir",
+            remote_path)))
+        return (entry for entry in self._get_dir_entries(remote_path, length)
+                    if entry.name not in (".", ".."))
+
+    def getlongdir(self, remote_path, columns = False):
+        """List a directory and all its file metadata on the remote machine.
+
+        See scandir() to iterate over large directories.
+
+        :param remote_path: Path to directory
+        :param columns: If set to True, return a ChirpListing, which stores the
+            metadata column-wise and takes much less memory for large listings
+        :returns: A dict of ChirpStat file metadata, unless columns is True
+
+        """
+
+        (cached, listing) = self._cache_get("getlongdir", remote_path, columns)
+        if not cached:
+            self._connect()
+            length = int(self._simple_command(_command("getlongdir",
+                remote_path)))
+            entries = self._get_dir_entries(remote_path, length)
+            if columns:
+                listing = ChirpListing()
+                for entry in entries:
+                    listing.append(entry.name, entry.stat())
+            else:
+                listing = dict((entry.name, entry.stat()) for entry in entries)
+            self._cache_put("getlongdir", remote_path, listing, columns)
 
-        results = result.rstrip().split("\n")
-        files = results[::2]
-        stat_dicts = [dict(zip(names, [int(x) for x in s.split()]))
-                          for s in results[1::2]]
-        return dict(zip(files, stat_dicts))
+        # copy, so the cached listing is not changed
+        if columns:
+            return listing.copy()
+        return dict(listing)
 
     def getdir(self, remote_path, stat_dict = False):
         """List a directory on the remote machine.
 
         :param remote_path: Path to directory
-        :param stat_dict: If set to True, return a dict of file metadata
+        :param stat_dict: If set to True, return a dict of ChirpStat file metadata
         :returns: List of files, unless stat_dict is True
 
         """
 
         if stat_dict == True:
-            return getlongdir(remote_path)
+            return self.getlongdir(remote_path)
         else:
-            self._connect()
-            length = int(self._simple_command("getdir {0}\n".format(
-                quote(remote_path))))
-            result = self._get_fixed_data(length).decode()
-            self._disconnect()
+            (cached, files) = self._cache_get("getdir", remote_path)
+            if not cached:
+                self._connect()
+                length = int(self._simple_command(_command("getdir",
+                    remote_path)))
+                result = self._get_fixed_data(length).decode()
+                self._disconnect()
+
+                files = result.rstrip().split("\n")
+                self._cache_put("getdir", remote_path, files)
+            return list(files) # copy, so the cached list is not changed
+
+    def sync_up(self, local_dir, remote_dir, workers = 4):
+        """Mirror a directory tree from the local machine to the remote machine.
+
+        Missing directories are created, and files are only sent if the remote
+        copy is missing or its size or modification time (as listed by
+        getlongdir) differs. The modification time of each sent file is
+        copied, so it is skipped by the next sync. Files are sent by `workers`
+        threads over pooled connections. Remote files that do not exist on the
+        local machine are left in place.
+
+        :param local_dir: Path to directory on local machine
+        :param remote_dir: Path to directory on remote machine
+        :param workers: Number of concurrent connections
+        :returns: A dict with the number of "files" and "bytes" sent, "skipped"
+            files and "directories" created
 
-            files = result.rstrip().split("\n")
-            return files
+        """
+
+        from .pool import ChirpPool
+
+        summary = {"files": 0, "bytes": 0, "skipped": 0, "directories": 0}
+        uploads = []
+
+        def transfer(chirp, item):
+            (local_file, remote_file, st) = item
+            wb = chirp.putfile(local_file, remote_file, stat.S_IMODE(st.st_mode))
+            chirp.utime(remote_file, st.st_atime, st.st_mtime)
+            with lock:
+                summary["files"] += 1
+                summary["bytes"] += wb
+
+        lock = threading.Lock()
+        with ChirpPool(self, size = workers, idle_timeout = None) as pool:
+            with pool.connection() as chirp:
+                for (local_path, _, files) in os.walk(local_dir):
+                    rel_path = os.path.relpath(local_path, local_dir)
+                    if rel_path == os.curdir:
+                        remote_path = remote_dir
+                    else:
+                        remote_path = posixpath.join(
+                            remote_dir, *rel_path.split(os.sep))
+                    try:
+                        remote_files = chirp.getlongdir(remote_path)
+                    except self.DoesntExist:
+                        chirp.mkdir(remote_path,
+                                        stat.S_IMODE(os.stat(local_path).st_mode))
+                        summary["directories"] += 1
+                        remote_files = {}
+                    for name in files:
+                        local_file = os.path.join(local_path, name)
+                        st = os.stat(local_file)
+                        remote_stat = remote_files.get(name)
+                        if (remote_stat is not None and
+                                remote_stat.st_size == st.st_size and
+                                remote_stat.st_mtime == int(st.st_mtime)):
+                            summary["skipped"] += 1
+                        else:
+                            uploads.append((local_file,
+                                                posixpath.join(remote_path, name),
+                                                st))
+            self._transfer_files(pool, uploads, workers, transfer)
+
+        return summary
+
+    def sync_down(self, remote_dir, local_dir, workers = 4):
+        """Mirror a directory tree from the remote machine to the local machine.
+
+        Missing directories are created, and regular files are only retrieved
+        if the local copy is missing or its size or modification time differs
+        from the remote file (as listed by getlongdir). Files are written
+        atomically and get the remote modification time, so they are skipped by
+        the next sync. Files are retrieved by `workers` threads over pooled
+        connections. Local files that do not exist on the remote machine are
+        left in place.
+
+        :param remote_dir: Path to directory on remote machine
+        :param local_dir: Path to directory on local machine
+        :param workers: Number of concurrent connections
+        :returns: A dict with the number of "files" and "bytes" retrieved,
+            "skipped" files and "directories" created
+
+        """
+
+        from .pool import ChirpPool
+
+        summary = {"files": 0, "bytes": 0, "skipped": 0, "directories": 0}
+        downloads = []
+
+        def transfer(chirp, item):
+            (remote_file, local_file, remote_stat) = item
+            bytes_recv = chirp.getfile(remote_file, local_file, atomic = True)
+            os.utime(local_file, (remote_stat.st_atime, remote_stat.st_mtime))
+            with lock:
+                summary["files"] += 1
+                summary["bytes"] += bytes_recv
+
+        lock = threading.Lock()
+        with ChirpPool(self, size = workers, idle_timeout = None) as pool:
+            with pool.connection() as chirp:
+                pending = [(remote_dir, local_dir)]
+                while pending:
+                    (remote_path, local_path) = pending.pop()
+                    if not os.path.isdir(local_path):
+                        os.makedirs(local_path)
+                        summary["directories"] += 1
+                    for entry in chirp.scandir(remote_path):
+                        remote_stat = entry.stat()
+                        remote_file = entry.path
+                        local_file = os.path.join(local_path, entry.name)
+                        if entry.is_dir():
+                            pending.append((remote_file, local_file))
+                        elif entry.is_file():
+                            try:
+                                st = os.stat(local_file)
+                            except OSError:
+                                st = None
+                            if (st is not None and
+                                    st.st_size == remote_stat.st_size and
+                                    int(st.st_mtime) == remote_stat.st_mtime):
+                                summary["skipped"] += 1
+                            else:
+                                downloads.append((remote_file, local_file,
+                                                      remote_stat))
+            self._transfer_files(pool, downloads, workers, transfer)
+
+        return summary
 
     def whoami(self):
         """Get the user's current identity with respect to this server.
@@ -903,7 +2797,7 @@ class HTChirp:
         """
 
         self._connect()
-        length = int(self._simple_command("whoami {0}\n".format(
+        length = int(self._simple_command(_command("whoami",
             self.__class__.CHIRP_LINE_MAX)))
         result = self._get_fixed_data(length).decode()
         self._disconnect()
@@ -919,8 +2813,8 @@ class HTChirp:
         """
 
         self._connect()
-        length = int(self._simple_command("whoareyou {0} {1}\n".format(
-            quote(remote_host),
+        length = int(self._simple_command(_command("whoareyou",
+            remote_host,
             self.__class__.CHIRP_LINE_MAX)))
         result = self._get_fixed_data(length).decode()
         self._disconnect()
@@ -940,10 +2834,11 @@ class HTChirp:
             self.symlink(old_path, new_path)
         else:
             self._connect()
-            self._simple_command("link {0} {1}\n".format(
-                quote(old_path),
-                quote(new_path)))
+            self._simple_command(_command("link",
+                old_path,
+                new_path))
             self._disconnect()
+            self._invalidate([new_path])
 
     def symlink(self, old_path, new_path):
         """Create a symbolic link on the remote machine.
@@ -954,10 +2849,11 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("symlink {0} {1}\n".format(
-            quote(old_path),
-            quote(new_path)))
+        self._simple_command(_command("symlink",
+            old_path,
+            new_path))
         self._disconnect()
+        self._invalidate([new_path])
 
     def readlink(self, remote_path):
         """Read the contents of a symbolic link.
@@ -968,8 +2864,8 @@ class HTChirp:
         """
 
         self._connect()
-        length = self._simple_command("readlink {0} {1}\n".format(
-            quote(remote_path),
+        length = self._simple_command(_command("readlink",
+            remote_path,
             self.__class__.CHIRP_LINE_MAX))
         result = self._get_fixed_data(length)
         self._disconnect()
@@ -982,23 +2878,22 @@ class HTChirp:
         If remote_path is a symbolic link, examine its target.
 
         :param remote_path: Path to file
-        :returns: Dict of file metadata
+        :returns: ChirpStat of file metadata
 
         """
 
-        names = ["device", "inode", "mode", "nlink", "uid", "gid", "rdevice",
-                     "size", "blksize", "blocks", "atime", "mtime", "ctime"]
+        (cached, stats) = self._cache_get("stat", remote_path)
+        if cached:
+            return stats
 
         self._connect()
-        response = self._simple_command("stat {0}\n".format(
-            quote(remote_path)))
-        result = str(self._get_line_data()).rstrip()
-        while len(result.split()) < len(names):
-            result += (" " + str(self._get_line_data()).rstrip())
+        self._simple_command(_command("stat",
+            remote_path))
+        stats = self._get_stat_data(ChirpStat)
         self._disconnect()
 
-        results = [int(x) for x in result.split()]
-        return dict(zip(names, results))
+        self._cache_put("stat", remote_path, stats)
+        return stats
 
     def lstat(self, remote_path):
         """Get metadata for file on the remote machine.
@@ -1006,46 +2901,37 @@ class HTChirp:
         If remote path is a symbolic link, examine the link.
 
         :param remote_path: Path to file
-        :returns: Dict of file metadata
+        :returns: ChirpStat of file metadata
 
         """
 
-        names = ["device", "inode", "mode", "nlink", "uid", "gid", "rdevice",
-                     "size", "blksize", "blocks", "atime", "mtime", "ctime"]
+        (cached, stats) = self._cache_get("lstat", remote_path)
+        if cached:
+            return stats
 
         self._connect()
-        response = self._simple_command("lstat {0}\n".format(
-            quote(remote_path)))
-        result = str(self._get_line_data()).rstrip()
-        while len(result.split()) < len(names):
-            result += (" " + str(self._get_line_data()).rstrip())
+        self._simple_command(_command("lstat",
+            remote_path))
+        stats = self._get_stat_data(ChirpStat)
         self._disconnect()
 
-        results = [int(x) for x in result.split()]
-        stats = dict(zip(names, results))
+        self._cache_put("lstat", remote_path, stats)
         return stats
 
     def statfs(self, remote_path):
         """Get metadata for a file system on the remote machine.
 
         :param remote_path: Path to examine
-        :returns: Dict of filesystem metadata
+        :returns: ChirpStatFS of filesystem metadata
 
         """
 
-        names = ["type", "bsize", "blocks", "bfree", "bavail", "files", "free"]
-        names = ["f_" + x for x in names]
-
         self._connect()
-        response = self._simple_command("statfs {0}\n".format(
-            quote(remote_path)))
-        result = self._get_line_data().rstrip()
-        while len(result.split()) < len(names):
-            result += (" " + self._get_line_data().rstrip())
+        self._simple_command(_command("statfs",
+            remote_path))
+        stats = self._get_stat_data(ChirpStatFS)
         self._disconnect()
 
-        results = [int(x) for x in result.split()]
-        stats = dict(zip(names, results))
         return stats
 
     def access(self, remote_path, mode_str):
@@ -1057,25 +2943,18 @@ class HTChirp:
 
         """
 
-        modes = {
-            "f": 0,
-            "r": stat.S_IROTH,
-            "w": stat.S_IWOTH,
-            "x": stat.S_IXOTH
-            }
-
-        mode = 0
-        for m in mode_str:
-            if m not in modes:
-                raise ValueError("mode '{0}' not in (fxwr)".format(m))
-            mode = mode | modes[m]
+        mode = self._access_mode(mode_str)
+        if self._cache_get("access", remote_path, mode)[0]:
+            return
 
         self._connect()
-        self._simple_command("access {0} {1}\n".format(
-            quote(remote_path),
+        self._simple_command(_command("access",
+            remote_path,
             int(mode)))
         self._disconnect()
 
+        self._cache_put("access", remote_path, None, mode)
+
     def chmod(self, remote_path, mode):
         """Change permission mode of a path on the remote machine.
 
@@ -1085,10 +2964,11 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("chmod {0} {1}\n".format(
-            quote(remote_path),
+        self._simple_command(_command("chmod",
+            remote_path,
             int(mode)))
         self._disconnect()
+        self._invalidate([remote_path])
 
     def chown(self, remote_path, uid, gid):
         """Change the UID and/or GID of a path on the remote machine.
@@ -1102,11 +2982,12 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("chown {0} {1} {2}\n".format(
-            quote(remote_path),
+        self._simple_command(_command("chown",
+            remote_path,
             int(uid),
             int(gid)))
         self._disconnect()
+        self._invalidate([remote_path])
 
     def lchown(self, remote_path, uid, gid):
         """Changes the ownership of a file or directory.
@@ -1120,11 +3001,12 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("lchown {0} {1} {2}\n".format(
-            quote(remote_path),
+        self._simple_command(_command("lchown",
+            remote_path,
             int(uid),
             int(gid)))
         self._disconnect()
+        self._invalidate([remote_path])
 
     def truncate(self, remote_path, length):
         """Truncates a file on the remote machine to a given number of bytes.
@@ -1135,10 +3017,11 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("truncate {0} {1}\n".format(
-            quote(remote_path),
+        self._simple_command(_command("truncate",
+            remote_path,
             int(length)))
         self._disconnect()
+        self._invalidate([remote_path])
 
     def utime(self, remote_path, actime, mtime):
         """Change the access and modification times of a file
@@ -1151,11 +3034,34 @@ class HTChirp:
         """
 
         self._connect()
-        self._simple_command("utime {0} {1} {2}\n".format(
-            quote(remote_path),
+        self._simple_command(_command("utime",
+            remote_path,
             int(actime),
             int(mtime)))
         self._disconnect()
+        self._invalidate([remote_path])
+
+    # Pipelined commands
+
+    def batch(self, raise_errors = True):
+        """Create a batch of pipelined commands.
+
+        Commands queued in the batch are sent together when the batch is
+        executed (at the end of a with block), so that N independent commands
+        take about one round trip. See ChirpBatch for the available commands.
+
+        >>> with chirp.batch() as b:
+        ...     size = b.stat('/tmp/my-job-output')
+        ...     b.set_job_attr('Progress', '1')
+        >>> size.result()['size']
+
+        :param raise_errors: If set to True, raise the first error returned by
+            the server once all responses have been read
+        :returns: A ChirpBatch
+
+        """
+
+        return ChirpBatch(self, raise_errors)
 
     ## Chirp commands that are not implemented in HTCondor
 
@@ -1263,8 +3169,27 @@ class HTChirp:
     ## custom exceptions
 
     class ChirpError(Exception):
-        """Base class for all chirp errors."""
-        pass
+        """Base class for all chirp errors.
+
+        Errors returned by the server carry the error code, the name of the
+        command that failed and the path (or job attribute) it was run on.
+
+        """
+
+        def __init__(self, message = "", code = None, command = None,
+                         path = None):
+            Exception.__init__(self, message)
+            self.code = code
+            self.command = command
+            self.path = path
+
+        def __str__(self):
+            message = Exception.__str__(self)
+            if self.command is None:
+                return message
+            elif self.path is None:
+                return "{0}: {1}".format(self.command, message)
+            return "{0} {1}: {2}".format(self.command, self.path, message)
 
     class NotAuthenticated(ChirpError):
         pass
@@ -1319,3 +3244,336 @@ class HTChirp:
 
     class UnknownError(ChirpError):
         pass
+
+    # exception classes and messages for the error codes returned by the server
+    CHIRP_ERRORS = {
+        -1: (NotAuthenticated, "The client has not authenticated its identity."),
+        -2: (NotAuthorized, "The client is not authorized to perform that action."),
+        -3: (DoesntExist, "There is no object by that name."),
+        -4: (AlreadyExists, "There is already an object by that name."),
+        -5: (TooBig, "That request is too big to execute."),
+        -6: (NoSpace, "There is not enough space to store that."),
+        -7: (NoMemory, "The server is out of memory."),
+        -8: (InvalidRequest, "The form of the request is invalid."),
+        -9: (TooManyOpen, "There are too many resources in use."),
+        -10: (Busy, "That object is in use by someone else."),
+        -11: (TryAgain, "A temporary condition prevented the request."),
+        -12: (BadFD, "The file descriptor requested is invalid."),
+        -13: (IsDir, "A file-only operation was attempted on a directory."),
+        -14: (NotDir, "A directory operation was attempted on a file."),
+        -15: (NotEmpty, "A directory cannot be removed because it is not empty."),
+        -16: (CrossDeviceLink, "A hard link was attempted across devices."),
+        -17: (Offline, "The requested resource is temporarily not available."),
+        -127: (UnknownError, "An unknown error (-127) occured."),
+    }
+
+
+class ChirpResult(object):
+    """Result of a command queued in a ChirpBatch
+
+    The result is available once the batch has been executed.
+
+    """
+
+    def __init__(self, command):
+        self.command = command # the command line sent to the server, as bytes
+        self.done = False
+        self._value = None
+        self._exception = None
+
+    def __repr__(self):
+        if not self.done:
+            state = "pending"
+        elif self._exception is not None:
+            state = "failed: {0!r}".format(self._exception)
+        else:
+            state = "done: {0!r}".format(self._value)
+        return "{0}({1!r}) {2}".format(
+            self.__class__.__name__, self.command.decode().rstrip(), state)
+
+    def exception(self):
+        """Get the error raised by the command, if any
+
+        :returns: The ChirpError raised by this command, or None
+
+        """
+
+        if not self.done:
+            raise RuntimeError("The batch has not been executed.")
+        return self._exception
+
+    def result(self):
+        """Get the value returned by the command
+
+        :returns: The value the equivalent HTChirp method would return
+        :raises ChirpError: The error returned by the server for this command
+
+        """
+
+        if self.exception() is not None:
+            raise self._exception
+        return self._value
+
+
+class ChirpBatch(object):
+    """Pipelined batch of independent Chirp commands
+
+    Commands queued in a batch are sent back to back and their responses read
+    afterwards, so a batch of N commands costs about one round trip instead
+    of N. Each queueing method returns a ChirpResult for that command. Use
+    HTChirp.batch() to create a batch::
+
+        with chirp.batch() as b:
+            size = b.stat('/tmp/my-job-output')
+            b.set_job_attr('Progress', '1')
+        print(size.result()['size'])
+
+    Errors returned by the server are stored in the result of the command
+    that caused them. When the batch is executed, the first such error is
+    raised if raise_errors is set, after all responses have been read.
+
+    Commands in a batch must not depend on each other, since they may all be
+    executed before any response is checked.
+
+    """
+
+    def __init__(self, chirp, raise_errors = True, window = 128):
+        """Batch initialization
+
+        :param chirp: The HTChirp client to run the commands with
+        :param raise_errors: If set to True, execute() raises the first error
+        :param window: Maximum number of commands sent before reading responses
+
+        """
+
+        self._chirp = chirp
+        self._raise_errors = raise_errors
+        self._window = max(1, int(window))
+        self._queue = [] # (ChirpResult, response handler)
+        self._changed = [] # (paths, recursive) to remove from the cache
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def __len__(self):
+        return len(self._queue)
+
+    ## execution
+
+    def execute(self):
+        """Send all queued commands and read their responses
+
+        :returns: List of ChirpResults, in the order the commands were queued
+        :raises ChirpError: The first error returned, if raise_errors is set
+
+        """
+
+        (queue, self._queue) = (self._queue, [])
+        (changed, self._changed) = (self._changed, [])
+        chirp = self._chirp
+
+        chirp._connect()
+        try:
+            for i in range(0, len(queue), self._window):
+                window = queue[i:i + self._window]
+                chirp._socket.sendall(
+                    b"".join([r.command for (r, _) in window]))
+                for (result, handler) in window:
+                    chirp._command_sent = result.command
+                    if chirp._observer is not None:
+                        chirp._begin_event(result.command, pipelined = True)
+                    try:
+                        result._value = handler()
+                    except chirp.ChirpError as e:
+                        result._exception = e
+                    result.done = True
+        except BaseException: # responses of the window may still be coming
+            chirp._drop_connection()
+            raise
+        chirp._disconnect()
+        for (paths, recursive) in changed:
+            chirp._invalidate(paths, recursive)
+
+        results = [r for (r, _) in queue]
+        self.results.extend(results)
+        if self._raise_errors:
+            for result in results:
+                if result._exception is not None:
+                    raise result._exception
+        return results
+
+    ## response handlers
+
+    def _add(self, command, handler, changes = None, recursive = False):
+        """Queue a command
+
+        :param command: The command line, as built by _command()
+        :param handler: Function reading the response and returning its value
+        :param changes: List of paths changed by the command, which are removed
+            from the client's metadata cache once the batch is executed
+        :param recursive: If set to True, the command also changes everything
+            below the changed paths
+        :returns: ChirpResult for the command
+
+        """
+
+        result = ChirpResult(command)
+        self._queue.append((result, handler))
+        if changes:
+            self._changed.append((changes, recursive))
+        return result
+
+    def _status(self):
+        self._chirp._simple_response()
+
+    def _data(self):
+        length = int(self._chirp._simple_response())
+        return self._chirp._get_fixed_data(length)
+
+    def _text(self):
+        return self._data().decode()
+
+    def _lines(self):
+        return self._text().rstrip().split("\n")
+
+    def _stat(self):
+        self._chirp._simple_response()
+        return self._chirp._get_stat_data(ChirpStat)
+
+    def _statfs(self):
+        self._chirp._simple_response()
+        return self._chirp._get_stat_data(ChirpStatFS)
+
+    ## queueing methods, see the HTChirp methods of the same name
+
+    def get_job_attr(self, job_attribute):
+        return self._add(_command("get_job_attr",
+            job_attribute), self._text)
+
+    def get_job_attr_delayed(self, job_attribute):
+        return self._add(_command("get_job_attr_delayed",
+            job_attribute), self._text)
+
+    def set_job_attr(self, job_attribute, attribute_value):
+        return self._add(_command("set_job_attr",
+            job_attribute,
+            attribute_value), self._status)
+
+    def set_job_attr_delayed(self, job_attribute, attribute_value):
+        return self._add(_command("set_job_attr_delayed",
+            job_attribute,
+            attribute_value), self._status)
+
+    def ulog(self, text):
+        return self._add(_command("ulog",
+            text), self._status)
+
+    def phase(self, phasestring):
+        return self._add(_command("phase",
+            phasestring), self._status)
+
+    def rename(self, old_path, new_path):
+        return self._add(_command("rename",
+            old_path,
+            new_path), self._status, [old_path, new_path], True)
+
+    def unlink(self, remote_file):
+        return self._add(_command("unlink",
+            remote_file), self._status, [remote_file])
+
+    def rmdir(self, remote_path, recursive = False):
+        if recursive == True:
+            return self.rmall(remote_path)
+        return self._add(_command("rmdir",
+            remote_path), self._status, [remote_path], True)
+
+    def rmall(self, remote_path):
+        return self._add(_command("rmall",
+            remote_path), self._status, [remote_path], True)
+
+    def mkdir(self, remote_path, mode = None):
+        if mode == None:
+            mode = HTChirp.DEFAULT_MODE
+        return self._add(_command("mkdir",
+            remote_path,
+            int(mode)), self._status, [remote_path])
+
+    def getdir(self, remote_path):
+        return self._add(_command("getdir",
+            remote_path), self._lines)
+
+    def whoami(self):
+        return self._add(_command("whoami",
+            HTChirp.CHIRP_LINE_MAX), self._text)
+
+    def whoareyou(self, remote_host):
+        return self._add(_command("whoareyou",
+            remote_host,
+            HTChirp.CHIRP_LINE_MAX), self._text)
+
+    def link(self, old_path, new_path, symbolic = False):
+        if symbolic:
+            return self.symlink(old_path, new_path)
+        return self._add(_command("link",
+            old_path,
+            new_path), self._status, [new_path])
+
+    def symlink(self, old_path, new_path):
+        return self._add(_command("symlink",
+            old_path,
+            new_path), self._status, [new_path])
+
+    def readlink(self, remote_path):
+        return self._add(_command("readlink",
+            remote_path,
+            HTChirp.CHIRP_LINE_MAX), self._data)
+
+    def stat(self, remote_path):
+        return self._add(_command("stat",
+            remote_path), self._stat)
+
+    def lstat(self, remote_path):
+        return self._add(_command("lstat",
+            remote_path), self._stat)
+
+    def statfs(self, remote_path):
+        return self._add(_command("statfs",
+            remote_path), self._statfs)
+
+    def access(self, remote_path, mode_str):
+        return self._add(_command("access",
+            remote_path,
+            int(self._chirp._access_mode(mode_str))), self._status)
+
+    def chmod(self, remote_path, mode):
+        return self._add(_command("chmod",
+            remote_path,
+            int(mode)), self._status, [remote_path])
+
+    def chown(self, remote_path, uid, gid):
+        return self._add(_command("chown",
+            remote_path,
+            int(uid),
+            int(gid)), self._status, [remote_path])
+
+    def lchown(self, remote_path, uid, gid):
+        return self._add(_command("lchown",
+            remote_path,
+            int(uid),
+            int(gid)), self._status, [remote_path])
+
+    def truncate(self, remote_path, length):
+        return self._add(_command("truncate",
+            remote_path,
+            int(length)), self._status, [remote_path])
+
+    def utime(self, remote_path, actime, mtime):
+        return self._add(_command("utime",
+            remote_path,
+            int(actime),
+            int(mtime)), self._status, [remote_path])
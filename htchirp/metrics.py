@@ -0,0 +1,373 @@
+import time
+import heapq
+import bisect
+import itertools
+import threading
+import collections
+
+# monotonic clock for the phase timings, if available
+_monotonic = getattr(time, "monotonic", time.time)
+
+
+class ChirpEvent(collections.namedtuple("ChirpEvent", (
+        "command", "path", "start", "duration", "connect", "auth", "send",
+        "first_byte", "transfer", "bytes_sent", "bytes_received",
+        "reconnects", "error", "pipelined"))):
+    """Timings of one command sent to the Chirp server
+
+    Passed to the observer of an HTChirp client after each command. All
+    durations are in seconds:
+
+    - connect, auth: opening and authenticating the connection, if this
+      command needed a new one (otherwise 0)
+    - send: sending the command line
+    - first_byte: waiting for the first byte of the response, after the
+      command (and any data sent with it) was sent
+    - transfer: sending and receiving data other than the command line and
+      the first byte of the response
+    - duration: all of the above, from the start of the connection (or the
+      command) to the last byte sent or received
+
+    :ivar command: Name of the command (e.g. 'stat')
+    :ivar path: Path (or file name, for file descriptors) the command was
+        run on, if any
+    :ivar start: Time the command started, in seconds since the epoch
+    :ivar bytes_sent: Bytes sent, including the command line
+    :ivar bytes_received: Bytes of the response read by the client
+    :ivar reconnects: Number of times the session was re-established for
+        this command
+    :ivar error: The error code returned by the server, None on success
+    :ivar pipelined: True if the command was sent ahead in a ChirpBatch, so
+        its timings only cover reading its response
+
+    """
+
+    __slots__ = ()
+
+
+class _CommandTimer(object):
+    """Collects the timings of the command currently running on a connection"""
+
+    __slots__ = ("command", "path", "start", "wall_start", "connect", "auth",
+                     "sent", "waited_from", "first_received", "last_io",
+                     "bytes_sent", "received", "reconnects", "error",
+                     "pipelined")
+
+    def __init__(self, command, path, setup, received, pipelined = False):
+        """Start timing a command
+
+        :param command: Name of the command
+        :param path: Path the command was run on
+        :param setup: (connect, auth, reconnects) for the connection opened
+            for this command, or None
+        :param received: Bytes read from the connection so far
+        :param pipelined: If set to True, the command was already sent
+
+        """
+
+        self.command = command
+        self.path = path
+        self.start = _monotonic()
+        self.wall_start = time.time()
+        (self.connect, self.auth, self.reconnects) = setup or (0.0, 0.0, 0)
+        self.sent = self.start if pipelined else None
+        self.waited_from = None
+        self.first_received = None
+        self.last_io = None
+        self.bytes_sent = 0
+        self.received = received
+        self.error = None
+        self.pipelined = pipelined
+
+    def on_send(self, size):
+        now = _monotonic()
+        if self.sent is None:
+            self.sent = now
+        self.bytes_sent += size
+        self.last_io = now
+
+    def on_receive(self):
+        now = _monotonic()
+        if self.first_received is None:
+            self.first_received = now
+            self.waited_from = self.last_io or self.sent or self.start
+        self.last_io = now
+
+    def finish(self, received):
+        """Stop timing the command
+
+        :param received: Bytes read from the connection so far
+        :returns: ChirpEvent for the command
+
+        """
+
+        sent = self.sent or self.start
+        last_io = max(self.last_io or sent, sent)
+        if self.first_received is None: # response was already buffered
+            (first_byte, transfer) = (0.0, last_io - sent)
+        else:
+            first_byte = self.first_received - self.waited_from
+            transfer = ((self.waited_from - sent) +
+                            (last_io - self.first_received))
+        return ChirpEvent(
+            command = self.command,
+            path = self.path,
+            start = self.wall_start - self.connect - self.auth,
+            duration = self.connect + self.auth + (last_io - self.start),
+            connect = self.connect,
+            auth = self.auth,
+            send = sent - self.start,
+            first_byte = first_byte,
+            transfer = max(0.0, transfer),
+            bytes_sent = self.bytes_sent,
+            bytes_received = received - self.received,
+            reconnects = self.reconnects,
+            error = self.error,
+            pipelined = self.pipelined)
+
+
+class _MeteredSocket(object):
+    """Socket wrapper reporting sends and receives to the current timer
+
+    Used instead of the plain socket by HTChirp clients with an observer.
+
+    """
+
+    def __init__(self, sock):
+        self._socket = sock
+        self.timer = None # _CommandTimer of the running command
+
+    def __getattr__(self, name):
+        return getattr(self._socket, name)
+
+    def sendall(self, data):
+        self._socket.sendall(data)
+        if self.timer is not None:
+            self.timer.on_send(memoryview(data).nbytes)
+
+    def sendfile(self, file, offset = 0, count = None):
+        sent = self._socket.sendfile(file, offset, count)
+        if self.timer is not None:
+            self.timer.on_send(sent)
+        return sent
+
+    def recv_into(self, buffer, nbytes = 0):
+        received = self._socket.recv_into(buffer, nbytes)
+        if self.timer is not None:
+            self.timer.on_receive()
+        return received
+
+
+class Histogram(object):
+    """Histogram of durations, in buckets of increasing width
+
+    Each bucket counts the values up to its upper bound (and above the
+    previous bound); the last bucket counts everything above the last bound.
+    Percentiles are estimated as the upper bound of the bucket they fall in.
+
+    """
+
+    # 10 us to 100 s in 1-2-5 steps
+    DEFAULT_BOUNDS = tuple(m * 10.0 ** e for e in range(-5, 2)
+                               for m in (1, 2, 5)) + (100.0,)
+
+    def __init__(self, bounds = None):
+        """Histogram initialization
+
+        :param bounds: Increasing upper bounds of the buckets, in seconds
+            [default: DEFAULT_BOUNDS]
+
+        """
+
+        self.bounds = tuple(bounds or self.__class__.DEFAULT_BOUNDS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def __repr__(self):
+        """Print a representation of this object"""
+        return "{0}(count={1}, p50={2}, p99={3}, max={4})".format(
+            self.__class__.__name__,
+            self.count,
+            self.percentile(50),
+            self.percentile(99),
+            self.max)
+
+    def add(self, value):
+        """Count a value"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Estimate a percentile
+
+        :param percent: The percentile, from 0 to 100
+        :returns: The upper bound of the bucket holding the percentile (at
+            most the largest value), None if nothing was counted
+
+        """
+
+        if not self.count:
+            return None
+        rank = max(1, percent / 100.0 * self.count)
+        seen = 0
+        for (bound, count) in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        """Summary of the histogram as a dict, e.g. for JSON
+
+        :returns: Dict of the count, sum, mean, min, max, p50, p90, p99 and
+            the non-empty buckets as [upper bound, count] (the bound of the
+            last bucket is None)
+
+        """
+
+        bounds = self.bounds + (None,)
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": [[bound, count] for (bound, count)
+                            in zip(bounds, self.counts) if count],
+        }
+
+
+class ChirpMetrics(object):
+    """Counters and histograms of the commands sent by HTChirp clients
+
+    Pass it as the observer of a client to aggregate the ChirpEvents of every
+    command. It can be shared by several clients and threads::
+
+        metrics = ChirpMetrics()
+        chirp = HTChirp(observer = metrics)
+        ...
+        print(metrics.commands['getfile']['duration'].percentile(99))
+        json.dump(metrics.as_dict(), sys.stderr)
+
+    """
+
+    PHASES = ("duration", "connect", "auth", "send", "first_byte", "transfer")
+
+    def __init__(self, slowest = 10, bounds = None):
+        """Metrics initialization
+
+        :param slowest: Number of slowest events to keep
+        :param bounds: Upper bounds of the histogram buckets, in seconds
+            [default: Histogram.DEFAULT_BOUNDS]
+
+        """
+
+        self._slowest_size = slowest
+        self._bounds = bounds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __repr__(self):
+        """Print a representation of this object"""
+        return "{0}({1} commands, {2} errors)".format(
+            self.__class__.__name__,
+            self.calls,
+            self.errors)
+
+    def __call__(self, event):
+        """Count an event
+
+        :param event: A ChirpEvent
+
+        """
+
+        with self._lock:
+            stats = self.commands.get(event.command)
+            if stats is None:
+                stats = self.commands[event.command] = self._new_stats()
+            stats["calls"] += 1
+            stats["bytes_sent"] += event.bytes_sent
+            stats["bytes_received"] += event.bytes_received
+            stats["reconnects"] += event.reconnects
+            for phase in self.__class__.PHASES:
+                stats[phase].add(getattr(event, phase))
+            self.calls += 1
+            if event.error is not None:
+                stats["errors"][event.error] += 1
+                self.errors += 1
+
+            if self._slowest_size:
+                item = (event.duration, next(self._sequence), event)
+                if len(self._slowest) < self._slowest_size:
+                    heapq.heappush(self._slowest, item)
+                elif item[0] > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, item)
+
+    def _new_stats(self):
+        stats = {
+            "calls": 0,
+            "errors": collections.Counter(), # error code -> count
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "reconnects": 0,
+        }
+        for phase in self.__class__.PHASES:
+            stats[phase] = Histogram(self._bounds)
+        return stats
+
+    def reset(self):
+        """Forget everything counted so far"""
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.commands = {} # command -> counters and histograms
+            self._slowest = [] # heap of (duration, sequence, event)
+            self._sequence = itertools.count()
+
+    def slowest(self):
+        """The slowest events counted, slowest first
+
+        :returns: List of ChirpEvents
+
+        """
+
+        with self._lock:
+            return [event for (_, _, event) in sorted(self._slowest,
+                                                           reverse = True)]
+
+    def as_dict(self):
+        """Summary of all counters and histograms as a dict, e.g. for JSON
+
+        :returns: Dict with the total "calls" and "errors", the counters and
+            histograms of each command in "commands" and the "slowest" events
+
+        """
+
+        with self._lock:
+            commands = {}
+            for (command, stats) in self.commands.items():
+                summary = dict(stats)
+                summary["errors"] = dict((str(code), count)
+                                             for (code, count)
+                                             in stats["errors"].items())
+                for phase in self.__class__.PHASES:
+                    summary[phase] = stats[phase].as_dict()
+                commands[command] = summary
+            result = {
+                "calls": self.calls,
+                "errors": self.errors,
+                "commands": commands,
+            }
+        result["slowest"] = [dict(event._asdict()) for event in self.slowest()]
+        return result
@@ -0,0 +1,224 @@
+import threading
+import contextlib
+
+from .htchirp import HTChirp, _monotonic
+
+# shared pools, keyed on (host, port, cookie)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(chirp, **kwargs):
+    """
+    Get the shared connection pool for a Chirp server
+
+    Pools are shared between all callers using the same host, port, and
+    cookie. A new pool is created from chirp if there is none yet.
+
+    :param chirp: An HTChirp client for the server
+    :param kwargs: Arguments for ChirpPool, if a new pool is created
+    :returns: The ChirpPool for the server
+
+    """
+
+    key = (chirp._host, chirp._port, chirp._cookie)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.closed:
+            pool = _pools[key] = ChirpPool(chirp, **kwargs)
+    return pool
+
+
+class ChirpPool(object):
+    """Thread-safe pool of authenticated connections to a Chirp server
+
+    HTChirp objects are not thread-safe. A pool hands out HTChirp clients,
+    each with its own connection held open in a persistent session, to one
+    thread at a time::
+
+        pool = ChirpPool(HTChirp(), size = 8)
+        with pool.connection() as chirp:
+            chirp.putfile('output.dat', '/tmp/output.dat')
+
+    At most `size` connections are open at once. Idle connections are closed
+    after idle_timeout seconds, and a connection is checked (and if needed
+    re-established) before it is handed out.
+
+    """
+
+    def __init__(self, chirp, size = 4, idle_timeout = 60.0,
+                     block = True, timeout = None):
+        """Connection pool initialization
+
+        :param chirp: An HTChirp client for the server, used as a template for
+            the pooled clients (authentication is not probed again)
+        :param size: Maximum number of connections
+        :param idle_timeout: Seconds after which idle connections are closed,
+            None to keep them open
+        :param block: If set to False, acquire() fails instead of waiting for
+            a connection to be released
+        :param timeout: Maximum seconds acquire() waits, None to wait forever
+
+        """
+
+        self.closed = False
+        self.created = 0 # number of connections opened
+        self._chirp = chirp
+        self._size = max(1, int(size))
+        self._idle_timeout = idle_timeout
+        self._block = block
+        self._timeout = timeout
+        self._idle = [] # (client, time it was released)
+        self._in_use = 0 # number of clients handed out or being connected
+        self._condition = threading.Condition()
+
+    def __repr__(self):
+        """Print a representation of this object"""
+        return "{0}({1}, {2}) with {3} of {4} connections in use".format(
+            self.__class__.__name__,
+            self._chirp._host,
+            self._chirp._port,
+            self._in_use,
+            self._size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _prune(self):
+        """Remove connections that have been idle for too long
+
+        Must be called with the lock held.
+
+        :returns: List of removed clients, to be closed without the lock
+
+        """
+
+        if self._idle_timeout is None:
+            return []
+        cutoff = _monotonic() - self._idle_timeout
+        expired = [client for (client, t) in self._idle if t < cutoff]
+        self._idle = [(client, t) for (client, t) in self._idle if t >= cutoff]
+        return expired
+
+    def acquire(self, block = None, timeout = None):
+        """Get a connected client from the pool
+
+        The client must be given back with release(), see also connection().
+
+        :param block: Wait for a connection if all are in use
+            [default: the pool's setting]
+        :param timeout: Maximum seconds to wait [default: the pool's setting]
+        :returns: An HTChirp client in a persistent session
+        :raises Busy: If no connection became available
+
+        """
+
+        if block == None:
+            block = self._block
+        if timeout == None:
+            timeout = self._timeout
+        deadline = None if timeout is None else _monotonic() + timeout
+
+        client = None
+        expired = []
+        with self._condition:
+            while True:
+                if self.closed:
+                    raise ValueError("The connection pool is closed.")
+                expired.extend(self._prune())
+                if self._idle:
+                    client = self._idle.pop()[0] # most recently used
+                    break
+                if self._in_use + len(self._idle) < self._size:
+                    break # room for a new connection
+                if not block:
+                    raise HTChirp.Busy(
+                        "All {0} connections are in use.".format(self._size))
+                if deadline is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline - _monotonic()
+                    if remaining <= 0:
+                        raise HTChirp.Busy(
+                            "No connection became available in {0} seconds."
+                            .format(timeout))
+                    self._condition.wait(remaining)
+            self._in_use += 1
+        for idle_client in expired:
+            idle_client.__exit__(None, None, None)
+
+        # connect, or check the connection and reconnect if it was dropped
+        try:
+            if client is None:
+                client = self._chirp._clone()
+                client.__enter__()
+                with self._condition:
+                    self.created += 1
+            else:
+                client._connect()
+        except BaseException:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+        return client
+
+    def release(self, client, discard = False):
+        """Give a client back to the pool
+
+        :param client: A client from acquire()
+        :param discard: If set to True, close the connection instead of
+            keeping it for reuse (e.g. after an error left it out of sync)
+
+        """
+
+        with self._condition:
+            self._in_use -= 1
+            keep = not (discard or self.closed)
+            if keep:
+                self._idle.append((client, _monotonic()))
+            self._condition.notify()
+        if not keep:
+            client.__exit__(None, None, None)
+
+    @contextlib.contextmanager
+    def connection(self, block = None, timeout = None):
+        """Borrow a client from the pool for the duration of a with block
+
+        Errors returned by the server leave the connection usable, any other
+        error closes it.
+
+        :param block: Wait for a connection if all are in use
+        :param timeout: Maximum seconds to wait
+        :returns: An HTChirp client in a persistent session
+
+        """
+
+        client = self.acquire(block, timeout)
+        try:
+            yield client
+        except HTChirp.ChirpError:
+            self.release(client)
+            raise
+        except BaseException:
+            self.release(client, discard = True)
+            raise
+        else:
+            self.release(client)
+
+    def close(self):
+        """Close all idle connections and stop handing out new ones
+
+        Clients still in use are closed when they are released.
+
+        """
+
+        with self._condition:
+            self.closed = True
+            (idle, self._idle) = (self._idle, [])
+            self._condition.notify_all()
+        for (client, _) in idle:
+            client.__exit__(None, None, None)
@@ -0,0 +1,739 @@
+import os
+import sys
+import time
+import errno
+import shutil
+import socket
+import argparse
+import binascii
+import threading
+import collections
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from .htchirp import (HTChirp, ChirpStat, ChirpStatFS, unquote, _SocketReader,
+                          _ARGUMENT_RE, _monotonic)
+
+
+# Chirp error codes for the errno values of failed system calls
+_ERRNO_CODES = {
+    errno.EPERM: -2,
+    errno.EACCES: -2,
+    errno.EROFS: -2,
+    errno.ENOENT: -3,
+    errno.EEXIST: -4,
+    errno.EFBIG: -5,
+    errno.ENAMETOOLONG: -5,
+    errno.ENOSPC: -6,
+    errno.EDQUOT: -6,
+    errno.ENOMEM: -7,
+    errno.EINVAL: -8,
+    errno.EMFILE: -9,
+    errno.ENFILE: -9,
+    errno.EBUSY: -10,
+    errno.EAGAIN: -11,
+    errno.EINTR: -11,
+    errno.EBADF: -12,
+    errno.EISDIR: -13,
+    errno.ENOTDIR: -14,
+    errno.ENOTEMPTY: -15,
+    errno.EXDEV: -16,
+}
+
+# open flags of the Chirp protocol
+_OPEN_FLAGS = {
+    "a": os.O_APPEND,
+    "t": os.O_TRUNC,
+    "c": os.O_CREAT,
+    "x": os.O_EXCL,
+}
+
+# bytes sent or received per call when streaming file contents
+_CHUNK_SIZE = 1 << 20
+
+
+class _ChirpStatus(Exception):
+    """Raised by a command handler to respond with a Chirp error code"""
+
+    def __init__(self, code):
+        Exception.__init__(self, code)
+        self.code = code
+
+
+class _Link(object):
+    """Paces data in one direction to a maximum rate, over all connections"""
+
+    def __init__(self, bandwidth):
+        self.bandwidth = float(bandwidth)
+        self._ready = _monotonic() # time the link is free again
+        self._lock = threading.Lock()
+
+    def wait(self, size):
+        """Reserve the link for size bytes and sleep until they are through"""
+        with self._lock:
+            now = _monotonic()
+            self._ready = max(self._ready, now) + size / self.bandwidth
+            delay = self._ready - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _split_arguments(line):
+    """Split a command line into its unquoted words, keeping empty ones"""
+    words = []
+    pos = 0
+    while True:
+        match = _ARGUMENT_RE.match(line, pos)
+        words.append(unquote(match.group(0)))
+        pos = match.end() + 1
+        if pos > len(line):
+            return words
+
+
+def _server_order(record):
+    """Names of the fields of a ChirpStat or ChirpStatFS, in the order sent"""
+    names = [None] * len(record._chirp_order)
+    for (field, position) in zip(record._fields, record._chirp_order):
+        names[position] = field
+    return tuple(names)
+
+
+_STAT_FIELDS = _server_order(ChirpStat)
+_STATFS_FIELDS = _server_order(ChirpStatFS)
+
+
+def _stat_line(result):
+    """Format an os.stat_result as a Chirp stat line"""
+    return (" ".join(str(int(getattr(result, name, 0)))
+                         for name in _STAT_FIELDS) + "\n").encode()
+
+
+def _statfs_line(result):
+    """Format an os.statvfs_result as a Chirp statfs line (f_type is 0)"""
+    return (" ".join(str(int(getattr(result, name, 0)))
+                         for name in _STATFS_FIELDS) + "\n").encode()
+
+
+class _ChirpHandler(socketserver.BaseRequestHandler):
+    """Serves the commands of one client connection"""
+
+    def setup(self):
+        self.chirp_server = self.server.chirp_server
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = _SocketReader(HTChirp.CHIRP_BUFFER_SIZE)
+        self._reader.reset(self.request)
+        self._authenticated = False
+        self._fds = set() # file descriptors opened by this client
+        self._received = _monotonic() # time the current command arrived
+
+    def finish(self):
+        for fd in self._fds:
+            os.close(fd)
+        self._fds.clear()
+
+    def handle(self):
+        server = self.chirp_server
+        server._connected()
+        while True:
+            # commands already buffered arrived with the previous ones, so
+            # pipelined commands share one round trip
+            buffered = len(self._reader) > 0
+            try:
+                line = self._reader.readline(HTChirp.CHIRP_LINE_MAX)
+            except (EnvironmentError, RuntimeError):
+                return
+            if not buffered:
+                self._received = _monotonic()
+
+            words = _split_arguments(line.decode().rstrip("\n"))
+            (name, args) = (words[0], words[1:])
+            server._count(name)
+            handler = getattr(self, "_do_" + name, None)
+            try:
+                if handler is None:
+                    raise _ChirpStatus(-8)
+                if not self._authenticated and name != "cookie":
+                    raise _ChirpStatus(-1)
+                handler(*args)
+            except _ChirpStatus as e:
+                self._respond(e.code)
+            except (TypeError, ValueError):
+                self._respond(-8)
+            except EnvironmentError as e:
+                if isinstance(e, socket.error) and e.errno in (
+                        errno.EPIPE, errno.ECONNRESET):
+                    return
+                self._respond(_ERRNO_CODES.get(e.errno, -127))
+            except RuntimeError: # the client went away mid-transfer
+                return
+
+    # I/O helpers
+
+    def _delay(self):
+        """Wait until the simulated round trip of the command has passed"""
+        delay = self._received + self.chirp_server.latency - _monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send(self, data):
+        """Send data, paced to the bandwidth limit"""
+        link = self.chirp_server._send_link
+        if link is None:
+            self.request.sendall(data)
+            return
+        view = memoryview(data)
+        for pos in range(0, len(view), self.chirp_server._chunk_size):
+            chunk = view[pos:pos + self.chirp_server._chunk_size]
+            link.wait(len(chunk))
+            self.request.sendall(chunk)
+
+    def _respond(self, response, data = None):
+        """Send a response line, followed by data if given"""
+        self._delay()
+        line = (str(int(response)) + "\n").encode()
+        if data is None:
+            self._send(line)
+        elif len(data) < _CHUNK_SIZE:
+            self._send(line + bytes(data))
+        else:
+            self._send(line)
+            self._send(data)
+
+    def _receive(self, length):
+        """Receive length bytes of data sent after a command, in chunks
+
+        :returns: A generator of memoryviews, valid until the next one
+
+        """
+
+        link = self.chirp_server._recv_link
+        chunk_size = (self.chirp_server._chunk_size if link is not None
+                          else _CHUNK_SIZE)
+        buf = memoryview(bytearray(min(length, chunk_size)))
+        remaining = length
+        while remaining > 0:
+            chunk = buf[:min(remaining, len(buf))]
+            if link is not None:
+                link.wait(len(chunk))
+            self._reader.readinto(chunk)
+            remaining -= len(chunk)
+            yield chunk
+
+    def _receive_all(self, length):
+        """Receive length bytes of data sent after a command"""
+        data = bytearray()
+        for chunk in self._receive(length):
+            data += chunk
+        return data
+
+    def _path(self, remote_path):
+        """Map a remote path to a path below the server's root directory"""
+        root = self.chirp_server.root
+        path = os.path.normpath(os.path.join(root, remote_path.lstrip("/")))
+        if path != root and not path.startswith(root.rstrip(os.sep) + os.sep):
+            raise _ChirpStatus(-2)
+        return path
+
+    def _fd(self, fd):
+        """Check a file descriptor sent by the client"""
+        fd = int(fd)
+        if fd not in self._fds:
+            raise _ChirpStatus(-12)
+        return fd
+
+    def _check_length(self, length):
+        """Check the length of a read or write against the server's limit"""
+        length = int(length)
+        if length < 0:
+            raise _ChirpStatus(-8)
+        max_io = self.chirp_server.max_io
+        if max_io is not None and length > max_io:
+            raise _ChirpStatus(-5)
+        return length
+
+    # commands
+
+    def _do_cookie(self, cookie):
+        if cookie != self.chirp_server.cookie:
+            raise _ChirpStatus(-1)
+        self._authenticated = True
+        self._respond(0)
+
+    def _do_open(self, path, flags, mode):
+        if "r" in flags and "w" in flags:
+            open_flags = os.O_RDWR
+        elif "w" in flags:
+            open_flags = os.O_WRONLY
+        else:
+            open_flags = os.O_RDONLY
+        for (flag, value) in _OPEN_FLAGS.items():
+            if flag in flags:
+                open_flags |= value
+        fd = os.open(self._path(path), open_flags | getattr(os, "O_BINARY", 0),
+                         int(mode) & 0o7777)
+        self._fds.add(fd)
+        try:
+            line = _stat_line(os.fstat(fd))
+        except EnvironmentError:
+            self._fds.discard(fd)
+            os.close(fd)
+            raise
+        self._respond(fd, line)
+
+    def _do_close(self, fd):
+        fd = self._fd(fd)
+        self._fds.discard(fd)
+        os.close(fd)
+        self._respond(0)
+
+    def _do_read(self, fd, length):
+        (fd, length) = (self._fd(fd), self._check_length(length))
+        data = os.read(fd, length)
+        self._respond(len(data), data)
+
+    def _do_pread(self, fd, length, offset):
+        (fd, length) = (self._fd(fd), self._check_length(length))
+        data = os.pread(fd, length, int(offset))
+        self._respond(len(data), data)
+
+    def _do_sread(self, fd, length, offset, stride_length, stride_skip):
+        (fd, length) = (self._fd(fd), self._check_length(length))
+        (offset, stride_length, stride_skip) = (
+            int(offset), int(stride_length), int(stride_skip))
+        if stride_length <= 0 or stride_skip < 0:
+            raise _ChirpStatus(-8)
+        data = bytearray()
+        while length - len(data) >= stride_length:
+            chunk = os.pread(fd, stride_length, offset)
+            data += chunk
+            if len(chunk) < stride_length:
+                break
+            offset += stride_skip
+        self._respond(len(data), data)
+
+    def _write(self, fd, length, offset = None):
+        """Receive the data of a write, then write it at offset (or at the
+        current position if offset is None)
+
+        The data is received even if the write is rejected, so the next
+        command can be read.
+
+        """
+
+        (fd, length) = (int(fd), int(length))
+        try:
+            (fd, length) = (self._fd(fd), self._check_length(length))
+        except _ChirpStatus:
+            for chunk in self._receive(length): # discard the data
+                pass
+            raise
+        written = 0
+        for chunk in self._receive(length):
+            if offset is None:
+                written += os.write(fd, chunk)
+            else:
+                written += os.pwrite(fd, chunk, int(offset) + written)
+        self._respond(written)
+
+    def _do_write(self, fd, length):
+        self._write(fd, length)
+
+    def _do_pwrite(self, fd, length, offset):
+        self._write(fd, length, offset)
+
+    def _do_swrite(self, fd, length, offset, stride_length, stride_skip):
+        length = int(length)
+        data = memoryview(self._receive_all(length))
+        (fd, length) = (self._fd(fd), self._check_length(length))
+        (offset, stride_length, stride_skip) = (
+            int(offset), int(stride_length), int(stride_skip))
+        if stride_length <= 0 or stride_skip < 0:
+            raise _ChirpStatus(-8)
+        written = 0
+        while written < length:
+            written += os.pwrite(fd, data[written:written + stride_length],
+                                     offset)
+            offset += stride_skip
+        self._respond(written)
+
+    def _do_fsync(self, fd):
+        os.fsync(self._fd(fd))
+        self._respond(0)
+
+    def _do_lseek(self, fd, offset, whence):
+        self._respond(os.lseek(self._fd(fd), int(offset), int(whence)))
+
+    def _do_getfile(self, path):
+        with open(self._path(path), "rb") as f:
+            length = os.fstat(f.fileno()).st_size
+            self._respond(length)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(remaining, _CHUNK_SIZE))
+                if not chunk: # the file shrank, the client cannot recover
+                    raise RuntimeError("File truncated while sending it.")
+                self._send(chunk)
+                remaining -= len(chunk)
+
+    def _do_putfile(self, path, mode, length):
+        length = int(length)
+        path = self._path(path)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC |
+                         getattr(os, "O_BINARY", 0), int(mode) & 0o7777)
+        try:
+            self._respond(0)
+            written = 0
+            for chunk in self._receive(length):
+                written += os.write(fd, chunk)
+        finally:
+            os.close(fd)
+        self._respond(written)
+
+    def _listing(self, path, long_format):
+        path = self._path(path)
+        names = [".", ".."] + sorted(os.listdir(path))
+        lines = []
+        for name in names:
+            lines.append(name.encode() + b"\n")
+            if long_format:
+                lines.append(_stat_line(os.lstat(os.path.join(path, name))))
+        data = b"".join(lines)
+        self._respond(len(data), data)
+
+    def _do_getdir(self, path):
+        self._listing(path, False)
+
+    def _do_getlongdir(self, path):
+        self._listing(path, True)
+
+    def _do_stat(self, path):
+        self._respond(0, _stat_line(os.stat(self._path(path))))
+
+    def _do_lstat(self, path):
+        self._respond(0, _stat_line(os.lstat(self._path(path))))
+
+    def _do_statfs(self, path):
+        self._respond(0, _statfs_line(os.statvfs(self._path(path))))
+
+    def _do_access(self, path, mode):
+        path = self._path(path)
+        os.stat(path) # DoesntExist rather than NotAuthorized
+        if not os.access(path, int(mode)):
+            raise _ChirpStatus(-2)
+        self._respond(0)
+
+    def _do_chmod(self, path, mode):
+        os.chmod(self._path(path), int(mode) & 0o7777)
+        self._respond(0)
+
+    def _do_chown(self, path, uid, gid):
+        os.chown(self._path(path), int(uid), int(gid))
+        self._respond(0)
+
+    def _do_lchown(self, path, uid, gid):
+        os.lchown(self._path(path), int(uid), int(gid))
+        self._respond(0)
+
+    def _do_truncate(self, path, length):
+        os.truncate(self._path(path), int(length))
+        self._respond(0)
+
+    def _do_utime(self, path, actime, mtime):
+        os.utime(self._path(path), (int(actime), int(mtime)))
+        self._respond(0)
+
+    def _do_rename(self, old_path, new_path):
+        os.rename(self._path(old_path), self._path(new_path))
+        self._respond(0)
+
+    def _do_link(self, old_path, new_path):
+        os.link(self._path(old_path), self._path(new_path))
+        self._respond(0)
+
+    def _do_symlink(self, old_path, new_path):
+        self._path(old_path) # the target must be below the root directory
+        os.symlink(old_path, self._path(new_path))
+        self._respond(0)
+
+    def _do_readlink(self, path, length):
+        data = os.readlink(self._path(path)).encode()[:int(length)]
+        self._respond(len(data), data)
+
+    def _do_unlink(self, path):
+        os.unlink(self._path(path))
+        self._respond(0)
+
+    def _do_mkdir(self, path, mode):
+        os.mkdir(self._path(path), int(mode) & 0o7777)
+        self._respond(0)
+
+    def _do_rmdir(self, path):
+        os.rmdir(self._path(path))
+        self._respond(0)
+
+    def _do_rmall(self, path):
+        path = self._path(path)
+        if path == self.chirp_server.root:
+            raise _ChirpStatus(-2)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+        self._respond(0)
+
+    def _do_whoami(self, length):
+        data = self.chirp_server.identity.encode()[:int(length)]
+        self._respond(len(data), data)
+
+    def _do_whoareyou(self, remote_host, length):
+        data = self.chirp_server.identity.encode()[:int(length)]
+        self._respond(len(data), data)
+
+    def _do_get_job_attr(self, job_attribute):
+        value = self.chirp_server._get_attribute(job_attribute, False)
+        data = value.encode()
+        self._respond(len(data), data)
+
+    def _do_get_job_attr_delayed(self, job_attribute):
+        value = self.chirp_server._get_attribute(job_attribute, True)
+        data = value.encode()
+        self._respond(len(data), data)
+
+    def _do_set_job_attr(self, job_attribute, attribute_value):
+        self.chirp_server._set_attribute(job_attribute, attribute_value, False)
+        self._respond(0)
+
+    def _do_set_job_attr_delayed(self, job_attribute, attribute_value):
+        self.chirp_server._set_attribute(job_attribute, attribute_value, True)
+        self._respond(0)
+
+    def _do_ulog(self, text):
+        self.chirp_server._log_event("ulog", text)
+        self._respond(0)
+
+    def _do_phase(self, phasestring):
+        self.chirp_server._log_event("phase", phasestring)
+        self._respond(0)
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ChirpServer(object):
+    """A local Chirp server, for testing and benchmarking HTChirp clients
+
+    Serves the files below a root directory and keeps the job attributes,
+    ulog messages and phases in memory. Each connection is served by its own
+    thread::
+
+        with ChirpServer("/tmp/scratch", latency = 0.001) as server:
+            chirp = server.client()
+            chirp.set_job_attr("Progress", "0.5")
+            print(server.job_attributes)
+
+    Every response is delayed until `latency` seconds after its command was
+    received, to simulate the round trip to a remote starter; commands that
+    arrive together (pipelined) share one round trip. With a bandwidth limit,
+    data is sent and received at most that many bytes per second in each
+    direction, over all connections.
+
+    The root directory is not a security boundary: paths are kept below it,
+    but symbolic links are followed. Do not expose the server to other hosts.
+
+    """
+
+    def __init__(self, root, host = "127.0.0.1", port = 0, cookie = None,
+                     latency = 0.0, bandwidth = None, max_io = None,
+                     identity = "CONDOR"):
+        """Chirp server initialization
+
+        :param root: Directory whose files are served
+        :param host: Address to listen on [default: 127.0.0.1]
+        :param port: Port to listen on [default: a free port]
+        :param cookie: Cookie that clients must authenticate with
+            [default: a random cookie]
+        :param latency: Seconds added to the round trip of every command
+        :param bandwidth: Maximum bytes per second in each direction, None for
+            no limit
+        :param max_io: Maximum length of a read or write, longer ones are
+            rejected with TooBig, None for no limit
+        :param identity: Identity returned by whoami and whoareyou
+
+        """
+
+        if cookie == None:
+            cookie = binascii.hexlify(os.urandom(16)).decode()
+        self.root = os.path.realpath(root)
+        self.cookie = cookie
+        self.latency = float(latency)
+        self.bandwidth = bandwidth
+        self.max_io = max_io
+        self.identity = identity
+
+        self.job_attributes = {} # attribute -> value
+        self.delayed_attributes = {} # attribute -> value
+        self.events = [] # (command, text) for each ulog and phase
+        self.commands = collections.Counter() # command -> times received
+        self.connections = 0 # number of connections accepted
+        self._lock = threading.Lock() # guards the state above
+
+        self._send_link = None
+        self._recv_link = None
+        self._chunk_size = _CHUNK_SIZE
+        if bandwidth is not None:
+            self._send_link = _Link(bandwidth)
+            self._recv_link = _Link(bandwidth)
+            # pace in small steps, about a hundredth of a second each
+            self._chunk_size = int(max(1024, min(_CHUNK_SIZE, bandwidth / 100)))
+
+        self._server = _ThreadingServer((host, port), _ChirpHandler,
+                                            bind_and_activate = False)
+        self._server.chirp_server = self
+        self._thread = None
+
+    def __repr__(self):
+        """Print a representation of this object"""
+        return "{0}({1}:{2}, {3!r})".format(
+            self.__class__.__name__,
+            self.host,
+            self.port,
+            self.root)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        """Start serving in a background thread"""
+        if self._thread is not None:
+            return
+        try:
+            self._server.server_bind()
+            self._server.server_activate()
+        except Exception:
+            self._server.server_close()
+            raise
+        self._thread = threading.Thread(target = self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop accepting connections and wait for the server thread"""
+        if self._thread is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._thread = None
+
+    def client(self, **kwargs):
+        """Create an HTChirp client for this server
+
+        :param kwargs: Other arguments for HTChirp (e.g. timeout, cache)
+        :returns: An HTChirp client
+
+        """
+
+        return HTChirp(host = self.host, port = self.port,
+                           auth = ["cookie"], cookie = self.cookie, **kwargs)
+
+    def write_config(self, directory = None):
+        """Write a .chirp.config file pointing at this server
+
+        HTChirp() reads it from $_CONDOR_SCRATCH_DIR (or the current
+        directory) when no host and port are given.
+
+        :param directory: Directory to write to [default: the root directory]
+        :returns: Path to the file
+
+        """
+
+        if directory == None:
+            directory = self.root
+        path = os.path.join(directory, ".chirp.config")
+        with open(path, "w") as f:
+            f.write("{0} {1} {2}\n".format(self.host, self.port, self.cookie))
+        return path
+
+    # called by the connection handlers
+
+    def _connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def _count(self, command):
+        with self._lock:
+            self.commands[command] += 1
+
+    def _get_attribute(self, job_attribute, delayed):
+        attributes = self.delayed_attributes if delayed else self.job_attributes
+        with self._lock:
+            try:
+                return attributes[job_attribute]
+            except KeyError:
+                raise _ChirpStatus(-3)
+
+    def _set_attribute(self, job_attribute, attribute_value, delayed):
+        attributes = self.delayed_attributes if delayed else self.job_attributes
+        with self._lock:
+            attributes[job_attribute] = attribute_value
+
+    def _log_event(self, command, text):
+        with self._lock:
+            self.events.append((command, text))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description = "Serve a directory with a local Chirp server")
+    parser.add_argument("root", help = "directory to serve")
+    parser.add_argument("--host", default = "127.0.0.1",
+                            help = "address to listen on [default: 127.0.0.1]")
+    parser.add_argument("--port", type = int, default = 0,
+                            help = "port to listen on [default: a free port]")
+    parser.add_argument("--cookie", help = "cookie [default: random]")
+    parser.add_argument("--latency", type = float, default = 0.0,
+                            help = "seconds added to every round trip")
+    parser.add_argument("--bandwidth", type = float,
+                            help = "maximum bytes per second in each direction")
+    parser.add_argument("--max-io", type = int,
+                            help = "maximum length of a read or write")
+    parser.add_argument("--config", action = "store_true",
+                            help = "write .chirp.config to the root directory")
+    args = parser.parse_args()
+
+    server = ChirpServer(args.root, host = args.host, port = args.port,
+                             cookie = args.cookie, latency = args.latency,
+                             bandwidth = args.bandwidth, max_io = args.max_io)
+    server.start()
+    if args.config:
+        server.write_config()
+    print("{0} {1} {2}".format(server.host, server.port, server.cookie))
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import pytest
+
+from htchirp import ChirpServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    """A local Chirp server serving an empty directory"""
+    root = tmp_path / "root"
+    root.mkdir()
+    with ChirpServer(str(root)) as chirp_server:
+        yield chirp_server
+
+
+@pytest.fixture
+def chirp(server):
+    """An HTChirp client for the local server"""
+    return server.client()
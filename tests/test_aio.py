@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from htchirp import HTChirp
+
+aio = pytest.importorskip("htchirp.aio")
+
+
+def run(server, operation, **kwargs):
+    """Run a coroutine function taking an AsyncHTChirp for the server"""
+
+    async def main():
+        async with aio.AsyncHTChirp(host = server.host, port = server.port,
+                                        cookie = server.cookie,
+                                        **kwargs) as chirp:
+            return await operation(chirp)
+    return asyncio.run(main())
+
+
+def test_gather(server):
+    async def operation(chirp):
+        await chirp.write(b"hello", "f", flags = "wc")
+        return await asyncio.gather(chirp.read("f", 5), chirp.stat("f"),
+                                        chirp.set_job_attr("A", "1"))
+    (data, stat_result, _) = run(server, operation)
+    assert data == b"hello"
+    assert stat_result.st_size == 5
+    assert server.job_attributes["A"] == "1"
+
+
+@pytest.mark.parametrize("failing_call", [
+    lambda c: c.read("f", 100),
+    lambda c: c.read("f", 10, 0, 0, 5),
+    lambda c: c.write(b"x" * 100, "f"),
+])
+def test_failed_call_closes_fd(server, chirp, failing_call):
+    chirp.write(b"x" * 100, "f", flags = "wc")
+    server.max_io = 8
+
+    async def operation(chirp):
+        for _ in range(5):
+            with pytest.raises(HTChirp.ChirpError):
+                await failing_call(chirp)
+        return await chirp.read("f", 3)
+    assert run(server, operation, connections = 1) == b"xxx"
+    assert server.commands["open"] == server.commands["close"]
+
+
+def test_failed_put_closes_fd(server, tmp_path):
+    local_file = tmp_path / "local"
+    local_file.write_bytes(b"y" * 100)
+    server.max_io = 8
+
+    async def operation(chirp):
+        for _ in range(3):
+            with pytest.raises(HTChirp.TooBig):
+                await chirp.put(str(local_file), "f", flags = "wc")
+    run(server, operation, connections = 1)
+    assert server.commands["open"] == server.commands["close"]
+
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from htchirp import HTChirp, JobAttributes
+
+
+def test_reads_are_cached(server, chirp):
+    server.job_attributes["A"] = "1"
+    with JobAttributes(chirp, flush_interval = None) as attrs:
+        assert attrs["A"] == "1"
+        server.job_attributes["A"] = "2"
+        assert attrs["A"] == "1"
+        attrs.invalidate("A")
+        assert attrs["A"] == "2"
+    assert server.commands["get_job_attr"] == 2
+
+
+def test_writes_are_coalesced(server, chirp):
+    attrs = JobAttributes(chirp, flush_interval = None)
+    for step in range(100):
+        attrs["Step"] = str(step)
+    attrs["ChirpProgress"] = "0.5"
+    assert attrs["Step"] == "99" # pending values are returned as set
+    assert server.commands["set_job_attr"] == 0
+    attrs.close()
+    assert (attrs.sent, attrs.coalesced) == (2, 99)
+    assert server.job_attributes == {"Step": "99"}
+    assert server.delayed_attributes == {"ChirpProgress": "0.5"}
+    with pytest.raises(ValueError):
+        attrs["Step"] = "100"
+
+
+def test_background_flush(server, chirp):
+    with JobAttributes(chirp, flush_interval = 0.05) as attrs:
+        attrs["A"] = "1"
+        for _ in range(100):
+            if server.job_attributes:
+                break
+            time.sleep(0.01)
+        assert server.job_attributes == {"A": "1"}
+
+
+def test_failed_flush_keeps_values(server, chirp):
+    attrs = JobAttributes(chirp, flush_interval = None)
+    attrs["A"] = "1"
+    server.stop()
+    with pytest.raises(EnvironmentError):
+        attrs.flush()
+    assert "1 pending" in repr(attrs)
+    assert attrs["A"] == "1"
+
+
+def test_bulk_job_attrs(server, chirp):
+    connections = server.connections
+    chirp.set_job_attrs({"A": "1", "B": '"two"'})
+    chirp.set_job_attrs_delayed([("ChirpC", "3")])
+    assert server.job_attributes == {"A": "1", "B": '"two"'}
+    assert server.delayed_attributes == {"ChirpC": "3"}
+    assert chirp.get_job_attrs(["A", "B"]) == {"A": "1", "B": '"two"'}
+    assert chirp.get_job_attrs_delayed(["ChirpC"]) == {"ChirpC": "3"}
+    assert server.connections == connections + 4 # one per call
+
+
+def test_bulk_job_attrs_error(server, chirp):
+    server.job_attributes["A"] = "1"
+    with pytest.raises(HTChirp.ChirpError) as error:
+        chirp.get_job_attrs(["A", "Missing", "AlsoMissing"])
+    assert error.value.path == "Missing"
@@ -0,0 +1,50 @@
+import pytest
+
+from htchirp import HTChirp
+
+
+def test_batch_results(server, chirp):
+    with chirp.batch() as batch:
+        created = batch.mkdir("d")
+        attribute = batch.set_job_attr("Progress", "1")
+    assert created.done and created.exception() is None
+    assert attribute.exception() is None
+    assert server.job_attributes["Progress"] == "1"
+    assert server.commands["cookie"] == 2 # one connection for the batch
+
+
+def test_batch_error_mapping(chirp):
+    chirp.mkdir("d")
+    batch = chirp.batch(raise_errors = False)
+    missing = batch.stat("missing")
+    existing = batch.stat("d")
+    outside = batch.stat("../..")
+    unknown = batch.get_job_attr("NoSuchAttribute")
+    batch.execute()
+
+    assert isinstance(missing.exception(), HTChirp.DoesntExist)
+    assert missing.exception().command == "stat"
+    assert missing.exception().path == "missing"
+    assert existing.result().st_size >= 0
+    assert isinstance(outside.exception(), HTChirp.NotAuthorized)
+    assert unknown.exception().code == -3
+    with pytest.raises(HTChirp.DoesntExist):
+        missing.result()
+
+
+def test_batch_raises_first_error(chirp):
+    batch = chirp.batch()
+    first = batch.unlink("missing")
+    batch.mkdir("d")
+    with pytest.raises(HTChirp.DoesntExist) as error:
+        batch.execute()
+    assert error.value is first.exception()
+    assert chirp.stat("d") # the commands after the error still ran
+
+
+def test_batch_window(server, chirp):
+    batch = chirp.batch()
+    results = [batch.set_job_attr("A{0}".format(i), str(i)) for i in range(300)]
+    batch.execute()
+    assert all(r.done for r in results)
+    assert len(server.job_attributes) == 300
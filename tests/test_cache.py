@@ -0,0 +1,68 @@
+import os
+import time
+
+from htchirp import MetadataCache
+
+
+def test_cache_hits(server):
+    cache = MetadataCache()
+    chirp = server.client(cache = cache)
+    chirp.write(b"abc", "f", flags = "wc")
+    stats = server.commands["stat"]
+    assert chirp.stat("f").st_size == 3
+    assert chirp.stat("f").st_size == 3
+    assert server.commands["stat"] == stats + 1
+    assert cache.hits == 1
+
+
+def test_cache_invalidation(server):
+    chirp = server.client(cache = MetadataCache())
+    chirp.write(b"abc", "f", flags = "wc")
+    assert chirp.stat("f").st_size == 3
+    assert sorted(chirp.getdir(".")) == [".", "..", "f"]
+
+    chirp.write(b"abcdef", "f")
+    assert chirp.stat("f").st_size == 6
+
+    chirp.rename("f", "g")
+    assert "g" in chirp.getdir(".") and "f" not in chirp.getdir(".")
+    assert chirp.stat("g").st_size == 6
+
+    chirp.mkdir("d")
+    chirp.write(b"x", "d/h", flags = "wc")
+    assert "h" in chirp.getlongdir("d")
+    chirp.rmall("d")
+    assert "d" not in chirp.getdir(".")
+
+
+def test_cached_listing_is_a_copy(server):
+    chirp = server.client(cache = MetadataCache())
+    chirp.write(b"abc", "f", flags = "wc")
+    listing = chirp.getlongdir(".", columns = True)
+    listing.names.append("bogus")
+    listing.st_size[0] = -1
+    again = chirp.getlongdir(".", columns = True)
+    assert "bogus" not in again.names
+    assert -1 not in again.st_size
+    assert dict(again)["f"].st_size == 3
+
+
+def test_cache_expires(server):
+    cache = MetadataCache(ttl = 0.1)
+    chirp = server.client(cache = cache)
+    chirp.write(b"abc", "f", flags = "wc")
+    assert chirp.stat("f").st_size == 3
+    with open(os.path.join(server.root, "f"), "wb") as f:
+        f.write(b"changed by another client")
+    assert chirp.stat("f").st_size == 3
+    time.sleep(0.2)
+    assert chirp.stat("f").st_size == 25
+
+
+def test_cache_size(server):
+    cache = MetadataCache(size = 2)
+    chirp = server.client(cache = cache)
+    for name in ("a", "b", "c"):
+        chirp.write(b"x", name, flags = "wc")
+        chirp.stat(name)
+    assert len(cache) == 2
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from htchirp import HTChirp
+from htchirp.htchirp import _command, quote, unquote
+
+
+def test_command_arguments():
+    assert _command("pread", 3, 10, 0) == b"pread 3 10 0\n"
+    assert _command("stat", "a b") == b"stat a\\ b\n"
+    for argument in (0.75, True, None, b"bytes"):
+        with pytest.raises(TypeError):
+            _command("pread", 3, argument, 0)
+
+
+@pytest.mark.parametrize("text", [
+    "plain", "with space", "tab\tand\nnewline\r", "back\\slash", "\\ ", ""])
+def test_quoting(text):
+    assert unquote(quote(text)) == text
+
+
+def test_quoted_paths(server, chirp):
+    name = "a file\twith\\odd name"
+    chirp.write(b"x", name, flags = "wc")
+    assert name in chirp.getdir(".")
+    assert chirp.stat(name).st_size == 1
+
+
+def test_missing_cookie(server):
+    with pytest.raises(HTChirp.NotAuthenticated):
+        HTChirp(host = server.host, port = server.port)
+
+
+def test_missing_cookie_async(server):
+    aio = pytest.importorskip("htchirp.aio")
+
+    async def main():
+        async with aio.AsyncHTChirp(host = server.host,
+                                        port = server.port) as chirp:
+            await chirp.stat(".")
+    with pytest.raises(HTChirp.NotAuthenticated):
+        asyncio.run(main())
+
+
+@pytest.mark.parametrize("code", sorted(HTChirp.CHIRP_ERRORS))
+def test_error_table(code):
+    (error, message) = HTChirp.CHIRP_ERRORS[code]
+    with pytest.raises(error) as raised:
+        HTChirp._check_response(code, "stat", "f")
+    assert issubclass(error, HTChirp.ChirpError)
+    assert (raised.value.code, raised.value.path) == (code, "f")
+    assert str(raised.value) == "stat f: " + message
+
+
+def test_unknown_error():
+    with pytest.raises(HTChirp.UnknownError):
+        HTChirp._check_response(-1000)
+    HTChirp._check_response(0)
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from htchirp import EventEmitter
+
+
+def test_emitter_sends_messages(server, chirp):
+    with EventEmitter(chirp, rate = None) as events:
+        for i in range(10):
+            events.ulog("step {0}".format(i))
+        events.phase("done")
+        assert events.flush(10)
+    assert events.sent == 11
+    assert server.events[-1] == ("phase", "done")
+    assert [text for (_, text) in server.events[:10]] == [
+        "step {0}".format(i) for i in range(10)]
+
+
+def test_emitter_counts_replaced_merges(server, chirp):
+    events = EventEmitter(chirp, rate = 0.001, max_pending = 1)
+    events.ulog("first")
+    assert events.flush(10) # uses up the only token
+    for i in range(200):
+        events.ulog("message number {0:03d}".format(i))
+    events.close(10)
+
+    assert events.sent == 2
+    assert events.sent + events.merged + events.dropped == 201
+    # the last message sent holds exactly the messages counted as merged
+    (command, text) = server.events[-1]
+    assert text.split("; ")[-1] == "message number 199"
+    assert len(text.split("; ")) == events.merged + 1
+    assert events.dropped > 100
+
+
+def test_emitter_rate(server, chirp):
+    with EventEmitter(chirp, rate = 20, max_pending = 5) as events:
+        for i in range(5): # a burst of max_pending messages
+            events.ulog("step {0}".format(i))
+        assert events.flush(10)
+        start = time.perf_counter()
+        for i in range(5, 10): # then rate messages per second
+            events.ulog("step {0}".format(i))
+        assert events.flush(10)
+        assert time.perf_counter() - start >= 0.2
+    assert (events.sent, events.merged, events.dropped) == (10, 0, 0)
+
+
+def test_emitter_drops_phases(server, chirp):
+    events = EventEmitter(chirp, rate = 0.001, max_pending = 1,
+                              overflow = "drop")
+    events.phase("first")
+    assert events.flush(10)
+    for i in range(10):
+        events.phase("phase {0}".format(i))
+    events.close(10)
+    assert (events.sent, events.dropped) == (2, 9)
+    assert server.events[-1] == ("phase", "phase 9")
+    with pytest.raises(ValueError):
+        events.ulog("closed")
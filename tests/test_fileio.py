@@ -0,0 +1,82 @@
+import io
+import socket
+
+import pytest
+
+from htchirp import HTChirp
+
+
+def test_text_round_trip(server, chirp):
+    with chirp.open("notes.txt", "w") as f:
+        f.write("first line\nsecond line\n")
+    with chirp.open("notes.txt") as f:
+        assert f.readline() == "first line\n"
+        assert list(f) == ["second line\n"]
+    assert server.commands["open"] == server.commands["close"]
+
+
+def test_binary_seek_and_tell(chirp):
+    with chirp.open("data.bin", "wb") as f:
+        f.write(bytes(range(256)))
+    with chirp.open("data.bin", "rb") as f:
+        f.seek(100)
+        assert f.read(3) == bytes([100, 101, 102])
+        assert f.tell() == 103
+        assert f.seek(-6, io.SEEK_END) == 250
+        assert f.read() == bytes(range(250, 256))
+
+
+def test_append_and_update(chirp):
+    chirp.write(b"0123456789", "f", flags = "wc")
+    with chirp.open("f", "ab") as f:
+        f.write(b"abc")
+    with chirp.open("f", "r+b") as f:
+        f.seek(2)
+        f.write(b"XY")
+        f.seek(0)
+        assert f.read() == b"01XY456789abc"
+        f.truncate(4)
+    assert chirp.read("f", 100) == b"01XY"
+
+
+def test_unbuffered_readinto(chirp):
+    chirp.write(b"hello world", "f", flags = "wc")
+    with chirp.open("f", "rb", buffering = 0) as f:
+        buf = bytearray(5)
+        assert f.readinto(buf) == 5
+        assert buf == b"hello"
+        assert f.readall() == b" world"
+
+
+def test_exclusive_and_missing(chirp):
+    chirp.write(b"x", "f", flags = "wc")
+    with pytest.raises(HTChirp.AlreadyExists):
+        chirp.open("f", "x")
+    with pytest.raises(HTChirp.DoesntExist):
+        chirp.open("missing")
+
+
+@pytest.mark.parametrize("mode", ["rw", "bt", "q", "rr"])
+def test_invalid_mode(chirp, mode):
+    with pytest.raises(ValueError):
+        chirp.open("f", mode)
+
+
+def test_closed_file(chirp):
+    f = chirp.open("f", "wb")
+    f.close()
+    with pytest.raises(ValueError):
+        f.write(b"x")
+
+
+def test_dropped_connection(server):
+    chirp = server.client(timeout = 0.2)
+    f = chirp.open("f", "wb", buffering = 0)
+    server.latency = 0.4
+    with pytest.raises(socket.timeout):
+        f.write(b"x")
+    server.latency = 0
+    with pytest.raises(RuntimeError):
+        f.write(b"y")
+    f.close()
+    assert f.closed
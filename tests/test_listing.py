@@ -0,0 +1,57 @@
+import os
+
+
+def make_entries(server):
+    """Create a file, a directory and a symbolic link below the root"""
+    with open(os.path.join(server.root, "a file"), "wb") as f:
+        f.write(b"x" * 42)
+    os.mkdir(os.path.join(server.root, "dir"))
+    os.symlink("a file", os.path.join(server.root, "link"))
+
+
+def test_scandir(server, chirp):
+    make_entries(server)
+    entries = dict((entry.name, entry) for entry in chirp.scandir("."))
+    assert sorted(entries) == ["a file", "dir", "link"]
+    assert entries["a file"].is_file() and not entries["a file"].is_dir()
+    assert entries["a file"].stat().st_size == 42
+    assert entries["a file"].path == "./a file"
+    assert entries["dir"].is_dir()
+    assert entries["link"].is_symlink()
+    assert os.fspath(entries["dir"]) == "./dir"
+
+
+def test_scandir_large(server, chirp):
+    for i in range(500):
+        os.mkdir(os.path.join(server.root, "entry{0:03d}".format(i)))
+    names = [entry.name for entry in chirp.scandir(".")]
+    assert sorted(names) == ["entry{0:03d}".format(i) for i in range(500)]
+
+
+def test_scandir_closed_early(server, chirp):
+    for i in range(500):
+        os.mkdir(os.path.join(server.root, "entry{0:03d}".format(i)))
+    with chirp:
+        entries = chirp.scandir(".")
+        next(entries)
+        entries.close()
+        # the rest of the listing was discarded, the session is still usable
+        assert chirp.stat("entry000").st_mode
+        assert chirp.reconnects == 0
+
+
+def test_getlongdir_and_getdir(server, chirp):
+    make_entries(server)
+    listing = chirp.getlongdir(".")
+    assert listing["a file"].st_size == 42
+    assert sorted(chirp.getdir(".")) == [".", "..", "a file", "dir", "link"]
+    stats = chirp.getdir(".", stat_dict = True)
+    assert stats["a file"].st_size == 42
+
+
+def test_getlongdir_columns(server, chirp):
+    make_entries(server)
+    listing = chirp.getlongdir(".", columns = True)
+    sizes = dict(zip(listing.names, listing.st_size))
+    assert sizes["a file"] == 42
+    assert dict(listing)["a file"] == chirp.stat("a file")
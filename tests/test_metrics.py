@@ -0,0 +1,81 @@
+import json
+
+from htchirp import ChirpEvent, ChirpMetrics
+from htchirp.metrics import Histogram
+
+
+def test_observer_events(server):
+    events = []
+    chirp = server.client(observer = events.append)
+    chirp.write(b"x" * 1000, "f", flags = "wc")
+    assert chirp.read("f", 1000) == b"x" * 1000
+    del events[:]
+
+    chirp.stat("f")
+    (event,) = events
+    assert isinstance(event, ChirpEvent)
+    assert (event.command, event.path, event.error) == ("stat", "f", None)
+    assert event.connect > 0 and event.auth > 0
+    assert event.duration >= event.connect + event.auth + event.first_byte
+    assert event.bytes_sent == len(b"stat f\n")
+    assert event.bytes_received > 0
+
+
+def test_observer_data_and_errors(server):
+    events = []
+    chirp = server.client(observer = events.append)
+    chirp.write(b"x" * 100000, "f", flags = "wc")
+    writes = [e for e in events if e.command == "write"]
+    assert writes[0].bytes_sent > 100000 and writes[0].path == "f"
+
+    del events[:]
+    with chirp:
+        try:
+            chirp.stat("missing")
+        except chirp.DoesntExist:
+            pass
+        with chirp.batch(raise_errors = False) as batch:
+            batch.stat(".")
+            batch.stat("missing")
+    assert [(e.command, e.pipelined) for e in events] == [
+        ("stat", False), ("stat", True), ("stat", True)]
+    assert events[1].error is None
+    assert events[0].error == events[2].error < 0
+
+
+def test_metrics(server):
+    metrics = ChirpMetrics(slowest = 3)
+    chirp = server.client(observer = metrics)
+    with chirp:
+        for _ in range(10):
+            chirp.stat(".")
+        try:
+            chirp.stat("missing")
+        except chirp.DoesntExist:
+            pass
+    stats = metrics.commands["stat"]
+    assert stats["calls"] == 11
+    assert sum(stats["errors"].values()) == metrics.errors == 1
+    assert stats["duration"].count == 11
+    assert len(metrics.slowest()) == 3
+    durations = [e.duration for e in metrics.slowest()]
+    assert durations == sorted(durations, reverse = True)
+
+    summary = json.loads(json.dumps(metrics.as_dict()))
+    assert summary["commands"]["stat"]["calls"] == 11
+    metrics.reset()
+    assert (metrics.calls, metrics.commands) == (0, {})
+
+
+def test_histogram():
+    histogram = Histogram([0.001, 0.01, 0.1])
+    for value in [0.0005] * 50 + [0.005] * 40 + [0.05] * 9 + [1.0]:
+        histogram.add(value)
+    assert histogram.count == 100
+    assert histogram.percentile(50) == 0.001
+    assert histogram.percentile(90) == 0.01
+    assert histogram.percentile(99) == 0.1
+    assert histogram.percentile(100) == 1.0
+    assert histogram.as_dict()["buckets"] == [
+        [0.001, 50], [0.01, 40], [0.1, 9], [None, 1]]
+    assert Histogram().percentile(50) is None
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from htchirp import HTChirp, ChirpPool, get_pool
+
+
+def test_pool_reuses_connections(server, chirp):
+    connections = server.connections
+    with ChirpPool(chirp, size = 2) as pool:
+        for _ in range(5):
+            with pool.connection() as client:
+                client.stat(".")
+        assert pool.created == 1
+    assert server.connections == connections + 1
+
+
+def test_pool_limits_connections(server, chirp):
+    with ChirpPool(chirp, size = 2, block = False) as pool:
+        first = pool.acquire()
+        second = pool.acquire()
+        with pytest.raises(HTChirp.Busy):
+            pool.acquire()
+        pool.release(first)
+        assert pool.acquire() is first
+        pool.release(first)
+        pool.release(second)
+
+
+def test_pool_threads(server, chirp):
+    errors = []
+
+    def work(i):
+        try:
+            with pool.connection() as client:
+                client.set_job_attr("A{0}".format(i), str(i))
+        except Exception as e:
+            errors.append(e)
+
+    with ChirpPool(chirp, size = 3) as pool:
+        threads = [threading.Thread(target = work, args = (i,))
+                       for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert pool.created <= 3
+    assert errors == []
+    assert len(server.job_attributes) == 20
+
+
+def test_pool_does_not_leak_fds(server, chirp):
+    chirp.write(b"x" * 100, "f", flags = "wc")
+    server.max_io = 8
+    with ChirpPool(chirp, size = 1) as pool:
+        for _ in range(5):
+            with pool.connection() as client:
+                with pytest.raises(HTChirp.TooBig):
+                    client.read("f", 10)
+                assert client.fds == {}
+        assert pool.created == 1
+    assert server.commands["open"] == server.commands["close"]
+
+
+def test_shared_pool(server, chirp):
+    pool = get_pool(chirp)
+    try:
+        assert get_pool(server.client()) is pool
+    finally:
+        pool.close()
+    assert get_pool(chirp) is not pool
+    get_pool(chirp).close()
@@ -0,0 +1,63 @@
+import os
+import time
+
+import pytest
+
+from htchirp import HTChirp, ChirpServer
+
+
+def test_round_trip(server, chirp):
+    chirp.write(b"hello world", "f", flags = "wc")
+    assert chirp.read("f", 100) == b"hello world"
+    assert chirp.read("f", 5, 6) == b"world"
+    assert chirp.stat("f").st_size == 11
+    with open(os.path.join(server.root, "f"), "rb") as f:
+        assert f.read() == b"hello world"
+
+
+def test_paths_are_confined(chirp):
+    with pytest.raises(HTChirp.NotAuthorized):
+        chirp.stat("../..")
+    with pytest.raises(HTChirp.DoesntExist):
+        chirp.stat("missing")
+
+
+def test_job_attributes_and_events(server, chirp):
+    chirp.set_job_attr("A", "1")
+    assert chirp.get_job_attr("A") == "1"
+    assert server.job_attributes == {"A": "1"}
+    chirp.set_job_attr_delayed("ChirpB", "2")
+    assert server.delayed_attributes == {"ChirpB": "2"}
+    with pytest.raises(HTChirp.ChirpError) as error:
+        chirp.get_job_attr("Missing")
+    assert error.value.code == -3
+
+    chirp.ulog("hello world")
+    chirp.phase("output")
+    assert server.events == [("ulog", "hello world"), ("phase", "output")]
+
+
+def test_wrong_cookie(server):
+    with pytest.raises(HTChirp.NotAuthenticated):
+        HTChirp(host = server.host, port = server.port, cookie = "wrong")
+
+
+def test_config_file(server, tmp_path, monkeypatch):
+    server.write_config(str(tmp_path))
+    monkeypatch.setenv("_CONDOR_SCRATCH_DIR", str(tmp_path))
+    assert HTChirp().whoami() == server.identity
+
+
+def test_latency(tmp_path):
+    with ChirpServer(str(tmp_path), latency = 0.05) as server:
+        chirp = server.client()
+        with chirp:
+            start = time.perf_counter()
+            chirp.stat(".")
+            assert time.perf_counter() - start >= 0.05
+            # pipelined commands share one round trip
+            start = time.perf_counter()
+            with chirp.batch() as batch:
+                for _ in range(10):
+                    batch.stat(".")
+            assert time.perf_counter() - start < 0.25
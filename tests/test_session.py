@@ -0,0 +1,96 @@
+import socket
+
+import pytest
+
+from htchirp import HTChirp
+
+
+def drop_connection(chirp):
+    """Make the server close the connection of a persistent session"""
+    chirp._socket.shutdown(socket.SHUT_WR)
+    while chirp._socket.recv(1):
+        pass
+
+
+def test_session_reuses_connection(server, chirp):
+    connections = server.connections
+    with chirp:
+        chirp.write(b"abc", "f", flags = "wc")
+        assert chirp.read("f", 3) == b"abc"
+        chirp.stat("f")
+    assert server.connections == connections + 1
+    chirp.stat("f") # outside the session, one connection per call
+    assert server.connections == connections + 2
+
+
+def test_reconnect(server, chirp):
+    connections = server.connections
+    with chirp:
+        chirp.stat(".")
+        drop_connection(chirp)
+        assert chirp.stat(".").st_mode
+        assert chirp.reconnects == 1
+        chirp.stat(".")
+        assert chirp.reconnects == 1
+    assert server.connections == connections + 2
+
+
+@pytest.mark.parametrize("failing_call", [
+    lambda c: c.read("f", 10, 0, 0, 5),
+    lambda c: c.read_into("f", bytearray(10), 0, 0, 5),
+    lambda c: c.write(b"0123456789", "f", stride_length = 0, stride_skip = 5),
+])
+def test_failed_call_closes_fd(server, chirp, failing_call):
+    chirp.write(b"x" * 100, "f", flags = "wc")
+    server.max_io = 8 # makes every read and write above fail
+    with chirp:
+        for _ in range(5):
+            with pytest.raises(HTChirp.ChirpError):
+                failing_call(chirp)
+        assert chirp.fds == {}
+        server.max_io = None
+        assert chirp.read("f", 3) == b"xxx"
+    assert server.commands["open"] == server.commands["close"]
+
+
+def test_timeout_drops_connection(server):
+    chirp = server.client(timeout = 0.2)
+    server.job_attributes.update({"A": "1", "B": "2"})
+    with chirp:
+        chirp.stat(".")
+        server.latency = 0.4
+        with pytest.raises(socket.timeout):
+            chirp.get_job_attr("A")
+        server.latency = 0.0
+        # the late reply to the first command is not taken for this one
+        assert chirp.get_job_attr("B") == "2"
+        assert chirp.reconnects == 1
+        assert chirp.get_job_attr("A") == "1"
+
+
+def test_timeout_in_batch(server):
+    chirp = server.client(timeout = 0.2)
+    with chirp:
+        server.latency = 0.4
+        with pytest.raises(socket.timeout):
+            with chirp.batch() as batch:
+                batch.set_job_attr("A", "1")
+        server.latency = 0.0
+        assert chirp.get_job_attr("A") == "1"
+        assert chirp.reconnects == 1
+
+
+def test_interrupted_transfer(server, chirp, tmp_path, monkeypatch):
+    server.job_attributes["A"] = "1"
+    chirp.write(b"x" * 100000, "f", flags = "wc")
+
+    def interrupted(*args):
+        raise KeyboardInterrupt()
+
+    with chirp:
+        with monkeypatch.context() as patch:
+            patch.setattr(chirp._reader, "readinto", interrupted)
+            with pytest.raises(KeyboardInterrupt):
+                chirp.read("f", 100000)
+        assert chirp.get_job_attr("A") == "1"
+        assert chirp.reconnects == 1
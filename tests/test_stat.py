@@ -0,0 +1,30 @@
+import os
+
+
+def test_stat_matches_os_stat(server, chirp):
+    chirp.write(b"x" * 42, "f", flags = "wc")
+    st = os.stat(os.path.join(server.root, "f"))
+    result = chirp.stat("f")
+    assert result.st_size == st.st_size == 42
+    assert result.st_mode == st.st_mode
+    assert result.st_ino == st.st_ino
+    assert result.st_mtime == int(st.st_mtime)
+    assert tuple(result[:7]) == tuple(st[:7])
+
+
+def test_stat_names(chirp):
+    chirp.write(b"x" * 42, "f", flags = "wc")
+    result = chirp.stat("f")
+    assert result["size"] == 42
+    assert dict(result)["mode"] == result.st_mode
+    assert sorted(dict(result)) == sorted(result._chirp_names)
+
+
+def test_lstat_and_statfs(server, chirp):
+    chirp.write(b"x", "f", flags = "wc")
+    chirp.symlink("f", "link")
+    assert chirp.lstat("link").st_size == len("f")
+    assert chirp.stat("link").st_size == 1
+    result = chirp.statfs(".")
+    assert result.f_bsize > 0
+    assert result["f_bsize"] == result.f_bsize
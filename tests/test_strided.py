@@ -0,0 +1,76 @@
+import os
+import array
+import struct
+
+import pytest
+
+from htchirp import HTChirp
+
+
+RECORD = struct.Struct("<qdq") # 24 byte records
+
+
+def write_records(server, name, count):
+    """Write count records (i, i / 2, -i) directly below the server root"""
+    with open(os.path.join(server.root, name), "wb") as f:
+        for i in range(count):
+            f.write(RECORD.pack(i, i / 2.0, -i))
+
+
+def test_read_strided(server, chirp):
+    write_records(server, "records", 1000)
+    column = chirp.read_strided("records", RECORD.size, 8, 8, 1000,
+                                    typecode = "d")
+    assert list(column) == [i / 2.0 for i in range(1000)]
+    assert server.commands["sread"] == 1
+
+
+def test_read_strided_splits_too_big(server, chirp):
+    write_records(server, "records", 1000)
+    server.max_io = 800 # 100 fields
+    column = chirp.read_strided("records", RECORD.size, 16, 8, 1000,
+                                    typecode = "q")
+    assert list(column) == [-i for i in range(1000)]
+    assert chirp._io_limit <= 800
+    # the smaller size is remembered for the next reads
+    sreads = server.commands["sread"]
+    chirp.read_strided("records", RECORD.size, 0, 8, 1000)
+    assert server.commands["sread"] - sreads == -(-8000 // chirp._io_limit)
+    assert server.commands["open"] == server.commands["close"]
+
+
+def test_write_strided_splits_too_big(server, chirp):
+    write_records(server, "records", 1000)
+    server.max_io = 800
+    values = array.array("d", [-1.5 * i for i in range(1000)])
+    assert chirp.write_strided(values, "records", RECORD.size, 8, 8) == 8000
+    with open(os.path.join(server.root, "records"), "rb") as f:
+        records = list(RECORD.iter_unpack(f.read()))
+    assert records == [(i, -1.5 * i, -i) for i in range(1000)]
+
+
+def test_read_strided_array(server, chirp):
+    write_records(server, "records", 10)
+    column = chirp.read_strided("records", RECORD.size, 0, 8, 10)
+    assert isinstance(column, memoryview)
+    assert array.array("q", column.tobytes()).tolist() == list(range(10))
+    # stops at the end of the file
+    assert len(chirp.read_strided("records", RECORD.size, 0, 8, 20,
+                                      typecode = "q")) == 10
+
+
+@pytest.mark.parametrize("layout", [(0, 0, 8), (24, 20, 8), (24, -1, 8)])
+def test_invalid_layout(chirp, layout):
+    with pytest.raises(ValueError):
+        chirp.read_strided("records", layout[0], layout[1], layout[2], 10)
+
+
+def test_failed_read_strided_closes_fd(server, chirp):
+    write_records(server, "records", 10)
+    server.max_io = 0 # rejects even a single field
+    with chirp:
+        for _ in range(3):
+            with pytest.raises(HTChirp.TooBig):
+                chirp.read_strided("records", RECORD.size, 0, 8, 10)
+        assert chirp.fds == {}
+    assert server.commands["open"] == server.commands["close"]
@@ -0,0 +1,54 @@
+import os
+
+
+def make_tree(root):
+    """Create a small directory tree with a few files"""
+    (root / "sub" / "deeper").mkdir(parents = True)
+    (root / "a.txt").write_bytes(b"a" * 10)
+    (root / "sub" / "b.bin").write_bytes(os.urandom(70000))
+    (root / "sub" / "deeper" / "c").write_bytes(b"")
+    return {"a.txt": b"a" * 10,
+            os.path.join("sub", "b.bin"): (root / "sub" / "b.bin").read_bytes(),
+            os.path.join("sub", "deeper", "c"): b""}
+
+
+def read_tree(root):
+    """Map the relative paths of the files below root to their contents"""
+    files = {}
+    for (path, _, names) in os.walk(str(root)):
+        for name in names:
+            full_path = os.path.join(path, name)
+            with open(full_path, "rb") as f:
+                files[os.path.relpath(full_path, str(root))] = f.read()
+    return files
+
+
+def test_sync_up(server, chirp, tmp_path):
+    local = tmp_path / "local"
+    files = make_tree(local)
+    summary = chirp.sync_up(str(local), "mirror")
+    assert summary == {"files": 3, "bytes": 70010, "skipped": 0,
+                           "directories": 3}
+    assert read_tree(os.path.join(server.root, "mirror")) == files
+
+    # unchanged files are skipped, changed ones sent again
+    assert chirp.sync_up(str(local), "mirror")["skipped"] == 3
+    (local / "a.txt").write_bytes(b"changed")
+    summary = chirp.sync_up(str(local), "mirror")
+    assert (summary["files"], summary["skipped"]) == (1, 2)
+    assert chirp.read("mirror/a.txt", 100) == b"changed"
+
+
+def test_sync_down(server, chirp, tmp_path):
+    files = make_tree(tmp_path / "root" / "mirror")
+    local = tmp_path / "local"
+    summary = chirp.sync_down("mirror", str(local))
+    assert summary == {"files": 3, "bytes": 70010, "skipped": 0,
+                           "directories": 3}
+    assert read_tree(local) == files
+
+    assert chirp.sync_down("mirror", str(local))["skipped"] == 3
+    chirp.write(b"changed", "mirror/a.txt", flags = "wct")
+    summary = chirp.sync_down("mirror", str(local))
+    assert (summary["files"], summary["skipped"]) == (1, 2)
+    assert (local / "a.txt").read_bytes() == b"changed"
@@ -0,0 +1,157 @@
+import os
+
+import pytest
+
+from htchirp import MetadataCache
+
+
+@pytest.fixture
+def payload(tmp_path):
+    """A local file of a few chunks, not a multiple of the chunk size"""
+    path = tmp_path / "payload"
+    path.write_bytes(os.urandom(3 * 65536 + 123))
+    return path
+
+
+def put_remote(server, name, data):
+    """Create a file directly below the server root"""
+    with open(os.path.join(server.root, name), "wb") as f:
+        f.write(data)
+
+
+def read_remote(server, name):
+    """Read a file directly below the server root"""
+    with open(os.path.join(server.root, name), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"chunk_size": 4096},
+    {"preallocate": True},
+    {"atomic": True},
+])
+def test_getfile(server, chirp, payload, tmp_path, options):
+    put_remote(server, "remote", payload.read_bytes())
+    copy = tmp_path / "copy"
+    copy.write_bytes(b"old contents, longer than nothing")
+    size = payload.stat().st_size
+    assert chirp.getfile("remote", str(copy), **options) == size
+    assert copy.read_bytes() == payload.read_bytes()
+    # no temporary file left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "copy", "payload", "root"]
+
+
+def test_fetch_progress(server, chirp, payload, tmp_path):
+    put_remote(server, "remote", payload.read_bytes())
+    calls = []
+    chirp.fetch("remote", str(tmp_path / "copy"), chunk_size = 65536,
+                    progress = lambda done, total, rate: calls.append(
+                        (done, total)))
+    size = payload.stat().st_size
+    assert calls[-1] == (size, size)
+    assert [done for (done, _) in calls] == sorted(done for (done, _) in calls)
+
+
+def test_getfile_empty(server, chirp, tmp_path):
+    put_remote(server, "empty", b"")
+    assert chirp.getfile("empty", str(tmp_path / "copy")) == 0
+    assert (tmp_path / "copy").read_bytes() == b""
+
+
+def test_putfile(server, chirp, payload):
+    size = payload.stat().st_size
+    assert chirp.putfile(str(payload), "remote", 0o640) == size
+    assert read_remote(server, "remote") == payload.read_bytes()
+    assert chirp.stat("remote").st_mode & 0o777 == 0o640
+
+
+def test_putfile_replaces(server, chirp, payload, tmp_path):
+    put_remote(server, "remote", b"x" * (1 << 20))
+    short = tmp_path / "short"
+    short.write_bytes(b"abc")
+    assert chirp.putfile(str(short), "remote") == 3
+    assert read_remote(server, "remote") == b"abc"
+
+
+def test_putfile_unreadable_drops_connection(server, chirp, tmp_path):
+    # a directory passes the stat, but fails to open once the server already
+    # waits for its payload
+    with chirp:
+        with pytest.raises(EnvironmentError):
+            chirp.putfile(str(tmp_path), "remote")
+        assert chirp.stat(".").st_mode
+        assert chirp.reconnects == 1
+
+
+def test_put_appends(server, chirp, payload):
+    put_remote(server, "remote", b"head")
+    size = payload.stat().st_size
+    assert chirp.put(str(payload), "remote", flags = "wa",
+                         chunk_size = 65536) == size
+    assert read_remote(server, "remote") == b"head" + payload.read_bytes()
+
+
+def test_put_and_fetch_round_trip(chirp, payload, tmp_path):
+    chirp.put(str(payload), "copy", flags = "wc")
+    copy = tmp_path / "copy"
+    chirp.fetch("copy", str(copy))
+    assert copy.read_bytes() == payload.read_bytes()
+
+
+def test_failed_put_closes_fd(server, chirp, tmp_path):
+    local_file = tmp_path / "local"
+    local_file.write_bytes(b"y" * 100)
+    server.max_io = 8
+    with chirp:
+        for _ in range(3):
+            with pytest.raises(chirp.TooBig):
+                chirp.put(str(local_file), "f", flags = "wc")
+        assert chirp.fds == {}
+    assert server.commands["open"] == server.commands["close"]
+
+
+def test_parallel_fetch(server, chirp, payload, tmp_path):
+    put_remote(server, "remote", payload.read_bytes())
+    copy = tmp_path / "copy"
+    size = payload.stat().st_size
+    assert chirp.parallel_fetch("remote", str(copy), workers = 3,
+                                    chunk_size = 65536) == size
+    assert copy.read_bytes() == payload.read_bytes()
+    assert server.commands["open"] == server.commands["close"]
+
+
+def test_parallel_fetch_ignores_cached_size(server, payload, tmp_path):
+    chirp = server.client(cache = MetadataCache())
+    put_remote(server, "remote", b"old")
+    assert chirp.stat("remote").st_size == 3
+    put_remote(server, "remote", payload.read_bytes()) # changed by others
+    copy = tmp_path / "copy"
+    chirp.parallel_fetch("remote", str(copy), chunk_size = 65536)
+    assert copy.read_bytes() == payload.read_bytes()
+
+
+def test_parallel_fetch_checks_received_bytes(server, chirp, payload,
+                                                  tmp_path, monkeypatch):
+    put_remote(server, "remote", payload.read_bytes())
+    # no range is received, although the local file is already full size
+    monkeypatch.setattr(chirp, "_transfer_ranges", lambda *args: None)
+    with pytest.raises(EnvironmentError):
+        chirp.parallel_fetch("remote", str(tmp_path / "copy"))
+
+
+def test_parallel_put(server, chirp, payload):
+    size = payload.stat().st_size
+    put_remote(server, "remote", b"x" * (size * 2)) # truncated first
+    assert chirp.parallel_put(str(payload), "remote", workers = 3,
+                                  chunk_size = 65536) == size
+    assert read_remote(server, "remote") == payload.read_bytes()
+    assert server.commands["open"] == server.commands["close"]
+
+
+def test_parallel_put_empty(server, chirp, tmp_path):
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+    assert chirp.parallel_put(str(empty), "remote") == 0
+    assert read_remote(server, "remote") == b""